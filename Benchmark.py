@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import tempfile
+import tracemalloc
+import datetime
+import contextlib
+import subprocess
+from Modules.InventoryManagement import Inventory, Item
+from Modules.MembershipSystem import MemberDatabase, Member
+from Modules.RoyaltyProgram import RoyaltyProgram
+from Modules.Store import Store, randomTransactions, measureThroughput
+from Modules.DataGenerator import DataGenerator
+
+#Lane counts the checkout throughput of one store process is measured for
+LANE_COUNTS = [1, 2, 4, 8]
+
+#Store sizes to benchmark: (items, members, purchase history lines)
+SCALES = {
+    "tiny": (1000, 1000, 10000),
+    "small": (10000, 100000, 1000000),
+    "medium": (50000, 500000, 5000000),
+    "large": (100000, 1000000, 10000000),
+}
+#A benchmark that got this much slower than the previous results is flagged
+REGRESSION_THRESHOLD = 1.2
+
+#Runs a function several times, returning the best and mean time per run (and per operation if it does several)
+def timeRuns(function, runs: int = 3, operations: int = 1) -> dict:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"runs": runs, "operations": operations, "best": min(times), "mean": sum(times) / runs,
+            "bestPerOperation": min(times) / operations}
+
+#Returns the current git commit, if the project is a git checkout
+def getCommit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+#Times the hot paths of the system on a generated store in a directory
+def runBenchmarks(directory: str, operations: int = 1000) -> dict:
+    inventoryFile = os.path.join(directory, "INVENTORY.txt")
+    membersFile = os.path.join(directory, "MEMBERS.txt")
+    historyFile = os.path.join(directory, "PURCHASE_HISTORY.txt")
+    results = {}
+    rng = random.Random(0)
+
+    #Inventory: a cold parse, cached loads and reads, and single item stock updates
+    results["Inventory.loadItems (cold)"] = timeRuns(lambda: Inventory(inventoryFile))
+    inv = Inventory(inventoryFile)
+    itemIDs = sorted(inv.getInventory())
+    results["Inventory.loadItems (cached)"] = timeRuns(lambda: [inv.loadItems() for _ in range(operations)], operations=operations)
+    results["Inventory.getInventory"] = timeRuns(lambda: [inv.getInventory() for _ in range(operations)], operations=operations)
+    #Searches for the start of a random item's name, as typed at the till (the index is built by the first one)
+    inv.searchItems("")
+    queries = [" ".join(inv.getInventory()[itemID]["name"].split()[:2])[:-2] for itemID in rng.choices(itemIDs, k=operations)]
+    results["Inventory.searchItems"] = timeRuns(lambda: [inv.searchItems(query) for query in queries], operations=operations)
+    updates = [{itemID: rng.randint(1, 500)} for itemID in rng.choices(itemIDs, k=operations)]
+    results["Inventory.updateStock"] = timeRuns(lambda: [inv.updateStock(update) for update in updates], operations=operations)
+
+    #Members: opening the database (members, full history and index), reloading history, registering and saving
+    MemberDatabase(membersFile, historyFile)
+    results["MemberDatabase (cold open)"] = timeRuns(lambda: MemberDatabase(membersFile, historyFile))
+    memberDB = MemberDatabase(membersFile, historyFile)
+    results["MemberDatabase.loadHistory (no changes)"] = timeRuns(lambda: [memberDB.loadHistory() for _ in range(operations)],
+                                                                  operations=operations)
+    registrations = iter(range(10 ** 9))
+    #Every registration rewrites the members file, so only a few are timed
+    results["MemberDatabase.registerMember"] = timeRuns(
+        lambda: [memberDB.registerMember("Bench Mark", f"bench{next(registrations)}@example.com") for _ in range(5)], operations=5)
+    results["MemberDatabase.saveMembers"] = timeRuns(memberDB.saveMembers)
+
+    #Royalty program: points and reward display for random carts of real members
+    store = Store(inv, memberDB)
+    transactions = randomTransactions(store, operations)
+    items = inv.getInventory()
+
+    def royaltyPrograms() -> list:
+        return [(RoyaltyProgram(memberID, {memberID: cart}, items, purchasedItems=memberDB.getPurchasedItems(memberID)),
+                 memberDB.getRole(memberID)) for memberID, cart, _ in transactions]
+    programs = royaltyPrograms()
+    results["RoyaltyProgram.getPoints"] = timeRuns(lambda: [program.getPoints() for program, _ in programs], operations=operations)
+    results["RoyaltyProgram.displayAbilities"] = timeRuns(
+        lambda: [program.displayAbilities(role, 250) for program, role in royaltyPrograms()], operations=operations)
+
+    #A full headless checkout: stock, points, member update and history append
+    checkouts = transactions[:min(operations, 200)]
+    results["Store.checkout"] = timeRuns(lambda: [store.checkout(memberID, cart) for memberID, cart, _ in checkouts],
+                                         runs=1, operations=len(checkouts))
+    return results
+
+#Returns the bytes allocated per record while building count records (IDs and names included, as they are held in memory)
+def measureRecords(makeRecord, count: int) -> float:
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        records = {}
+        for number in range(count):
+            record = makeRecord(number)
+            records[record[0]] = record[1]
+        return (tracemalloc.get_traced_memory()[0] - start) / count
+    finally:
+        tracemalloc.stop()
+
+#Measures the memory taken per item and per member in the catalog and member dictionaries, and what reading them allocates
+def measureMemory(items: int, members: int) -> dict:
+    def makeItem(number: int) -> tuple:
+        itemID = f"ITM{number:06d}"
+        return itemID, Item(itemID, f"Item {number}", 1.5 + number % 100, number % 500, number % 7 == 0)
+
+    def makeMember(number: int) -> tuple:
+        memberID = f"AB{number:07d}"
+        return memberID, Member(memberID, f"Member {number}", f"member{number}@example.com", "Apprentice", number % 2500)
+
+    results = {"Item": measureRecords(makeItem, items), "Member": measureRecords(makeMember, members)}
+    #getInventory() hands out a view over the items, so reading the catalog should allocate next to nothing per item
+    with tempfile.TemporaryDirectory() as directory:
+        inv = Inventory(os.path.join(directory, "INVENTORY.txt"))
+        inv.appendItems([makeItem(number)[1] for number in range(min(items, 100000))])
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            inventory = inv.getInventory()
+            results["Inventory.getInventory"] = (tracemalloc.get_traced_memory()[0] - start) / len(inventory)
+        finally:
+            tracemalloc.stop()
+    return results
+
+#Prints results next to the previous ones, flagging anything that got noticeably slower
+def printComparison(results: dict, previous: dict | None) -> None:
+    for name, result in results.items():
+        line = f"{name:<45} {result['bestPerOperation'] * 1000:>12.4f} ms"
+        if previous and name in previous:
+            change = result["bestPerOperation"] / previous[name]["bestPerOperation"] if previous[name]["bestPerOperation"] else 1
+            line += f"  {change:>6.2f}x" + ("  SLOWER" if change > REGRESSION_THRESHOLD else "")
+        print(line)
+
+if __name__ == "__main__":
+    #Usage: python Benchmark.py [scale] [results file] [previous results file]
+    scale = sys.argv[1] if len(sys.argv) > 1 else "tiny"
+    if scale not in SCALES:
+        print(f"Unknown scale '{scale}'. Available scales: {', '.join(SCALES)}.")
+        sys.exit(1)
+    resultsFile = sys.argv[2] if len(sys.argv) > 2 else f"benchmark_{scale}.json"
+    previousFile = sys.argv[3] if len(sys.argv) > 3 else resultsFile
+    items, members, historyLines = SCALES[scale]
+
+    with tempfile.TemporaryDirectory() as directory:
+        #The system prints as it works, which would drown out the results
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            DataGenerator().generateStore(directory, items, members, historyLines)
+            results = runBenchmarks(directory)
+            memory = measureMemory(items, members)
+            throughput = measureThroughput(directory, LANE_COUNTS)
+
+    previous = None
+    if os.path.exists(previousFile):
+        with open(previousFile, "r") as file:
+            previous = json.load(file)["results"]
+    printComparison(results, previous)
+    for name, bytesPerRecord in memory.items():
+        print(f"{name:<45} {bytesPerRecord:>12.1f} bytes per record")
+    #Lanes are threads in one process, so they only overlap while waiting on files; Python code runs one lane at a time
+    for lanes, result in throughput.items():
+        print(f"{f'Store.runCheckouts ({lanes} lanes)':<45} {result['checkoutsPerSecond']:>12.1f} checkouts/s")
+
+    with open(resultsFile, "w") as file:
+        json.dump({"scale": scale, "items": items, "members": members, "historyLines": historyLines,
+                   "commit": getCommit(), "python": platform.python_version(),
+                   "timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "results": results, "memory": memory,
+                   "cpus": os.cpu_count(), "throughput": throughput}, file, indent=2)
+    print(f"Results saved to '{resultsFile}'.")
@@ -1,35 +1,39 @@
+import os
 from Modules.InventoryManagement import Inventory
 from Modules.MembershipSystem import MemberDatabase
-from Modules.POS import POS
+from Modules.POS import POS, renderReceipt
 from Modules.RoyaltyProgram import RoyaltyProgram
-
-#Initialize and return all required classes.
-def initializeClasses(memberID: str = None) -> tuple:
-    inv = Inventory()
-    memberDB = MemberDatabase()
-    cashier = POS(memberID, inv.getInventory())
-    return inv, memberDB, cashier
+from Modules.Store import Store
+from Modules.Metrics import enableMetrics, writeMetrics, serveMetrics
+from Modules.EventLog import openEventLog, closeEventLog
+from Modules.StorageBackends import STORAGE_DIRECTORY, SQLiteStorage
+from Modules.ReceiptArchive import ReceiptArchive, openReceiptArchive, closeReceiptArchive
 
 #Handles adding items to the cart.
 def handleAddingToCart(inv: Inventory, cashier: POS):
-    inv.listItems()
+    #Only a page of the catalog is shown at a time; anything that isn't an item ID searches item names and IDs
+    query, page = "", 0
+    inv.listItems(query, page)
     while True:
-        item = input("Enter Item ID To Add To Cart (or press Enter to stop adding): ").strip()
+        item = input("Enter Item ID To Add To Cart, text to search for, + for more (or press Enter to stop adding): ").strip()
         if not item:
             break
 
+        if item == "+":
+            page += 1
+            inv.listItems(query, page)
+            continue
+
         if not inv.isItem(item):
-            print("The Item Entered Isn't Valid")
+            query, page = item, 0
+            inv.listItems(query, page)
             continue
 
         try:
             quantity = int(input("How Many: "))
-            if inv.isInStock(item, quantity):
-                cashier.addToCart(item, quantity)
-                updatedStock = cashier.getUpdatedStock()
-                inv.updateStock(updatedStock)
-            else:
-                stock = inv.getInventory()[item]["stock"]
+            #Hold the stock for this cart until checkout so other tills can't sell it
+            if not cashier.reserveItem(inv, item, quantity):
+                stock = inv.getAvailableStock(item)
                 print(f"Stock Level of {inv.getInventory()[item]['name']} is {stock}")
         except ValueError:
             print("Invalid quantity. Please enter a number.")
@@ -53,22 +57,49 @@ def handleRemoveItemsFromCart(cashier: POS, memberID: str, inv: Inventory):
         try:
             quantity = int(input(f"How many of {item} do you want to remove? "))
             cashier.removeFromCart(item, quantity)
-            currentStock = inv.getInventory()[item]["stock"]
-            inv.updateStock({item:currentStock+quantity})
+
+            #Give back the held stock and hold only what is still in the cart
+            for holdID in cashier.takeHolds(item):
+                inv.releaseReservation(holdID)
+            remaining = cashier.getCart().get(memberID, {}).get(item, 0)
+            if remaining:
+                holdID = inv.reserveStock(item, remaining)
+                if holdID:
+                    cashier.addHold(item, holdID)
+                else:
+                    cashier.removeFromCart(item, remaining)
+                    print(f"{item} is no longer in stock and was removed from your cart.")
             break
         except ValueError:
             print("Invalid quantity. Please enter a valid number.")
 
+#Reprints a customer's receipts for a day from the receipt archive.
+def handleReprint(archive: ReceiptArchive, memberID: str):
+    dates = archive.getDates(memberID)
+    if not dates:
+        print("No receipts on file for this customer.")
+        return
+    print(f"Receipts on file for: {', '.join(dates[-10:])}")
+    date = input("Enter the date to reprint (YYYY-MM-DD, or press Enter for the latest): ").strip() or dates[-1]
+    receipts = archive.findReceipts(memberID, date)
+    if not receipts:
+        print(f"No receipts on {date}.")
+    for receipt in receipts:
+        print(renderReceipt(receipt))
+        print("\n" + "="*80 + "\n")
+
 #Manage adding and removing items in the cart.
-def handleCartOperations(cashier: POS, inv: Inventory, memberID: str):
+def handleCartOperations(cashier: POS, inv: Inventory, memberID: str, archive: ReceiptArchive = None):
     while True:
-        print("\nCart Operations: \n1. Add Items to Cart\n2. Remove Items from Cart\n0. Exit")
+        print("\nCart Operations: \n1. Add Items to Cart\n2. Remove Items from Cart" + ("\n3. Reprint a Receipt" if archive else "") + "\n0. Exit")
         choice = input("Choose an option: ").strip()
 
         if choice == "1":
             handleAddingToCart(inv, cashier)
         elif choice == "2":
             handleRemoveItemsFromCart(cashier, memberID, inv)
+        elif choice == "3" and archive:
+            handleReprint(archive, memberID)
         elif choice == "0":
             break
         else:
@@ -92,10 +123,15 @@ def checkout(memberDB: MemberDatabase, cashier: POS, memberID: str, inv: Invento
         print("Cart Empty! Get Out Of The Line!")
         return
     
+    #Turn the cart's holds into a sale, re-checking any stock that changed since it was held
+    if not cashier.commitHolds(inv):
+        print("Checkout cancelled: some items in the cart are no longer in stock.")
+        return
+
     cart = cashier.getCart()
     total = cashier.calculateTotal()
     
-    royaltySys = RoyaltyProgram(memberID, cart, inv.getInventory(), memberDB.loadHistory())
+    royaltySys = RoyaltyProgram(memberID, cart, inv.getInventory(), purchasedItems=memberDB.getPurchasedItems(memberID))
     royaltySys.displayAbilities(memberDB.getRole(memberID), total)
     
     ability = handleAbilitySelection(royaltySys,memberDB,memberID,total)
@@ -109,9 +145,6 @@ def checkout(memberDB: MemberDatabase, cashier: POS, memberID: str, inv: Invento
     memberDB.updateMemberDetails(memberID, points=pointsEarned)
     memberDB.savePurchases({memberID: cart[memberID]})
 
-    #Update Inventory
-    inv.updateStock(cashier.getUpdatedStock())
-
     #Receipt Generation
     receipt = cashier.finalizePurchase(discount, pointsEarned)
     print(receipt)
@@ -119,22 +152,48 @@ def checkout(memberDB: MemberDatabase, cashier: POS, memberID: str, inv: Invento
 
 #Main Program
 def main():
-    inv, memberDB, cashier = initializeClasses()
+    #Metrics are off unless asked for: YOUWEE_METRICS_FILE keeps a Prometheus text file up to date, YOUWEE_METRICS_PORT serves them over HTTP
+    #They are turned on before anything is opened so the files kept open (the event log, the receipt index) are counted too
+    metricsFile = os.environ.get("YOUWEE_METRICS_FILE")
+    metricsPort = os.environ.get("YOUWEE_METRICS_PORT")
+    if metricsFile or metricsPort:
+        enableMetrics()
+    if metricsPort:
+        serveMetrics(int(metricsPort))
+
+    #One long-lived store shares its inventory and member database with every customer
+    #Purchase history is written by a background thread in batches, and every sale, stock change and registration goes to the event log
+    #YOUWEE_DATABASE keeps everything in a SQLite database (shared by every till pointed at it) instead of the text files
+    database = os.environ.get("YOUWEE_DATABASE")
+    storage = SQLiteStorage(database) if database else None
+    store = Store(Inventory(storage=storage), MemberDatabase(groupCommit=True, storage=storage))
+    openEventLog(os.environ.get("YOUWEE_EVENT_LOG", os.path.join(STORAGE_DIRECTORY, "EVENT_LOG.txt")))
+    #Every receipt is kept in the archive so it can be reprinted for returns and audits
+    archive = openReceiptArchive(os.environ.get("YOUWEE_RECEIPTS", os.path.join(STORAGE_DIRECTORY, "RECEIPTS")))
+    inv = store.getInventory()
+    memberDB = store.getMemberDatabase()
 
     while True:
         memberID = input("Enter Customer ID (or -999 to exit): ").strip()
         if memberID == "-999":
             print("Closing for the day...")
+            store.close()
+            closeEventLog()
+            closeReceiptArchive()
+            if metricsFile:
+                writeMetrics(metricsFile)
             break
         
         if memberID not in memberDB.getAllMembers():
             memberID = memberDB.processNewMember()
         
-        #Initialize a new POS instance for each customer
-        inv, memberDB, cashier = initializeClasses(memberID)
+        #Open a new POS lane for each customer
+        cashier = store.openLane(memberID)
         
-        handleCartOperations(cashier, inv, memberID)
+        handleCartOperations(cashier, inv, memberID, archive)
         checkout(memberDB, cashier, memberID, inv)
+        if metricsFile:
+            writeMetrics(metricsFile)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
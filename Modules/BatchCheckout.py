@@ -0,0 +1,125 @@
+import sys
+import json
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from Modules.MembershipSystem import MemberDatabase
+from Modules.Store import Store
+
+#Reward choices that mean no reward, besides leaving it out
+NO_REWARD = {None, "", "0", "none"}
+#Stands in for the receipt of a transaction the store rejected as invalid (unknown item, bad quantity, unusable reward)
+INVALID = object()
+
+#Streams transactions from a JSONL file: {"member": ID, "items": {itemID: quantity}, "reward": "Explorer"}, reward optional
+def readTransactions(filename: str):
+    with open(filename, "r") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+class BatchCheckout:
+    def __init__(self, store: Store = None, seed: int = 0, batchSize: int = 1000, lanes: int = 1):
+        #Nobody is at the till, so the store is headless and saves members and history in batches
+        self.__store = store if store else Store(memberDB=MemberDatabase(writeBehind=True, flushEvery=batchSize, groupCommit=True),
+                                                 headless=True)
+        self.__seed = seed
+        #Transactions are checked out, and their receipts and updates written, this many at a time
+        self.__batchSize = batchSize
+        #With more than one lane a batch is checked out in parallel, so the order stock runs out in can differ between runs
+        self.__lanes = lanes
+
+    #Returns the store the transactions are checked out in
+    def getStore(self) -> Store:
+        return self.__store
+
+    #Turns a transaction record into (memberID, items, reward), raising ValueError if it isn't valid
+    def parseTransaction(self, record: dict) -> tuple:
+        memberID = str(record.get("member", "")).strip()
+        if not memberID:
+            raise ValueError("missing member")
+        items = record.get("items")
+        if not isinstance(items, dict) or not items:
+            raise ValueError("items must be a non-empty object of item IDs and quantities")
+        items = {str(itemID): int(quantity) for itemID, quantity in items.items()}
+        reward = record.get("reward")
+        reward = "0" if reward in NO_REWARD else str(reward)
+        return memberID, items, reward
+
+    #Returns the random source for the perks of a transaction, seeded by its position so a replay gets the same discounts
+    def getRandom(self, number: int) -> random.Random:
+        return random.Random(f"{self.__seed}:{number}")
+
+    #Checks out one batch of numbered transactions, returning their receipts (None where a checkout didn't go through,
+    #INVALID where the store found the transaction invalid)
+    def checkoutBatch(self, batch: list) -> list:
+        def checkout(transaction):
+            number, (memberID, items, reward) = transaction
+            try:
+                return self.__store.checkout(memberID, items, reward, self.getRandom(number))
+            except ValueError:
+                return INVALID
+
+        if self.__lanes > 1:
+            with ThreadPoolExecutor(max_workers=self.__lanes) as pool:
+                return list(pool.map(checkout, batch))
+        return [checkout(transaction) for transaction in batch]
+
+    #Writes the member updates of a batch and appends its receipts
+    def finishBatch(self, receipts: list, receiptFile) -> None:
+        self.__store.getMemberDatabase().flush()
+        if receiptFile:
+            receiptFile.write("".join(receipt + "\n" + "="*80 + "\n" for receipt in receipts if receipt))
+            receiptFile.flush()
+
+    #Runs every transaction through the full checkout, returning counts and the number of completed transactions per second
+    def run(self, records, receiptsFilename: str = None) -> dict:
+        report = {"read": 0, "completed": 0, "rejected": 0, "invalid": 0}
+        receiptFile = open(receiptsFilename, "a") if receiptsFilename else None
+        start = time.perf_counter()
+        try:
+            batch = []
+            for record in records:
+                report["read"] += 1
+                try:
+                    batch.append((report["read"], self.parseTransaction(record)))
+                except (ValueError, TypeError, AttributeError):
+                    report["invalid"] += 1
+                    continue
+
+                if len(batch) >= self.__batchSize:
+                    self.runBatch(batch, receiptFile, report)
+                    batch = []
+            if batch:
+                self.runBatch(batch, receiptFile, report)
+            self.__store.close()
+        finally:
+            if receiptFile:
+                receiptFile.close()
+
+        report["seconds"] = time.perf_counter() - start
+        report["transactionsPerSecond"] = report["completed"] / report["seconds"] if report["seconds"] else 0
+        return report
+
+    #Checks out one batch and counts how it went
+    def runBatch(self, batch: list, receiptFile, report: dict) -> None:
+        receipts = self.checkoutBatch(batch)
+        invalid = receipts.count(INVALID)
+        receipts = [receipt for receipt in receipts if receipt is not INVALID]
+        self.finishBatch(receipts, receiptFile)
+        completed = sum(1 for receipt in receipts if receipt)
+        report["invalid"] += invalid
+        report["completed"] += completed
+        report["rejected"] += len(receipts) - completed
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.BatchCheckout <transactions.jsonl> [receipts file] [seed] [lanes]
+    if len(sys.argv) < 2:
+        print("Usage: python -m Modules.BatchCheckout <transactions.jsonl> [receipts file] [seed] [lanes]")
+        sys.exit(1)
+    receiptsFilename = sys.argv[2] if len(sys.argv) > 2 else None
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    lanes = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    report = BatchCheckout(seed=seed, lanes=lanes).run(readTransactions(sys.argv[1]), receiptsFilename)
+    print(f"Read {report['read']} transactions: {report['completed']} completed, {report['rejected']} rejected, "
+          f"{report['invalid']} invalid in {report['seconds']:.2f}s ({report['transactionsPerSecond']:.1f} completed/s).")
@@ -0,0 +1,281 @@
+import re
+import os
+import gc
+import sys
+import csv
+import json
+import math
+import datetime
+from Modules.InventoryManagement import Inventory, Item
+from Modules.MembershipSystem import MemberDatabase, getPurchaseKey
+from Modules.Console import say, WARNING
+
+MEMBER_ID_PATTERN = re.compile(r"^[A-Z]{2}\d{5}$")
+SEASONAL_VALUES = {"seasonal": True, "true": True, "yes": True, "1": True,
+                   "notseasonal": False, "false": False, "no": False, "0": False, "": False}
+ITEM_FIELDS = ["itemID", "name", "price", "stock", "seasonal"]
+MEMBER_FIELDS = ["memberID", "name", "email", "points", "role"]
+HISTORY_FIELDS = ["memberID", "date", "itemID", "quantity"]
+#Invalid records are counted, but only this many are printed
+MAX_REPORTED_ERRORS = 10
+
+#Returns the format of a file from its extension ('csv' or 'jsonl')
+def getFormat(filename: str) -> str:
+    return "csv" if os.path.splitext(filename)[1].lower() == ".csv" else "jsonl"
+
+#Streams the records of a CSV or JSONL file one at a time as dictionaries
+def readRecords(filename: str, fileFormat: str = None):
+    fileFormat = fileFormat if fileFormat else getFormat(filename)
+    with open(filename, "r", newline="") as file:
+        if fileFormat == "csv":
+            for record in csv.DictReader(file):
+                yield record
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+#Item IDs are a three letter category followed by a number (see Inventory_IDs.txt), and must fit the shared stock table
+def isValidItemID(itemID: str) -> bool:
+    return 4 <= len(itemID) <= 16 and itemID.isascii() and itemID[:3].isalpha() and itemID[:3].isupper() and itemID[3:].isdigit()
+
+#Checks that text can be stored in the colon-separated storage files
+def isStorableText(text: str) -> bool:
+    return bool(text) and ":" not in text and "\n" not in text and "\r" not in text
+
+class BulkTransfer:
+    def __init__(self, inv: Inventory = None, memberDB: MemberDatabase = None, chunkSize: int = 10000):
+        self.__inventory = inv if inv else Inventory()
+        self.__memberDB = memberDB if memberDB else MemberDatabase()
+        #Records are validated and written this many at a time, so memory use doesn't grow with the size of the input
+        self.__chunkSize = chunkSize
+
+    #Builds an Item from an import record, raising ValueError if any field is invalid
+    def parseItem(self, record: dict) -> Item:
+        itemID = str(record.get("itemID", "")).strip()
+        if not isValidItemID(itemID):
+            raise ValueError(f"invalid item ID '{itemID}'")
+        name = str(record.get("name", "")).strip()
+        if not isStorableText(name):
+            raise ValueError(f"invalid name '{name}'")
+        price = float(record.get("price"))
+        if not math.isfinite(price) or price < 0:
+            raise ValueError(f"invalid price {price}")
+        stock = int(record.get("stock", 0) or 0)
+        if stock < 0:
+            raise ValueError(f"invalid stock {stock}")
+        seasonal = record.get("seasonal", False)
+        if not isinstance(seasonal, bool):
+            seasonal = SEASONAL_VALUES.get(str(seasonal).strip().lower())
+            if seasonal is None:
+                raise ValueError(f"invalid seasonal value '{record.get('seasonal')}'")
+        #Prices are stored to the cent
+        return Item(itemID, name, round(price, 2), stock, seasonal)
+
+    #Turns an import record into (memberID, name, email, points), raising ValueError if any field is invalid
+    def parseMember(self, record: dict) -> tuple:
+        memberID = str(record.get("memberID", "") or "").strip()
+        if memberID and not MEMBER_ID_PATTERN.match(memberID):
+            raise ValueError(f"invalid member ID '{memberID}'")
+        name = str(record.get("name", "")).strip()
+        if not self.__memberDB.isValidName(name):
+            raise ValueError(f"invalid name '{name}'")
+        email = str(record.get("email", "")).strip()
+        if not self.__memberDB.isValidEmail(email) or not isStorableText(email) or " " in email or email.startswith("@") or email.endswith("@"):
+            raise ValueError(f"invalid email '{email}'")
+        points = int(record.get("points", 0) or 0)
+        if points < 0:
+            raise ValueError(f"invalid points {points}")
+        return memberID, name, email, points
+
+    #Turns an import record into (memberID, date, {itemID: quantity}), raising ValueError if any field is invalid
+    def parsePurchase(self, record: dict) -> tuple:
+        memberID = str(record.get("memberID", "")).strip()
+        if self.__memberDB.getRole(memberID) is None:
+            raise ValueError(f"unknown member '{memberID}'")
+        date = str(record.get("date", "")).strip()
+        datetime.date.fromisoformat(date)
+        items = record["items"] if "items" in record else {record.get("itemID", ""): record.get("quantity")}
+        purchase = {}
+        isItem = self.__inventory.isItem
+        for itemID, quantity in items.items():
+            itemID = str(itemID).strip()
+            if not isItem(itemID):
+                raise ValueError(f"unknown item '{itemID}'")
+            quantity = int(quantity)
+            if quantity < 1:
+                raise ValueError(f"invalid quantity {quantity}")
+            purchase[itemID] = purchase.get(itemID, 0) + quantity
+        return memberID, date, purchase
+
+    #Validates records in chunks and hands each chunk of valid ones to writeChunk, which returns how many it added.
+    #The garbage collector is paused meanwhile: records make no reference cycles, and with millions of objects allocated it
+    #would otherwise walk everything loaded (the history, the stored purchases being matched) over and over
+    def importRecords(self, records, parseRecord, writeChunk) -> dict:
+        report = {"read": 0, "added": 0, "duplicates": 0, "invalid": 0}
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            chunk = []
+            for record in records:
+                report["read"] += 1
+                try:
+                    chunk.append(parseRecord(record))
+                except (ValueError, TypeError, KeyError, AttributeError) as error:
+                    report["invalid"] += 1
+                    if report["invalid"] <= MAX_REPORTED_ERRORS:
+                        say(f"Skipping record {report['read']}: {error}", WARNING)
+                    continue
+
+                if len(chunk) >= self.__chunkSize:
+                    added = writeChunk(chunk)
+                    report["added"] += added
+                    report["duplicates"] += len(chunk) - added
+                    chunk = []
+            if chunk:
+                added = writeChunk(chunk)
+                report["added"] += added
+                report["duplicates"] += len(chunk) - added
+            return report
+        finally:
+            if collecting:
+                gc.enable()
+
+    #Imports items from a CSV or JSONL file, skipping IDs already in the inventory
+    def importItems(self, filename: str, fileFormat: str = None) -> dict:
+        return self.importRecords(readRecords(filename, fileFormat), self.parseItem,
+                                  lambda chunk: len(self.__inventory.appendItems(chunk)))
+
+    #Imports members from a CSV or JSONL file, skipping anyone already registered with the same name and email
+    def importMembers(self, filename: str, fileFormat: str = None) -> dict:
+        return self.importRecords(readRecords(filename, fileFormat), self.parseMember,
+                                  lambda chunk: len(self.__memberDB.appendMembers(chunk)))
+
+    #Imports purchase history from JSONL ({memberID, date, items}) or CSV (one row per item: memberID, date, itemID, quantity),
+    #skipping purchases already in the history so running an import again adds nothing. Purchases dated within a member's
+    #compacted history are rejected
+    def importHistory(self, filename: str, fileFormat: str = None) -> dict:
+        fileFormat = fileFormat if fileFormat else getFormat(filename)
+        records = readRecords(filename, fileFormat)
+        if fileFormat == "csv":
+            records = self.groupPurchaseRows(records)
+        memberDB = self.__memberDB
+        #Everything stored so far (and the compaction aggregates) must be loaded to be checked against
+        memberDB.flush()
+        memberDB.loadHistory()
+        #How many times each of a member's purchases is stored but not yet matched by one in the file, read the first time the
+        #member comes up. Counting copies keeps a member's identical purchases on the same day apart from a second import of one
+        unmatched = {}
+
+        #Purchases a compaction rolled up are only kept as totals, so one dated within a member's compacted dates can't be told
+        #apart from them: it is rejected and reported rather than taken as stored or as new. Any stored purchase outside those
+        #dates is still in the history, where it is checked as usual
+        def parseRecord(record: dict) -> tuple:
+            memberID, date, items = self.parsePurchase(record)
+            aggregate = memberDB.getMemberAggregate(memberID)
+            if aggregate and aggregate["first"] <= date <= aggregate["last"]:
+                raise ValueError(f"purchase dated {date} falls within {memberID}'s compacted history "
+                                 f"({aggregate['first']} to {aggregate['last']}), so it can't be checked for duplicates")
+            return memberID, date, items
+
+        #Checks a purchase against the member's stored ones
+        def isStored(memberID: str, date: str, items: dict) -> bool:
+            counts = unmatched.get(memberID)
+            if counts is None:
+                counts = unmatched[memberID] = memberDB.getPurchaseKeys(memberID)
+            key = getPurchaseKey(date, items)
+            if counts.get(key):
+                counts[key] -= 1
+                return True
+            return False
+
+        #New purchases go straight to storage, so the loaded history doesn't grow with the size of the file
+        def writeChunk(chunk: list) -> int:
+            newPurchases = [purchase for purchase in chunk if not isStored(*purchase)]
+            if newPurchases:
+                memberDB.importPurchases(newPurchases)
+            return len(newPurchases)
+        return self.importRecords(records, parseRecord, writeChunk)
+
+    #Joins consecutive CSV rows of the same member and date into one purchase record
+    def groupPurchaseRows(self, rows):
+        current = None
+        for row in rows:
+            key = (row.get("memberID"), row.get("date"))
+            if current is None or key != (current["memberID"], current["date"]):
+                if current is not None:
+                    yield current
+                current = {"memberID": key[0], "date": key[1], "items": {}}
+            itemID = row.get("itemID")
+            #A quantity that isn't a number is passed through as is so it fails validation
+            try:
+                current["items"][itemID] = current["items"].get(itemID, 0) + int(row.get("quantity"))
+            except (TypeError, ValueError):
+                current["items"][itemID] = row.get("quantity")
+        if current is not None:
+            yield current
+
+    #Writes records to a CSV or JSONL file a chunk at a time
+    def writeRecords(self, filename: str, fields: list, records, fileFormat: str = None) -> int:
+        fileFormat = fileFormat if fileFormat else getFormat(filename)
+        count = 0
+        with open(filename, "w", newline="") as file:
+            writer = csv.DictWriter(file, fields) if fileFormat == "csv" else None
+            if writer:
+                writer.writeheader()
+            chunk = []
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= self.__chunkSize:
+                    count += self.writeChunk(file, writer, chunk)
+                    chunk = []
+            count += self.writeChunk(file, writer, chunk)
+        return count
+
+    #Writes one chunk of records, returning how many were written
+    def writeChunk(self, file, writer, chunk: list) -> int:
+        if writer:
+            writer.writerows(chunk)
+        else:
+            file.write("".join(json.dumps(record) + "\n" for record in chunk))
+        return len(chunk)
+
+    #Exports the whole catalog
+    def exportItems(self, filename: str, fileFormat: str = None) -> int:
+        items = self.__inventory.getInventory()
+        records = ({"itemID": itemID, "name": item["name"], "price": item["price"], "stock": item["stock"], "seasonal": item["seasonal"]}
+                   for itemID, item in items.items())
+        return self.writeRecords(filename, ITEM_FIELDS, records, fileFormat)
+
+    #Exports every member
+    def exportMembers(self, filename: str, fileFormat: str = None) -> int:
+        members = self.__memberDB.getAllMembers()
+        records = ({"memberID": memberID, "name": member["name"], "email": member["email"], "points": member["points"], "role": member["role"]}
+                   for memberID, member in members.items())
+        return self.writeRecords(filename, MEMBER_FIELDS, records, fileFormat)
+
+    #Exports the purchase history, reading it from storage a purchase at a time
+    def exportHistory(self, filename: str, fileFormat: str = None) -> int:
+        fileFormat = fileFormat if fileFormat else getFormat(filename)
+
+        def readPurchases():
+            for memberID, date, items in self.__memberDB.readAllPurchases():
+                if fileFormat == "csv":
+                    for itemID, quantity in items.items():
+                        yield {"memberID": memberID, "date": date, "itemID": itemID, "quantity": quantity}
+                else:
+                    yield {"memberID": memberID, "date": date, "items": items}
+        return self.writeRecords(filename, HISTORY_FIELDS, readPurchases(), fileFormat)
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.BulkTransfer import|export items|members|history <file.csv|file.jsonl>
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export") or sys.argv[2] not in ("items", "members", "history"):
+        print("Usage: python -m Modules.BulkTransfer import|export items|members|history <file.csv|file.jsonl>")
+        sys.exit(1)
+    action, kind, filename = sys.argv[1:]
+    transfer = BulkTransfer()
+    if action == "import":
+        report = getattr(transfer, "import" + kind.title())(filename)
+        print(f"Read {report['read']} records: {report['added']} added, {report['duplicates']} duplicates, {report['invalid']} invalid.")
+    else:
+        print(f"Exported {getattr(transfer, 'export' + kind.title())(filename)} records.")
@@ -0,0 +1,128 @@
+import re
+import heapq
+import bisect
+
+#Names and IDs are split into lowercase words of letters and digits
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+#A query word matching more than this many times as many items as the candidates so far is checked against each candidate
+SCAN_RATIO = 20
+
+#Returns the lowercase words of a piece of text
+def getTokens(text: str) -> list:
+    return TOKEN_PATTERN.findall(text.lower())
+
+class CatalogIndex:
+    def __init__(self, getName):
+        #Returns the name of an item by ID, so candidates can be checked without keeping a copy of every name
+        self.__getName = getName
+        #Every item ID in order, so a page of the whole catalog is a slice and IDs starting with a prefix sit next to each other
+        self.__itemIDs = []
+        #(lowercase ID, ID) of every item in order, so IDs starting with a query word sit next to each other whatever their case
+        self.__foldedIDs = []
+        #Word of an item name -> IDs of the items it appears in (lists, since most words belong to only a few items)
+        self.__postings = {}
+        #Every word in order, so all words starting with a prefix sit next to each other
+        self.__words = []
+
+    #Indexes every item from scratch
+    def build(self, itemIDs) -> None:
+        self.__itemIDs = sorted(itemIDs)
+        self.__foldedIDs = sorted((itemID.lower(), itemID) for itemID in self.__itemIDs)
+        self.__postings = {}
+        for itemID in self.__itemIDs:
+            for word in set(getTokens(self.__getName(itemID))):
+                postings = self.__postings.get(word)
+                if postings is None:
+                    self.__postings[word] = [itemID]
+                else:
+                    postings.append(itemID)
+        self.__words = sorted(self.__postings)
+
+    #Adds one item to the index
+    def addItem(self, itemID: str, name: str) -> None:
+        position = bisect.bisect_left(self.__itemIDs, itemID)
+        if position < len(self.__itemIDs) and self.__itemIDs[position] == itemID:
+            return
+        self.__itemIDs.insert(position, itemID)
+        bisect.insort(self.__foldedIDs, (itemID.lower(), itemID))
+        for word in set(getTokens(name)):
+            if word not in self.__postings:
+                self.__postings[word] = []
+                bisect.insort(self.__words, word)
+            self.__postings[word].append(itemID)
+
+    #Removes one item from the index (its name is needed to find the words it was indexed under)
+    def removeItem(self, itemID: str, name: str) -> None:
+        position = bisect.bisect_left(self.__itemIDs, itemID)
+        if position == len(self.__itemIDs) or self.__itemIDs[position] != itemID:
+            return
+        del self.__itemIDs[position]
+        del self.__foldedIDs[bisect.bisect_left(self.__foldedIDs, (itemID.lower(), itemID))]
+        for word in set(getTokens(name)):
+            postings = self.__postings.get(word)
+            if postings is None or itemID not in postings:
+                continue
+            postings.remove(itemID)
+            if not postings:
+                del self.__postings[word]
+                del self.__words[bisect.bisect_left(self.__words, word)]
+
+    #Returns the range of positions in a sorted list holding the entries that start with prefix
+    def getPrefixRange(self, entries: list, prefix: str) -> tuple[int, int]:
+        return bisect.bisect_left(entries, prefix), bisect.bisect_left(entries, prefix + "\uffff")
+
+    #Returns the range of positions in the lowercase IDs holding the IDs that start with prefix
+    def getIDRange(self, prefix: str) -> tuple[int, int]:
+        return bisect.bisect_left(self.__foldedIDs, (prefix,)), bisect.bisect_left(self.__foldedIDs, (prefix + "\uffff",))
+
+    #Returns roughly how many items a query word matches, without collecting them
+    def countPrefix(self, prefix: str) -> int:
+        start, end = self.getPrefixRange(self.__words, prefix)
+        idStart, idEnd = self.getIDRange(prefix)
+        return sum(len(self.__postings[word]) for word in self.__words[start:end]) + idEnd - idStart
+
+    #Returns the IDs of the items with a name word or an ID (ignoring case) starting with prefix
+    def findPrefix(self, prefix: str) -> set:
+        found = set()
+        start, end = self.getPrefixRange(self.__words, prefix)
+        for word in self.__words[start:end]:
+            found.update(self.__postings[word])
+        #Every ID of a category starts with its three letters (e.g. FRU001), in whatever case it was added with
+        start, end = self.getIDRange(prefix)
+        found.update(itemID for _, itemID in self.__foldedIDs[start:end])
+        return found
+
+    #Checks if a word of an item's name or its ID starts with prefix
+    def isMatch(self, itemID: str, prefix: str) -> bool:
+        return itemID.lower().startswith(prefix) or any(word.startswith(prefix) for word in getTokens(self.__getName(itemID)))
+
+    #Returns the IDs of the items matching every word of the query: each word must start a word of the item's name or
+    #its ID, so results narrow down as the cashier types. The rarest word is looked up first, and the few items it matches
+    #are checked for the other words directly, so the work follows the number of matches rather than the size of the catalog
+    def search(self, query: str) -> set:
+        words = sorted(((self.countPrefix(word), word) for word in getTokens(query)))
+        if not words:
+            return set(self.__itemIDs)
+        matches = self.findPrefix(words[0][1])
+        for count, word in words[1:]:
+            if not matches:
+                break
+            #Checking a candidate costs far more than a set lookup, so a word matching not many more items is intersected instead
+            if count <= len(matches) * SCAN_RATIO:
+                matches &= self.findPrefix(word)
+            else:
+                matches = {itemID for itemID in matches if self.isMatch(itemID, word)}
+        return matches
+
+    #Returns one page of the item IDs (in order) matching a query (the whole catalog for an empty one) and how many match in total
+    def getPage(self, query: str = "", offset: int = 0, limit: int = 20) -> tuple[list, int]:
+        if not getTokens(query):
+            return self.__itemIDs[offset:offset + limit], len(self.__itemIDs)
+        matches = self.search(query)
+        #Only the matches up to the end of the page need putting in order
+        return heapq.nsmallest(offset + limit, matches)[offset:], len(matches)
+
+    #Returns how many items are indexed
+    def getSize(self) -> int:
+        return len(self.__itemIDs)
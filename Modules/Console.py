@@ -0,0 +1,26 @@
+import os
+
+#Console message levels, lowest to highest. Messages below the current level aren't shown
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR, "off": OFF}
+
+#Shows information and above unless YOUWEE_CONSOLE_LEVEL says otherwise (headless runs turn the console off)
+consoleLevel = LEVELS.get(os.environ.get("YOUWEE_CONSOLE_LEVEL", "info").lower(), INFO)
+
+#Changes which messages are shown
+def setConsoleLevel(level: int) -> None:
+    global consoleLevel
+    consoleLevel = level
+
+#Returns the current console level
+def getConsoleLevel() -> int:
+    return consoleLevel
+
+#Prints a message if its level is shown
+def say(message: str, level: int = INFO) -> None:
+    if level >= consoleLevel:
+        print(message)
@@ -0,0 +1,106 @@
+import os
+import sys
+import random
+import datetime
+
+#Item categories and their ID prefixes (see Storage/Inventory_IDs.txt), with a typical price range for each
+CATEGORIES = {
+    "FRU": ("Fruit", 0.5, 25), "DES": ("Desert", 2, 40), "TEC": ("Technology", 20, 2500),
+    "VEG": ("Vegetables", 0.5, 15), "BEV": ("Beverages", 1, 60), "HOM": ("Home Goods", 5, 400),
+    "CLO": ("Clothing", 8, 300), "SPT": ("Sports Equipment", 10, 800), "BKS": ("Books", 5, 90),
+    "TOY": ("Toys", 3, 150), "MED": ("Medical Supplies", 2, 120), "STA": ("Stationery", 0.5, 40),
+    "PET": ("Pet Supplies", 2, 150), "AUT": ("Automotive Parts", 10, 1200), "JWL": ("Jewelry", 25, 5000),
+    "ART": ("Art Supplies", 2, 200), "MUS": ("Musical Instruments", 30, 3000), "GAM": ("Gaming Accessories", 10, 500),
+    "KIT": ("Kitchen Appliances", 15, 900),
+}
+ADJECTIVES = ["Classic", "Deluxe", "Fresh", "Premium", "Compact", "Organic", "Golden", "Island", "Royal", "Everyday",
+              "Tropical", "Sturdy", "Bright", "Vintage", "Smart", "Family"]
+FIRST_NAMES = ["Ava", "Ben", "Chloe", "Dwayne", "Ella", "Fiona", "Gary", "Hannah", "Isaac", "Jada", "Kemar", "Lisa",
+               "Marcus", "Nia", "Omar", "Paula", "Quincy", "Rhea", "Shane", "Tara", "Uriel", "Vera", "Wade", "Xena",
+               "Yusuf", "Zara"]
+LAST_NAMES = ["Anthony", "Baptiste", "Charles", "Daniel", "Edwards", "Francis", "George", "Henry", "Isaac", "James",
+              "Joseph", "King", "Lewis", "Martin", "Nicholas", "Owen", "Peters", "Quinn", "Roberts", "Samuel",
+              "Thomas", "Usher", "Vincent", "Williams", "Xavier", "Young"]
+#Lines are written in blocks of this many so generating stays fast without holding a whole file in memory
+WRITE_BLOCK = 10000
+
+#Writes lines to a file in blocks
+def writeLines(filename: str, lines) -> None:
+    with open(filename, "w") as file:
+        block = []
+        for line in lines:
+            block.append(line)
+            if len(block) >= WRITE_BLOCK:
+                file.write("".join(block))
+                block = []
+        file.write("".join(block))
+
+class DataGenerator:
+    def __init__(self, seed: int = 0):
+        self.__rng = random.Random(seed)
+
+    #Returns item IDs spread over the categories, numbered within each category like the real catalog (FRU001, FRU002, ...)
+    def generateItemIDs(self, count: int) -> list:
+        prefixes = list(CATEGORIES)
+        return [f"{prefixes[number % len(prefixes)]}{number // len(prefixes) + 1:03d}" for number in range(count)]
+
+    #Yields INVENTORY.txt lines: log-uniform prices within the category's range and about one item in ten seasonal
+    def generateItems(self, itemIDs: list):
+        rng = self.__rng
+        for itemID in itemIDs:
+            category, lowest, highest = CATEGORIES[itemID[:3]]
+            price = lowest * (highest / lowest) ** rng.random()
+            seasonal = "SEASONAL" if rng.random() < 0.1 else "NOTSEASONAL"
+            name = f"{rng.choice(ADJECTIVES)} {category} {itemID[3:]}"
+            yield f"{itemID}:{name}:{price:.2f}:{rng.randint(0, 500)}:{seasonal}\n"
+
+    #Yields MEMBERS.txt lines with IDs made the same way MemberDatabase.generateID makes them
+    def generateMembers(self, count: int, memberIDs: list):
+        rng = self.__rng
+        counters = {}
+        for number in range(count):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            initials = first[0] + last[0]
+            counters[initials] = counters.get(initials, 0) + 1
+            if counters[initials] > 99999:
+                continue
+            memberID = f"{initials}{counters[initials]:05d}"
+            memberIDs.append(memberID)
+            #Most members have few points, a handful have a lot
+            points = int(rng.expovariate(1 / 600))
+            role = ["Apprentice", "Explorer", "Expert", "Master", "Legend"][min(points // 500, 4)]
+            yield f"{memberID}:{first} {last}:{first.lower()}.{last.lower()}{number}@example.com:{points}:{role}\n"
+
+    #Yields PURCHASE_HISTORY.txt lines over the last year, in date order, with popular items and frequent shoppers favoured
+    def generateHistory(self, count: int, memberIDs: list, itemIDs: list, days: int = 365):
+        rng = self.__rng
+        today = datetime.date.today()
+        for number in range(count):
+            date = (today - datetime.timedelta(days=days - 1 - number * days // max(count, 1))).isoformat()
+            memberID = memberIDs[int(len(memberIDs) * rng.random() ** 2)]
+            cart = {}
+            for _ in range(rng.randint(1, 8)):
+                itemID = itemIDs[int(len(itemIDs) * rng.random() ** 3)]
+                cart[itemID] = cart.get(itemID, 0) + rng.randint(1, 3)
+            items = ":".join(f"({itemID},{quantity})" for itemID, quantity in cart.items())
+            yield f"{memberID}:{date}:{items}\n"
+
+    #Writes INVENTORY.txt, MEMBERS.txt and PURCHASE_HISTORY.txt for a store of the given size into a directory
+    def generateStore(self, directory: str, items: int, members: int, historyLines: int) -> None:
+        os.makedirs(directory, exist_ok=True)
+        itemIDs = self.generateItemIDs(items)
+        writeLines(os.path.join(directory, "INVENTORY.txt"), self.generateItems(itemIDs))
+        memberIDs = []
+        writeLines(os.path.join(directory, "MEMBERS.txt"), self.generateMembers(members, memberIDs))
+        #Purchases need someone to buy something
+        historyLines = historyLines if memberIDs and itemIDs else 0
+        writeLines(os.path.join(directory, "PURCHASE_HISTORY.txt"), self.generateHistory(historyLines, memberIDs, itemIDs))
+        print(f"Generated {len(itemIDs)} items, {len(memberIDs)} members and {historyLines} history lines in '{directory}'.")
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.DataGenerator <directory> <items> <members> <history lines> [seed]
+    if len(sys.argv) < 5:
+        print("Usage: python -m Modules.DataGenerator <directory> <items> <members> <history lines> [seed]")
+        sys.exit(1)
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    DataGenerator(seed).generateStore(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
@@ -0,0 +1,56 @@
+import os
+import json
+import time
+from Modules.StorageUtils import BackgroundWriter
+
+class EventLog:
+    def __init__(self, filename: str, maxQueue: int = 10000, groupSize: int = 512, sync: bool = False):
+        self.__filename = filename
+        self.__file = open(filename, "a")
+        #With sync each group is forced to disk before the next, otherwise the operating system decides when
+        self.__sync = sync
+        self.__writer = BackgroundWriter(self.writeEvents, maxQueue, groupSize)
+
+    #Queues an event; it is written by the background writer, so the caller never waits on the disk
+    def record(self, eventType: str, **fields) -> None:
+        fields["time"] = time.time()
+        fields["type"] = eventType
+        self.__writer.put(fields)
+
+    #Writes a group of events as JSON lines in one go (runs on the writer thread)
+    def writeEvents(self, events: list) -> None:
+        self.__file.write("".join(json.dumps(event) + "\n" for event in events))
+        self.__file.flush()
+        if self.__sync:
+            os.fsync(self.__file.fileno())
+
+    #Waits until every queued event is in the file
+    def flush(self) -> None:
+        self.__writer.flush()
+
+    #Writes what is left and closes the file
+    def close(self) -> None:
+        self.flush()
+        self.__file.close()
+
+#The event log the system records to, if one is open
+eventLog = None
+
+#Opens the event log sales, stock changes, registrations and point changes are recorded to
+def openEventLog(filename: str, **options) -> EventLog:
+    global eventLog
+    closeEventLog()
+    eventLog = EventLog(filename, **options)
+    return eventLog
+
+#Closes the event log, writing any events still queued
+def closeEventLog() -> None:
+    global eventLog
+    if eventLog:
+        eventLog.close()
+        eventLog = None
+
+#Records an event if an event log is open
+def recordEvent(eventType: str, **fields) -> None:
+    if eventLog:
+        eventLog.record(eventType, **fields)
@@ -0,0 +1,37 @@
+import sys
+import time
+from Modules.InventoryManagement import Inventory
+from Modules.MembershipSystem import MemberDatabase, HISTORY_HORIZON_DAYS
+from Modules.RoyaltyProgram import MULTIPLIERS
+from Modules.Reconciliation import initWorker, sumPurchases
+
+class HistoryCompaction:
+    def __init__(self, inv: Inventory = None, memberDB: MemberDatabase = None, horizonDays: int = HISTORY_HORIZON_DAYS):
+        self.__inventory = inv if inv else Inventory()
+        self.__memberDB = memberDB if memberDB else MemberDatabase()
+        #Purchases older than this many days are rolled up; newer ones stay as dated history lines
+        self.__horizonDays = horizonDays
+
+    #Returns the points each member earned with purchases, worked out the same way Reconciliation does so its totals still add up
+    def getPoints(self, purchases: list) -> dict:
+        shards, _ = sumPurchases(purchases, 0)
+        return shards.get("", {})
+
+    #Rolls the purchases older than the horizon into the per-member aggregates, returning how many purchases and members were rolled up
+    def compact(self) -> dict:
+        start = time.perf_counter()
+        #Points are worked out in this process with the same helpers Reconciliation's workers use
+        initWorker({itemID: item["price"] for itemID, item in self.__inventory.getPrices().items()}, MULTIPLIERS)
+        report = self.__memberDB.compactHistory(self.__horizonDays, self.getPoints)
+        #Start up from the compacted history next time
+        self.__memberDB.saveSnapshot()
+        report["seconds"] = time.perf_counter() - start
+        return report
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.HistoryCompaction [horizon in days]
+    #Rewrites the history file, so run it while no till is open
+    horizonDays = int(sys.argv[1]) if len(sys.argv) > 1 else HISTORY_HORIZON_DAYS
+    report = HistoryCompaction(horizonDays=horizonDays).compact()
+    print(f"Rolled {report['purchases']} purchases from before {report['cutoff']} into the aggregates of "
+          f"{report['members']} members ({report['seconds']:.2f}s).")
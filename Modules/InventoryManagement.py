@@ -1,10 +1,33 @@
+import os
+import time
+import threading
+import itertools
+import contextlib
+from Modules.StorageUtils import WriteBehind, writeSnapshot, readSnapshot
+from Modules.StorageBackends import StorageBackend, TextStorage, STORAGE_DIRECTORY, formatItemLine
+from Modules.SharedStock import SharedStockTable
+from Modules.Console import say, DEBUG, WARNING
+from Modules.EventLog import recordEvent
+from Modules.RecordViews import CollectionView
+from Modules.CatalogIndex import CatalogIndex
+
+#Number of locks the items are spread over, so busy items don't block each other
+STOCK_LOCK_STRIPES = 64
+#How long a cart holds stock before it is given back
+HOLD_SECONDS = 900
+#How many items a page of the catalog listing shows
+PAGE_SIZE = 20
+
 class Item:
+    #Slots instead of a per-item __dict__, which matters with a million SKUs held in memory
+    __slots__ = ("__itemID", "__name", "__price", "__stock", "__seasonal")
+
     def __init__(self, itemID: str, name: str, price: float, stock: int,seasonal: bool):
         self.__itemID = itemID
         self.__name = name
         self.__price = price
         self.__stock = stock
-        self.__seasonal = seasonal  
+        self.__seasonal = seasonal
 
     def getItemId(self) -> str:
         return self.__itemID
@@ -25,117 +48,501 @@ class Item:
         if quantity >= 0:
             self.__stock = quantity
         else:
-            print("Quantity cannot be negative.")
+            say("Quantity cannot be negative.", WARNING)
     
     def setSeasonal(self, seasonal: bool) -> None:
         self.__seasonal = seasonal
 
+#The fields Inventory.getInventory and Inventory.getPrices show for each item, and the getters they are read with
+INVENTORY_FIELDS = {"name": Item.getName, "price": Item.getPrice, "stock": Item.getStock, "seasonal": Item.isSeasonal}
+PRICE_FIELDS = {"price": Item.getPrice, "stock": Item.getStock, "seasonal": Item.isSeasonal}
+
 class Inventory:
-    def __init__(self, inventoryFile: str = 'Storage\\INVENTORY.txt'):
-        self.__inventoryFile = inventoryFile
+    def __init__(self, inventoryFile: str = os.path.join(STORAGE_DIRECTORY, "INVENTORY.txt"), journalFile: str = None,
+                 journalLimit: int = 65536, writeBehind: bool = False, flushInterval: int = None, flushEvery: int = None,
+                 sharedStockFile: str = None, snapshotFile: str = None, storage: StorageBackend = None):
+        #Where the items are stored; by default the text inventory file, with stock changes journalled next to it
+        #and folded back in once the journal grows past journalLimit bytes
+        self.__storage = storage if storage else TextStorage(inventoryFile=inventoryFile, journalFile=journalFile,
+                                                             journalLimit=journalLimit, inventorySnapshotFile=snapshotFile)
         self.__items = {}
+        #Guards the items and cached data so several checkout lanes can share one inventory
+        self.__lock = threading.RLock()
+        #Reservations: per-item stock versions and active holds, guarded by striped per-item locks
+        self.__stockLocks = [threading.RLock() for _ in range(STOCK_LOCK_STRIPES)]
+        #Serialises writes to stored stock (the journal for the text files) and reloads, the only part of a stock change
+        #all items share. Taken after the main lock or the stock locks, never before them
+        self.__journalLock = threading.RLock()
+        self.__versions = {}
+        self.__holds = {}
+        self.__itemHolds = {}
+        self.__holdCounter = itertools.count(1)
+        #Signature of the stored items currently held in memory, False until the first load
+        self.__fileSignature = False
+        self.__cacheHits = 0
+        self.__cacheMisses = 0
+        #Read-only views over the items, shared by every POS, receipt and royalty program instead of copying the catalog
+        self.__inventoryView = CollectionView(lambda: self.__items, INVENTORY_FIELDS)
+        self.__pricesView = CollectionView(lambda: self.__items, PRICE_FIELDS)
+        #Search index over item names and IDs, built when the items are first loaded and kept up to date from then on
+        self.__catalogIndex = None
+        #In write-behind mode catalog edits are batched and written on flush() instead of straight away
+        self.__writeBehind = WriteBehind(lambda: self.saveItems(self.__writeBehind.getDirty()), flushInterval, flushEvery,
+                                         self.__lock) if writeBehind else None
+        #With a shared stock table the live stock levels are kept in a memory-mapped file that several till processes update in place
+        self.__sharedStock = SharedStockTable(sharedStockFile) if sharedStockFile else None
         self.loadItems()
 
-    #Load in all item information from the Inventory
+    #Returns the signature of the stored items (for the text files, those of the inventory file and its stock journal)
+    def getSignature(self):
+        return self.__storage.getItemsSignature()
+
+    #Returns the storage backend the items are kept in
+    def getStorage(self) -> StorageBackend:
+        return self.__storage
+
+    #Load in all item information from the Inventory, re-reading only if the stored items changed since the last load
     def loadItems(self) -> None:
-        try:
-            with open(self.__inventoryFile, 'r') as file:
-                for line in file:
-                    line = line.strip()
-                    if line:    
-                        itemID, name, price, quantity, seasonal = line.split(':')
-                        self.__items[itemID] = Item(itemID, name, float(price), int(quantity), seasonal == "SEASONAL")
-        except FileNotFoundError:
-            print(f"File '{self.__inventoryFile}' not found. Starting with an empty inventory.")
-
-    #Returns a dictionary of all the inventory items
-    def getInventory(self) -> dict[dict]:
-        self.loadItems()
-        data = {}
-        for itemID, item in self.__items.items():
-            data[itemID] = {
-                "name": item._Item__name,
-                "price": item._Item__price,
-                "stock": item._Item__stock,
-                "seasonal": item._Item__seasonal
-            }
-        return data
+        with self.__lock, self.__journalLock:
+            #Unflushed edits in memory are newer than anything on disk
+            if self.__writeBehind:
+                self.__writeBehind.checkInterval()
+                if self.__writeBehind.isDirty():
+                    self.__cacheHits += 1
+                    return
+
+            signature = self.getSignature()
+            if signature == self.__fileSignature:
+                self.__cacheHits += 1
+                return
+
+            self.__cacheMisses += 1
+            self.__fileSignature = signature
+            #A snapshot taken from exactly these files already holds the parsed items
+            snapshotFile = self.__storage.getSnapshotFile("items")
+            items = readSnapshot(snapshotFile, lambda snapshotSignature: snapshotSignature == signature) if snapshotFile else None
+            previousItems = self.__items
+            if items is not None:
+                self.__items = items
+            else:
+                self.__items = {record[0]: Item(*record) for record in self.__storage.readItems()}
+            if self.__catalogIndex:
+                self.updateCatalogIndex(previousItems)
+            else:
+                #Built with the items, so the first cashier search doesn't wait on it
+                catalogIndex = CatalogIndex(lambda itemID: self.__items[itemID].getName())
+                catalogIndex.build(self.__items)
+                self.__catalogIndex = catalogIndex
+
+            #Stock may have changed underneath any open holds, so they must be re-checked on commit
+            for itemID in self.__items:
+                self.__versions[itemID] = self.__versions.get(itemID, 0) + 1
+
+            if self.__sharedStock:
+                self.__sharedStock.addItems({itemID: item.getStock() for itemID, item in self.__items.items()})
+                self.syncSharedStock()
+
+    #Saves the parsed items with the signature of the files they came from, for a fast start next time
+    def saveSnapshot(self) -> None:
+        with self.__lock:
+            self.flush()
+            snapshotFile = self.__storage.getSnapshotFile("items")
+            if not snapshotFile or self.__fileSignature != self.getSignature():
+                return
+            writeSnapshot(snapshotFile, self.__fileSignature, self.__items)
+
+    #Copies the live stock levels from the shared stock table into the loaded items
+    def syncSharedStock(self) -> None:
+        if not self.__sharedStock:
+            return
+        with self.__lock:
+            for itemID, stock in self.__sharedStock.getAllStock().items():
+                item = self.__items.get(itemID)
+                if item and item.getStock() != stock:
+                    item.setStock(stock)
+
+    #Returns how many loads were served from memory and how many had to re-parse the file
+    def getCacheStats(self) -> dict:
+        return {"hits": self.__cacheHits, "misses": self.__cacheMisses}
+
+    #Returns a read-only view of all the inventory items ({itemID: {"name", "price", "stock", "seasonal"}}), read live from the items
+    def getInventory(self) -> CollectionView:
+        with self.__lock:
+            self.loadItems()
+            self.syncSharedStock()
+            return self.__inventoryView
     
-    #Returns a dictionary of all items and their price/stock level
-    def getPrices(self) -> dict[dict]:
-        self.loadItems()
-        data = {}
-        for itemID, item in self.__items.items():
-            data[itemID] = {
-                "price": item._Item__price,
-                "stock": item._Item__stock,
-                "seasonal": item._Item__seasonal
-            }
-        return data
+    #Returns a read-only view of all items and their price/stock level
+    def getPrices(self) -> CollectionView:
+        with self.__lock:
+            self.loadItems()
+            self.syncSharedStock()
+            return self.__pricesView
     
-    #Saves the current inventory back to the INVENTORY.txt file.
-    def saveItems(self) -> None:
-        with open(self.__inventoryFile, 'w') as file:
-            for item in self.__items.values():
-                # Check if the item is seasonal and write to file
-                seasonalStatus = "SEASONAL" if item.isSeasonal() else "NOTSEASONAL"
-                file.write(f"{item.getItemId()}:{item.getName()}:{item.getPrice():.2f}:{item.getStock()}:{seasonalStatus}\n")
-        print("Items saved successfully!")
+    #Saves the current inventory back to storage. itemIDs, if given, are the only items that changed
+    #(the text files are always rewritten in full, which also folds the stock journal in)
+    def saveItems(self, itemIDs: set = None) -> None:
+        with self.__lock, self.__journalLock:
+            self.syncSharedStock()
+            self.__storage.writeItems(self.__items, itemIDs)
+            if self.__writeBehind:
+                self.__writeBehind.markClean()
+
+            #The stored items now match memory, so there is no need to re-parse our own write
+            self.__fileSignature = self.getSignature()
+            say("Items saved successfully!", DEBUG)
+
+    #Returns the line an item is stored as in the inventory file
+    def formatItem(self, item: Item) -> str:
+        return formatItemLine(item)
+
+    #Adds many new items at once by appending them to storage, skipping IDs that already exist. Returns the items added
+    def appendItems(self, items: list) -> list:
+        with self.__lock:
+            self.loadItems()
+            #Batched edits must be on disk first, or the next full save would be built on top of the wrong file
+            self.flush()
+            newItems = {}
+            for item in items:
+                if item.getItemId() not in self.__items and item.getItemId() not in newItems:
+                    newItems[item.getItemId()] = item
+            if not newItems:
+                return []
+
+            self.__storage.addItems(list(newItems.values()))
+
+            self.__items.update(newItems)
+            for itemID, item in newItems.items():
+                self.__versions[itemID] = self.__versions.get(itemID, 0) + 1
+                if self.__catalogIndex:
+                    self.__catalogIndex.addItem(itemID, item.getName())
+            if self.__sharedStock:
+                self.__sharedStock.addItems({itemID: item.getStock() for itemID, item in newItems.items()})
+            #Storage now matches memory, so there is no need to re-read our own write
+            self.__fileSignature = self.getSignature()
+            return list(newItems.values())
+
+    #Saves a changed item now, or marks it dirty to be saved with the next batch in write-behind mode
+    def persistChange(self, itemID: str) -> None:
+        if self.__writeBehind:
+            self.__writeBehind.markDirty(itemID)
+        else:
+            self.saveItems({itemID})
+
+    #Writes any batched changes to storage
+    def flush(self) -> None:
+        with self.__lock:
+            if self.__writeBehind:
+                self.__writeBehind.flush()
+
+    #Writes any batched changes, stops batching and closes the shared stock table; the inventory shouldn't be used afterwards
+    def close(self) -> None:
+        with self.__lock:
+            if self.__writeBehind:
+                self.__writeBehind.close()
+            if self.__sharedStock:
+                self.__sharedStock.close()
+                self.__sharedStock = None
 
     #Edits the seasonal status of an item.
     def editSeasonalStatus(self, itemID: str, seasonal: bool) -> None:
-        if itemID in self.__items:
-            self.__items[itemID].setSeasonal(seasonal)
-            self.saveItems()
-            print(f"Seasonal status of item {itemID} updated to {'SEASONAL' if seasonal else 'NOTSEASONAL'}.")
-        else:
-            print(f"Item with ID {itemID} does not exist.")
+        with self.__lock:
+            if itemID in self.__items:
+                self.__items[itemID].setSeasonal(seasonal)
+                self.persistChange(itemID)
+                say(f"Seasonal status of item {itemID} updated to {'SEASONAL' if seasonal else 'NOTSEASONAL'}.")
+            else:
+                say(f"Item with ID {itemID} does not exist.", WARNING)
 
     #Adds a new item to the inventory.
     def addItem(self, item: Item) -> None:
-        if item._Item__itemID in self.__items:
-            print(f"Item with ID {item._Item__itemID} already exists.")
-        else:
-            self.__items[item._Item__itemID] = item
-            self.saveItems()
-            print(f"Item {item._Item__name} added successfully.")
+        with self.__lock:
+            if item.getItemId() in self.__items:
+                say(f"Item with ID {item.getItemId()} already exists.", WARNING)
+            else:
+                self.__items[item.getItemId()] = item
+                if self.__catalogIndex:
+                    self.__catalogIndex.addItem(item.getItemId(), item.getName())
+                self.persistChange(item.getItemId())
+                say(f"Item {item.getName()} added successfully.")
 
     #Removes an item from the inventory based on the item ID.
     def removeItem(self, itemID: str) -> None:
-        if itemID in self.__items:
-            del self.__items[itemID]
-            self.saveItems()
-            print(f"Item with ID {itemID} removed successfully.")
-        else:
-            print(f"Item with ID {itemID} does not exist.")
-
-    #Updates the stock level for a specified item.
-    def updateStock(self, updatedStockInfo: dict) -> None:
-        for itemID, updatedStock in updatedStockInfo.items():
+        #The item's stock lock comes first, the same order stock changes take the locks in
+        with self.lockItems([itemID]), self.__lock:
             if itemID in self.__items:
-                self.__items[itemID].setStock(updatedStock)
-                print(f"Stock for item with ID {itemID} updated successfully to {updatedStock}.")
+                if self.__catalogIndex:
+                    self.__catalogIndex.removeItem(itemID, self.__items[itemID].getName())
+                del self.__items[itemID]
+                #Holds on a removed item can never be committed, so they are released instead of counting as held for good
+                for holdID in self.__itemHolds.pop(itemID, ()):
+                    self.__holds.pop(holdID, None)
+                self.__versions.pop(itemID, None)
+                self.persistChange(itemID)
+                say(f"Item with ID {itemID} removed successfully.")
             else:
-                print(f"Item with ID {itemID} does not exist.")
+                say(f"Item with ID {itemID} does not exist.", WARNING)
+
+    #Returns a context manager holding the stock locks for the given items (always taken in the same order)
+    def lockItems(self, itemIDs) -> contextlib.ExitStack:
+        locks = contextlib.ExitStack()
+        for stripe in sorted({hash(itemID) % STOCK_LOCK_STRIPES for itemID in itemIDs}):
+            locks.enter_context(self.__stockLocks[stripe])
+        return locks
+
+    #Updates the stock level for a specified item in storage (the stock journal for the text files) or the shared stock table.
+    #Only the items' stock locks are held while they change, so sales of items on other stripes carry on meanwhile
+    def updateStock(self, updatedStockInfo: dict) -> None:
+        with self.lockItems(updatedStockInfo):
+            items = self.__items
+            records = {}
+            changes = {}
+            for itemID, updatedStock in updatedStockInfo.items():
+                if itemID in items:
+                    previousStock = items[itemID].getStock()
+                    items[itemID].setStock(updatedStock)
+                    self.__versions[itemID] = self.__versions.get(itemID, 0) + 1
+                    records[itemID] = items[itemID].getStock()
+                    changes[itemID] = records[itemID] - previousStock
+                    recordEvent("stock", itemID=itemID, stock=items[itemID].getStock())
+                    say(f"Stock for item with ID {itemID} updated successfully to {updatedStock}.", DEBUG)
+                else:
+                    say(f"Item with ID {itemID} does not exist.", WARNING)
         
-        self.saveItems()
-
-    #Lists all items with their current stock levels.
-    def listItems(self) -> None:
-        if self.__items:
-            print("Inventory Items:")
-            for item in self.__items.values():
-                print(f"ID: {item.getItemId()}, Name: {item.getName()}, Price: {item.getPrice():.2f}, Stock: {item.getStock()}")
+            if not records:
+                return
+
+            #The shared table gets the change from the level this till last saw, applied under its record locks,
+            #so sales other processes made meanwhile aren't overwritten
+            if self.__sharedStock:
+                if not self.__sharedStock.adjustStock(changes):
+                    say("Stock was sold by another till meanwhile and can't go that low. Nothing was changed.", WARNING)
+                for itemID in records:
+                    items[itemID].setStock(self.getStockLevel(itemID))
+                return
+
+            #The same goes for a backend that adds the change to the stored level itself
+            if self.__storage.appliesChanges():
+                if not self.adjustStoredStock(changes):
+                    say("Stock was sold by another till meanwhile and can't go that low. Nothing was changed.", WARNING)
+                return
+
+            with self.__journalLock:
+                self.__storage.writeStock(records)
+                #A reload may have swapped the items in before the write, in which case the new levels go on the new items too
+                if items is not self.__items:
+                    for itemID, stock in records.items():
+                        if itemID in self.__items:
+                            self.__items[itemID].setStock(stock)
+                self.__fileSignature = self.getSignature()
+
+        if self.__storage.needsCompaction():
+            self.compactJournal()
+
+    #Adds (or with negative amounts removes) stock for several items in one step. Fails without changing anything if any item would go below zero
+    def changeStock(self, changes: dict) -> bool:
+        with self.lockItems(changes):
+            for itemID in changes:
+                if itemID not in self.__items:
+                    return False
+
+            #The shared table checks and applies the change under its record locks, so other processes can't interleave
+            if self.__sharedStock:
+                if not self.__sharedStock.adjustStock(changes):
+                    return False
+                for itemID in changes:
+                    self.__items[itemID].setStock(self.getStockLevel(itemID))
+                    recordEvent("stock", itemID=itemID, stock=self.__items[itemID].getStock())
+                return True
+
+            #A backend that applies changes checks them against the stored levels in the same transaction
+            if self.__storage.appliesChanges():
+                if not self.adjustStoredStock(changes):
+                    return False
+                for itemID in changes:
+                    recordEvent("stock", itemID=itemID, stock=self.__items[itemID].getStock())
+                return True
+
+            updatedStockInfo = {itemID: self.__items[itemID].getStock() + change for itemID, change in changes.items()}
+            if min(updatedStockInfo.values(), default=0) < 0:
+                return False
+            self.updateStock(updatedStockInfo)
+            return True
+
+    #Adds stock changes to the stored levels through the backend, which checks them against what other tills stored meanwhile,
+    #and takes the stored levels back into the items either way. Returns whether the changes were applied
+    def adjustStoredStock(self, changes: dict) -> bool:
+        with self.__journalLock:
+            applied, levels = self.__storage.adjustStock(changes)
+            for itemID, stock in levels.items():
+                item = self.__items.get(itemID)
+                if item and item.getStock() != stock:
+                    item.setStock(stock)
+                    self.__versions[itemID] = self.__versions.get(itemID, 0) + 1
+            if applied:
+                self.__fileSignature = self.getSignature()
+            return applied
+
+    #Returns the current stock level of an item (read live from the shared stock table when one is used)
+    def getStockLevel(self, itemID: str) -> int:
+        if self.__sharedStock:
+            record = self.__sharedStock.getRecord(itemID)
+            if record:
+                return record[0]
+        item = self.__items.get(itemID)
+        return item.getStock() if item else 0
+
+    #Returns the version of an item's stock level, which goes up every time the stock changes
+    def getVersion(self, itemID: str) -> int:
+        if self.__sharedStock:
+            record = self.__sharedStock.getRecord(itemID)
+            if record:
+                return record[1]
+        return self.__versions.get(itemID, 0)
+
+    #Returns how many units of an item are held by live holds, forgetting holds abandoned long ago
+    def getHeldStock(self, itemID: str, now: float = None) -> int:
+        now = now if now else time.monotonic()
+        held = 0
+        with self.lockItems([itemID]):
+            for holdID in list(self.__itemHolds.get(itemID, ())):
+                hold = self.__holds[holdID]
+                if hold["expires"] > now:
+                    held += hold["quantity"]
+                elif hold["expires"] + HOLD_SECONDS <= now:
+                    self.releaseReservation(holdID)
+        return held
+
+    #Returns how many units of an item can still be sold once active holds are taken out
+    def getAvailableStock(self, itemID: str) -> int:
+        with self.lockItems([itemID]):
+            if itemID not in self.__items:
+                return 0
+            return self.getStockLevel(itemID) - self.getHeldStock(itemID)
+
+    #Holds a quantity of an item for a cart until it is committed, released or the hold expires. Returns the hold ID
+    def reserveStock(self, itemID: str, quantity: int, holdSeconds: float = HOLD_SECONDS) -> str | None:
+        if quantity < 1:
+            return None
+        with self.lockItems([itemID]):
+            if self.getAvailableStock(itemID) < quantity:
+                return None
+            holdID = str(next(self.__holdCounter))
+            self.__holds[holdID] = {
+                "item": itemID,
+                "quantity": quantity,
+                "expires": time.monotonic() + holdSeconds,
+                "version": self.getVersion(itemID)
+            }
+            self.__itemHolds.setdefault(itemID, set()).add(holdID)
+            return holdID
+
+    #Gives a held quantity back so other carts can use it
+    def releaseReservation(self, holdID: str) -> None:
+        hold = self.__holds.get(holdID)
+        if hold is None:
+            return
+        with self.lockItems([hold["item"]]):
+            if self.__holds.pop(holdID, None):
+                self.__itemHolds[hold["item"]].discard(holdID)
+
+    #Turns holds into a sale in one step. Fails without changing anything if any hold can no longer be honoured
+    def commitReservations(self, holdIDs: list) -> bool:
+        holds = {}
+        for holdID in holdIDs:
+            if holdID not in self.__holds:
+                return False
+            holds[holdID] = self.__holds[holdID]
+
+        with self.lockItems(hold["item"] for hold in holds.values()):
+            now = time.monotonic()
+            sold = {}
+            for holdID, hold in holds.items():
+                itemID = hold["item"]
+                if holdID not in self.__holds or itemID not in self.__items:
+                    return False
+                sold[itemID] = sold.get(itemID, 0) + hold["quantity"]
+
+                #A live hold on an unchanged item is guaranteed, anything else is re-checked against current stock
+                if hold["expires"] <= now or hold["version"] != self.getVersion(itemID):
+                    ownHeld = sum(h["quantity"] for h in holds.values() if h["item"] == itemID and h["expires"] > now)
+                    otherHeld = self.getHeldStock(itemID, now) - ownHeld
+                    if self.getStockLevel(itemID) - otherHeld < sold[itemID]:
+                        return False
+
+            if not self.changeStock({itemID: -quantity for itemID, quantity in sold.items()}):
+                return False
+            for holdID in holds:
+                self.releaseReservation(holdID)
+            return True
+
+    #Removes the purchased quantities from stock in one step, taking nothing if any item is short
+    def takeStock(self, purchasedItems: dict) -> bool:
+        with self.lockItems(purchasedItems):
+            for itemID, quantity in purchasedItems.items():
+                if not self.isInStock(itemID, quantity):
+                    return False
+            return self.changeStock({itemID: -quantity for itemID, quantity in purchasedItems.items()})
+
+    #Puts quantities back into stock, e.g. when an item is removed from a cart
+    def returnStock(self, returnedItems: dict) -> None:
+        self.changeStock({itemID: quantity for itemID, quantity in returnedItems.items() if itemID in self.__items})
+
+    #Folds the stock journal back into the inventory file (done automatically past the size limit and at close of day)
+    def compactJournal(self) -> None:
+        with self.__lock:
+            if self.__storage.hasPendingStock() or self.__sharedStock:
+                self.saveItems()
+                self.saveSnapshot()
+
+    #Returns the catalog search index, brought up to date with any items stored since the last load
+    def getCatalogIndex(self) -> CatalogIndex:
+        with self.__lock:
+            self.loadItems()
+            return self.__catalogIndex
+
+    #Brings the search index in line with freshly loaded items, re-indexing only the items added, removed or renamed
+    #(most reloads only pick up other tills' stock changes)
+    def updateCatalogIndex(self, previousItems: dict) -> None:
+        for itemID in previousItems.keys() - self.__items.keys():
+            self.__catalogIndex.removeItem(itemID, previousItems[itemID].getName())
+        for itemID, item in self.__items.items():
+            previous = previousItems.get(itemID)
+            if previous is None:
+                self.__catalogIndex.addItem(itemID, item.getName())
+            elif previous.getName() != item.getName():
+                self.__catalogIndex.removeItem(itemID, previous.getName())
+                self.__catalogIndex.addItem(itemID, item.getName())
+
+    #Returns one page of the IDs of items whose name or ID matches the query (every item for an empty one),
+    #and how many match in total
+    def searchItems(self, query: str = "", offset: int = 0, limit: int = PAGE_SIZE) -> tuple[list, int]:
+        with self.__lock:
+            return self.getCatalogIndex().getPage(query, offset, limit)
+
+    #Lists one page of the items matching the query with their current stock levels, returning how many match in total
+    def listItems(self, query: str = "", page: int = 0, pageSize: int = PAGE_SIZE) -> int:
+        self.syncSharedStock()
+        itemIDs, total = self.searchItems(query, page * pageSize, pageSize)
+        if itemIDs:
+            print(f"Inventory Items ({page * pageSize + 1}-{page * pageSize + len(itemIDs)} of {total}):")
+            for itemID in itemIDs:
+                item = self.__items.get(itemID)
+                if item:
+                    print(f"ID: {item.getItemId()}, Name: {item.getName()}, Price: {item.getPrice():.2f}, Stock: {item.getStock()}")
+        elif total:
+            print("No more items.")
         else:
-            print("No items in inventory.")
+            print("No items found." if query else "No items in inventory.")
+        return total
 
     #Checks if an item is in invrntory
     def isItem(self, itemID: str) -> bool:
         return itemID in self.__items
     
-    #Checks if an item is in stock
+    #Checks if an item is in stock, leaving out units held by other carts
     def isInStock(self, itemID: str, quantity: int) -> bool:
         if itemID in self.__items:
-            return self.__items[itemID].getStock() >= quantity
+            return self.getAvailableStock(itemID) >= quantity
         else:
             return False
\ No newline at end of file
@@ -1,14 +1,42 @@
-from datetime import datetime
+import os
+import threading
+from datetime import datetime, timedelta
+from collections import Counter
+from Modules.StorageUtils import WriteBehind, BackgroundWriter, writeSnapshot, readSnapshot
+from Modules.StorageBackends import StorageBackend, TextStorage, STORAGE_DIRECTORY, formatMemberLine, parsePurchaseItems
+from Modules.Console import say, DEBUG, INFO, WARNING, ERROR
+from Modules.EventLog import recordEvent
+from Modules.RecordViews import CollectionView
+
+#Purchases older than this many days are rolled up into per-member aggregates by compactHistory
+HISTORY_HORIZON_DAYS = 365
+
+#Returns the role a number of points earns
+def getValidRole(points: int) -> str:
+    if points < 500:
+        return "Apprentice"
+    elif points < 1000:
+        return "Explorer"
+    elif points < 1500:
+        return "Expert"
+    elif points < 2000:
+        return "Master"
+    return "Legend"
 
 class Member:
+    #The roles are the same for everyone, so they are kept once on the class
+    ROLES = ("Apprentice", "Explorer", "Expert", "Master", "Legend")
+    #Slots instead of a per-member __dict__, which matters with a million members held in memory
+    __slots__ = ("__memberId", "__name", "__email", "__history", "__points", "__role")
+
     def __init__(self, memberID: str, name: str, email: str, role: str, points: int=0):
         self.__memberId = memberID
         self.__name = name
         self.__email = email
-        self.__history = {}
+        #Created on the first purchase added to the member, since most members never have one in memory
+        self.__history = None
         self.__points = points
         self.__role = role
-        self.__roles = ["Apprentice", "Explorer", "Expert", "Master", "Legend"]
     
     #Returns the Customer's ID
     def getId(self) -> str:
@@ -30,6 +58,10 @@ class Member:
     def getRole(self) -> str:
         return self.__role
     
+    #Returns The Customer's Purchase History
+    def getHistory(self) -> dict:
+        return self.__history if self.__history is not None else {}
+
     #Returns The Customer's Full Information
     def getMember(self) -> dict:
         return {
@@ -38,7 +70,7 @@ class Member:
                 "email": self.__email, 
                 "points": self.__points, 
                 "role": self.__role, 
-                "history": self.__history 
+                "history": self.getHistory() 
             }
         }
     
@@ -48,23 +80,27 @@ class Member:
             self.__name = name
         if email:
             self.__email = email
-        if role in self.__roles:
+        if role in self.ROLES:
             self.__role = role
+        elif role:
+            say(f"Error: The role '{role}' does not exist! Available roles are: {list(self.ROLES)}", WARNING)
         #We Never Set Points Only Add
         if points:
             self.__points += points
-        else:
-            print(f"Error: The role '{role}' does not exist! Available roles are: {self.__roles}")
     
     #Edits The History For All Members
     def addPurchaseHistory(self, date: str, history: dict) -> None:
+        if self.__history is None:
+            self.__history = {}
         if not (date in self.__history):
             self.__history[date] = history
         else:
-            print("Error In Saving History")
+            say("Error In Saving History", WARNING)
 
     #Add A Recent Purchase To a Customer's History
     def addPurchase(self, cart: dict,points: int) -> None:
+        if self.__history is None:
+            self.__history = {}
         for date, items in cart.items():
             if date not in self.__history:
                 self.__history[date] = {}
@@ -84,32 +120,108 @@ class Member:
         self.__history = data["history"]
         return member       
     
+#The fields MemberDatabase.getAllMembers shows for each member, and the getters they are read with
+MEMBER_FIELDS = {"name": Member.getName, "email": Member.getEmail, "role": Member.getRole, "points": Member.getPoints,
+                 "history": Member.getHistory}
+
+#Returns a key that is the same for purchases on the same date of the same items, whatever order they were listed in
+def getPurchaseKey(date: str, items: dict) -> int:
+    return hash((date, frozenset(items.items())))
+
 class MemberDatabase:
-    def __init__(self, filename: str="Storage\\MEMBERS.txt", historyFile: str="Storage\\PURCHASE_HISTORY.txt") -> None:
-        self.__filename = filename
-        self.__historyFile = historyFile
+    def __init__(self, filename: str=os.path.join(STORAGE_DIRECTORY, "MEMBERS.txt"),
+                 historyFile: str=os.path.join(STORAGE_DIRECTORY, "PURCHASE_HISTORY.txt"),
+                 writeBehind: bool=False, flushInterval: int=None, flushEvery: int=None, historyIndexFile: str=None,
+                 groupCommit: bool=False, storage: StorageBackend=None, snapshotFile: str=None, historySnapshotFile: str=None) -> None:
+        #Where members and history are stored; by default the text files, with a sidecar index of where each member's history lines are
+        #and snapshots of the parsed members and history (next to the files unless given)
+        self.__storage = storage if storage else TextStorage(membersFile=filename, historyFile=historyFile, historyIndexFile=historyIndexFile,
+                                                             membersSnapshotFile=snapshotFile, historySnapshotFile=historySnapshotFile)
+        #Signature of the stored members the loaded members came from, so unchanged members aren't read again
+        self.__membersSignature = False
         self.__history = {}
+        #Every item ID each member has ever bought, kept up to date as purchases are loaded and saved
+        self.__purchasedItems = {}
+        #Per-member totals of the purchases compactHistory rolled up (None until the history is first loaded)
+        self.__aggregates = None
         self.__members= {}
+        #Read-only view over the members, so listing them doesn't copy every member
+        self.__membersView = CollectionView(lambda: self.__members, MEMBER_FIELDS)
+        #Highest ID number used per initials, and lookups by (name, email) and by email, kept up to date on every change
+        self.__idCounters = {}
+        self.__memberKeys = {}
+        self.__emailIndex = {}
+        #Points each member gained since they were last stored, which a backend that applies changes adds to the stored points
+        self.__pointChanges = {}
+        #Guards members and history so several checkout lanes can share one database
+        self.__lock = threading.RLock()
+        #In write-behind mode registrations and edits are batched and written on flush() instead of straight away
+        self.__writeBehind = WriteBehind(lambda: self.saveMembers(self.__writeBehind.getDirty()), flushInterval, flushEvery,
+                                         self.__lock) if writeBehind else None
+        #With group commit, checkouts only queue their history lines and a background thread appends them in batches
+        self.__historyWriter = BackgroundWriter(self.writePurchases) if groupCommit else None
         self.loadMembers()
+        self.loadHistorySnapshot()
         self.loadHistory()
+        self.loadHistoryIndex()
     
     #Load All Customers' From Database File
     def loadMembers(self) -> None:
-        self.__members = {}
-        try:
-            with open(self.__filename, "r") as file:
-                for line in file:
-                    memberData = line.strip().split(":")
-                    memberID = memberData[0]
-                    name = memberData[1]
-                    email = memberData[2]
-                    points = int(memberData[3])
-                    role = memberData[4]
+        with self.__lock:
+            #Unflushed changes in memory are newer than anything on disk
+            if self.__writeBehind:
+                self.__writeBehind.checkInterval()
+                if self.__writeBehind.isDirty():
+                    return
 
+            signature = self.__storage.getMembersSignature()
+            if signature is not None and signature == self.__membersSignature:
+                return
+            self.__membersSignature = signature
+
+            #A snapshot taken from exactly this file already holds the parsed members and indexes
+            snapshotFile = self.__storage.getSnapshotFile("members")
+            snapshot = readSnapshot(snapshotFile, lambda snapshotSignature: snapshotSignature == signature) if snapshotFile else None
+            if snapshot is not None:
+                self.__members, self.__idCounters, self.__memberKeys, self.__emailIndex = snapshot
+            else:
+                self.__members = {}
+                self.__idCounters = {}
+                self.__memberKeys = {}
+                self.__emailIndex = {}
+                for memberID, name, email, points, role in self.__storage.readMembers():
                     self.__members[memberID] = Member(memberID, name, email, role, points)
+                    self.indexMember(memberID)
+            #Deleted members are no longer stored, so the highest numbers they took come from the stored counters
+            for initials, number in self.__storage.readIDCounters().items():
+                self.__idCounters[initials] = max(self.__idCounters.get(initials, 0), number)
+
+    #Adds a member to the ID counters and lookup indexes
+    def indexMember(self, memberID: str) -> None:
+        member = self.__members[memberID]
+        initials, number = memberID[:-5], memberID[-5:]
+        if number.isdigit():
+            self.__idCounters[initials] = max(self.__idCounters.get(initials, 0), int(number))
+        self.__memberKeys[(member.getName(), member.getEmail())] = memberID
+        self.__emailIndex.setdefault(member.getEmail(), set()).add(memberID)
 
-        except FileNotFoundError:
-            print(f"File '{self.__filename}' not found. Starting with an empty member list.")
+    #Removes a member from the lookup indexes (ID counters never go down, and deleteMember stores them, so deleted IDs aren't handed out again)
+    def unindexMember(self, memberID: str) -> None:
+        member = self.__members[memberID]
+        if self.__memberKeys.get((member.getName(), member.getEmail())) == memberID:
+            del self.__memberKeys[(member.getName(), member.getEmail())]
+        members = self.__emailIndex.get(member.getEmail(), set())
+        members.discard(memberID)
+        if not members:
+            self.__emailIndex.pop(member.getEmail(), None)
+
+    #Returns the ID of the member with this name and email, if there is one
+    def findMember(self, name: str, email: str) -> str | None:
+        return self.__memberKeys.get((name, email))
+
+    #Returns the IDs of all members registered with an email
+    def findMembersByEmail(self, email: str) -> set:
+        return set(self.__emailIndex.get(email, ()))
 
     #Creates a New Customer on our system
     def processNewMember(self) -> str:
@@ -150,12 +262,7 @@ class MemberDatabase:
     
     #parse purchase item into dictionary of item ID and amount
     def parseItems(self, items: list) -> dict:
-        history = {}
-        for item in items:
-            item = item.strip("()")
-            itemID, amount = item.split(",")
-            history[itemID.strip()] = int(amount.strip())
-        return history
+        return parsePurchaseItems(items)
     
     #combines header and item parsing
     def parseHistoryLine(self, line: str) -> tuple[str, str, dict]:
@@ -164,74 +271,292 @@ class MemberDatabase:
         return memberID, date, history 
     
     #Load All Customers' Purchase History
+    #Only the purchases added since the last call are read, unless the history was replaced. Purchases older than the
+    #compaction horizon are only kept as per-member aggregates, so this holds the recent dated purchases
     def loadHistory(self) -> dict:
-        self.__history = {}
-        try:
-            with open(self.__historyFile, "r") as file:
-                for line in file:
-                    memberID, date, history = self.parseHistoryLine(line)
-                    if memberID not in self.__history:
-                        self.__history[memberID] = {}
-                    self.__history[memberID][date] = history
-                
-            print("History loaded successfully!")
-        
-        except FileNotFoundError:
-            print(f"File '{self.__historyFile}' not found. Starting with an empty purchase history.")
-        return self.__history
-
-    #Display All Members Information from the Database File
-    def getAllMembers(self) -> dict:
-        self.loadMembers() 
-        data = {}
-        for memberID, member in self.__members.items():
-            data[memberID] = {
-                "name": member.getName(),
-                "email": member.getEmail(),
-                "role": member.getRole(),
-                "points": member.getPoints(),
-                "history": member._Member__history
-            }
-        return data
+        with self.__lock:
+            reset, purchases = self.__storage.readPurchases()
+            if reset or self.__aggregates is None:
+                self.__history = {}
+                self.__purchasedItems = {}
+                self.__aggregates = self.__storage.readAggregates()
+                for memberID, aggregate in self.__aggregates.items():
+                    self.addPurchasedItems(memberID, aggregate["items"])
+            for memberID, date, history in purchases:
+                if memberID not in self.__history:
+                    self.__history[memberID] = {}
+                self.__history[memberID][date] = history
+                self.addPurchasedItems(memberID, history)
+            #A replaced history (e.g. compacted by another process) also invalidates where the index says its lines are
+            if reset:
+                self.loadHistoryIndex()
+            say("History loaded successfully!", DEBUG)
+            return self.__history
+
+    #Restores the parsed history (and the storage's read position and index) from the last snapshot, if it still matches storage
+    def loadHistorySnapshot(self) -> None:
+        with self.__lock:
+            snapshotFile = self.__storage.getSnapshotFile("history")
+            snapshot = readSnapshot(snapshotFile, self.__storage.isHistoryStateValid) if snapshotFile else None
+            if snapshot is not None:
+                state, self.__history, self.__purchasedItems, self.__aggregates = snapshot
+                self.__storage.setHistoryState(state)
+
+    #Load the history index, picking up any purchases added since it was written
+    def loadHistoryIndex(self) -> None:
+        with self.__lock:
+            for memberID, items in self.__storage.loadHistoryIndex():
+                self.addPurchasedItems(memberID, items)
+
+    #Indexes purchases added after the indexed part of the history (including those other writers appended)
+    def indexHistoryLines(self) -> None:
+        with self.__lock:
+            for memberID, items in self.__storage.indexPurchases():
+                self.addPurchasedItems(memberID, items)
+
+    #Returns the path of the purchase history file (None if the storage doesn't keep one)
+    def getHistoryFile(self) -> str | None:
+        return self.__storage.getHistoryFile()
+
+    #Returns the storage backend members and history are kept in
+    def getStorage(self) -> StorageBackend:
+        return self.__storage
+
+    #Yields every purchase as (memberID, date, {itemID: quantity}) in the order they were made, without loading them all
+    def readAllPurchases(self):
+        self.flush()
+        return self.__storage.readAllPurchases()
+
+    #Adds the items of a purchase to the member's set of previously bought items
+    def addPurchasedItems(self, memberID: str, items: dict) -> None:
+        if memberID not in self.__purchasedItems:
+            self.__purchasedItems[memberID] = set()
+        self.__purchasedItems[memberID].update(items)
+
+    #Returns the set of every item ID a member has bought (the live set, so it must not be changed)
+    def getPurchasedItems(self, memberID: str) -> set:
+        with self.__lock:
+            self.indexHistoryLines()
+            return self.__purchasedItems.get(memberID, set())
+
+    #Returns every member's aggregate of compacted purchases ({memberID: {"first", "last", "purchases", "points", "items"}}),
+    #the live dictionary, so it must not be changed
+    def getAggregates(self) -> dict:
+        with self.__lock:
+            return self.__aggregates
+
+    #Returns the aggregate of a member's compacted purchases (None if none were compacted)
+    def getMemberAggregate(self, memberID: str) -> dict | None:
+        with self.__lock:
+            return self.__aggregates.get(memberID)
+
+    #Rolls purchases older than horizonDays into the per-member aggregates, so the history read at startup stays the size of the
+    #horizon however old the store is. getPoints works out the points the rolled purchases earned ({memberID: points}) so
+    #reconciliation can still check them. Returns how many purchases and members were rolled up
+    def compactHistory(self, horizonDays: int = HISTORY_HORIZON_DAYS, getPoints=None) -> dict:
+        self.flush()
+        with self.__lock:
+            cutoff = (datetime.now() - timedelta(days=horizonDays)).strftime('%Y-%m-%d')
+            report = self.__storage.compactHistory(cutoff, getPoints)
+            if report["purchases"]:
+                self.loadHistory()
+            say(f"Rolled {report['purchases']} purchases from before {cutoff} into the aggregates.", DEBUG)
+            return report
 
-    #Save Current Member List In Database
-    def saveMembers(self) -> None:
-        with open(self.__filename, "w") as file:
-            for memberID, member in sorted(self.__members.items()):
+    #Load One Customer's Purchase History, reading only their purchases
+    def loadMemberHistory(self, memberID: str) -> dict:
+        #Purchases still queued by group commit must be stored before they are read
+        if self.__historyWriter:
+            self.__historyWriter.flush()
+        with self.__lock:
+            self.indexHistoryLines()
+            return self.__storage.readMemberPurchases(memberID)
+
+    #Returns a read-only view of every member ({memberID: {"name", "email", "role", "points", "history"}}), read live from the members
+    def getAllMembers(self) -> CollectionView:
+        with self.__lock:
+            self.loadMembers() 
+            return self.__membersView
+
+    #Save Current Member List In Database. memberIDs, if given, are the only members that changed
+    #(the text file is always rewritten in full)
+    def saveMembers(self, memberIDs: set = None) -> None:
+        with self.__lock:
+            changedIDs = set(memberIDs) if memberIDs is not None else None
+            for memberID in sorted(self.__members if memberIDs is None else memberIDs):
+                member = self.__members.get(memberID)
+                if member is None:
+                    continue
                 #Automatically update the member's role based on their points if there are discrepancies
                 points = member.getPoints()
-                validRole = None
-                if points < 500:
-                    validRole = "Apprentice"
-                elif points < 1000:
-                    validRole = "Explorer"
-                elif points < 1500:
-                    validRole = "Expert"
-                elif points < 2000:
-                    validRole = "Master"
-                else:
-                    validRole = "Legend"
-                
+                validRole = self.getValidRole(points)
+            
                 #Check if role is valid or not
                 if member.getRole() != validRole:
                     member.setMemberDetails(role=validRole)
-                    print(f"Role for Member ID '{memberID}' updated to '{validRole}' based on points ({points}).")
+                    say(f"Role for Member ID '{memberID}' updated to '{validRole}' based on points ({points}).")
+
+            pointChanges = self.__pointChanges if changedIDs is None else \
+                {memberID: self.__pointChanges[memberID] for memberID in changedIDs if memberID in self.__pointChanges}
+            storedPoints = self.__storage.writeMembers(self.__members, changedIDs, pointChanges)
+            #Only forgotten once stored, so a failed write is retried with them
+            for memberID in pointChanges.copy():
+                del self.__pointChanges[memberID]
+            if storedPoints:
+                self.catchUpPoints(storedPoints)
+            self.__membersSignature = self.__storage.getMembersSignature()
+            if self.__writeBehind:
+                self.__writeBehind.markClean()
+            say("\nAll members saved successfully!", DEBUG)
+
+    #Brings members' points up to the stored ones, which include points other tills added, and stores any tier that changed with them
+    def catchUpPoints(self, storedPoints: dict) -> None:
+        with self.__lock:
+            retiered = set()
+            for memberID, points in storedPoints.items():
+                member = self.__members.get(memberID)
+                if member is None or member.getPoints() == points:
+                    continue
+                #Points are only ever added to, so the difference is added
+                member.setMemberDetails(points=points - member.getPoints())
+                validRole = self.getValidRole(points)
+                if member.getRole() != validRole:
+                    member.setMemberDetails(role=validRole)
+                    retiered.add(memberID)
+            if retiered:
+                self.__storage.writeMembers(self.__members, retiered, {})
+
+    #Returns the role a member should have for their points
+    def getValidRole(self, points: int) -> str:
+        return getValidRole(points)
+
+    #Returns the line a member is stored as in the members file
+    def formatMember(self, member: Member) -> str:
+        return formatMemberLine(member)
+
+    #Adds many members at once by appending them to storage. Records are (memberID, name, email, points) and
+    #anyone already registered with the same name and email is skipped. A missing or taken ID gets a new one. Returns the IDs added
+    def appendMembers(self, records: list) -> list:
+        with self.__lock:
+            self.loadMembers()
+            #Batched edits must be on disk first, or the next full save would be built on top of the wrong file
+            self.flush()
+            added = []
+            for memberID, name, email, points in records:
+                if self.findMember(name, email):
+                    continue
+                if not memberID or memberID in self.__members:
+                    memberID = self.generateID(name)
+                    #Each pair of initials only has 99999 IDs
+                    if memberID in self.__members:
+                        say(f"No member IDs left for {name}. Skipped.", WARNING)
+                        continue
+                self.__members[memberID] = Member(memberID, name, email, self.getValidRole(points), points)
+                self.indexMember(memberID)
+                added.append(memberID)
+            if not added:
+                return []
+
+            self.__storage.addMembers([self.__members[memberID] for memberID in added])
+            #Storage now matches memory, so there is no need to re-read our own write
+            self.__membersSignature = self.__storage.getMembersSignature()
+            return added
+
+    #Saves a changed member now, or marks them dirty to be saved with the next batch in write-behind mode
+    def persistChange(self, memberID: str) -> None:
+        if self.__writeBehind:
+            self.__writeBehind.markDirty(memberID)
+        else:
+            self.saveMembers({memberID})
 
-                #Save The Members' Information correctly
-                file.write(f"{memberID}:{member.getName()}:{member.getEmail()}:{member.getPoints()}:{member.getRole()}\n")
+    #Writes any batched changes to storage
+    def flush(self) -> None:
+        #Queued history lines are written first, without holding the lock the history writer needs
+        if self.__historyWriter:
+            self.__historyWriter.flush()
+        with self.__lock:
+            if self.__writeBehind:
+                self.__writeBehind.flush()
 
-        print("\nAll members saved successfully!")
+    #Writes any batched changes and stops batching; the database shouldn't be used afterwards
+    def close(self) -> None:
+        self.flush()
+        with self.__lock:
+            if self.__writeBehind:
+                self.__writeBehind.close()
+
+    #Saves the parsed members and history with the signatures of the files they came from, for a fast start next time
+    def saveSnapshot(self) -> None:
+        self.flush()
+        with self.__lock:
+            snapshotFile = self.__storage.getSnapshotFile("members")
+            if snapshotFile and self.__membersSignature and self.__membersSignature == self.__storage.getMembersSignature():
+                writeSnapshot(snapshotFile, self.__membersSignature,
+                              (self.__members, self.__idCounters, self.__memberKeys, self.__emailIndex))
+
+            snapshotFile = self.__storage.getSnapshotFile("history")
+            if snapshotFile:
+                #Index everything first so the index doesn't change after its signature is taken
+                self.indexHistoryLines()
+                signature, state = self.__storage.getHistoryState()
+                if signature:
+                    writeSnapshot(snapshotFile, signature, (state, self.__history, self.__purchasedItems, self.__aggregates))
 
     #Updates History File
     def savePurchases(self, cart: dict) -> None:
         try:
-            with open(self.__historyFile, "a") as file:
-                for memberID, items in cart.items():
-                    formattedItems = ":".join([f'({itemID},{quantity})' for itemID, quantity in items.items()])
-                    file.write(f"{memberID}:{datetime.now().strftime('%Y-%m-%d')}:{formattedItems}\n")
-            print("Purchases saved!")
+            date = datetime.now().strftime('%Y-%m-%d')
+            purchases = [(memberID, date, items) for memberID, items in cart.items()]
+            if self.__historyWriter:
+                #The purchase is visible straight away; the line reaches the file with the next group the writer commits
+                with self.__lock:
+                    self.addToHistory(purchases)
+                for purchase in purchases:
+                    self.__historyWriter.put(purchase)
+            else:
+                self.appendPurchases(purchases)
+            say("Purchases saved!", DEBUG)
         except Exception:
-            print(f"Error saving purchase history")
+            say(f"Error saving purchase history", ERROR)
+
+    #Appends purchases, given as (memberID, date, {itemID: quantity}), to the stored history in one go
+    def appendPurchases(self, purchases) -> None:
+        with self.__lock:
+            self.writePurchases(purchases)
+            self.addToHistory(purchases)
+
+    #Writes purchases to the end of the stored history
+    def writePurchases(self, purchases) -> None:
+        with self.__lock:
+            #Purchases other writers added first are picked up on the way
+            for memberID, items in self.__storage.appendPurchases(purchases):
+                self.addPurchasedItems(memberID, items)
+
+    #Writes imported purchases straight to storage without loading them: the stored history's read position stays before them,
+    #so the loaded history only takes them in on a later loadHistory (normally the next start) and doesn't grow during an import.
+    #Their items still go into the members' sets of purchased items, which rewards need straight away
+    def importPurchases(self, purchases: list) -> None:
+        with self.__lock:
+            for memberID, items in self.__storage.appendPurchases(purchases, read=False):
+                self.addPurchasedItems(memberID, items)
+            for memberID, _, items in purchases:
+                self.addPurchasedItems(memberID, items)
+
+    #Counts a member's stored purchases by key (see getPurchaseKey), read through the history index. Unlike the loaded
+    #history, which keeps one purchase per date, this counts every purchase the member made on the same day
+    def getPurchaseKeys(self, memberID: str) -> Counter:
+        with self.__lock:
+            self.indexHistoryLines()
+            return Counter(getPurchaseKey(date, items) for date, items in self.__storage.readMemberPurchaseList(memberID))
+
+    #Keeps the loaded history in step with the file, the same way a reload would read the purchases
+    def addToHistory(self, purchases) -> None:
+        with self.__lock:
+            for memberID, date, items in purchases:
+                if memberID not in self.__history:
+                    self.__history[memberID] = {}
+                self.__history[memberID][date] = dict(items)
+                self.addPurchasedItems(memberID, items)
 
     #Generates a Unique Customer ID For A User
     def generateID(self, name: str) -> str:
@@ -239,50 +564,56 @@ class MemberDatabase:
         if len(initials) < 2:
             initials += "X"
 
-        count = 0
-        for memberID in self.__members:
-            if memberID.startswith(initials):
-                count += 1
-
-        number = count + 1
+        number = self.__idCounters.get(initials, 0) + 1
         numberSTR = "00000" + str(number)
         numberSTR = numberSTR[-5:]
         return initials + numberSTR
     
     #Registers a new Customer On To The System
     def registerMember(self, name : str, email: str) -> str | None:
-        for member in self.__members.values():
-            if member.getName() == name and member.getEmail() == email:
-                print("Member already exists. Registration skipped.")
+        with self.__lock:
+            if self.findMember(name, email):
+                say("Member already exists. Registration skipped.", WARNING)
                 return None
         
-        memberID = self.generateID(name)
+            memberID = self.generateID(name)
 
-        self.__members[memberID] = Member(memberID, name, email, role="Apprentice", points=0)
-        self.saveMembers()
+            self.__members[memberID] = Member(memberID, name, email, role="Apprentice", points=0)
+            self.indexMember(memberID)
+            self.persistChange(memberID)
 
-        #Prints The MemberID For Them To Keep/Know
-        print(f"Registered Successfully! Member ID: {memberID}")
-        return memberID
+            recordEvent("registration", memberID=memberID, name=name, email=email)
+            #Prints The MemberID For Them To Keep/Know
+            say(f"Registered Successfully! Member ID: {memberID}")
+            return memberID
 
     #Update The Details of a Customer
     def updateMemberDetails(self, memberID: str, name: str=None, email: str=None, role: str=None, points: int=None) -> None:
-        member = self.__members.get(memberID)
-        if member:
-            name = name if name else member.getName()
-            email = email if email else member.getEmail()
-            role = role if role else member.getRole()
-            points = points if points else member.getPoints()
+        with self.__lock:
+            member = self.__members.get(memberID)
+            if member:
+                pointsEarned = points
+                name = name if name else member.getName()
+                email = email if email else member.getEmail()
+                role = role if role else member.getRole()
+                points = points if points else member.getPoints()
             
-            member.setMemberDetails(name=name, email=email, role=role, points=points)
-            self.saveMembers()
-            print("Details updated!")
-        else:
-            print("Member does not exist.")
+                pointsBefore = member.getPoints()
+                self.unindexMember(memberID)
+                member.setMemberDetails(name=name, email=email, role=role, points=points)
+                self.indexMember(memberID)
+                if member.getPoints() != pointsBefore:
+                    self.__pointChanges[memberID] = self.__pointChanges.get(memberID, 0) + member.getPoints() - pointsBefore
+                self.persistChange(memberID)
+                if pointsEarned:
+                    recordEvent("points", memberID=memberID, change=pointsEarned, total=member.getPoints())
+                say("Details updated!", DEBUG)
+            else:
+                say("Member does not exist.", WARNING)
     
     #View Purchase History For Customer
     def viewPurchaseHistory(self, memberID: str) -> dict | None:
-        return self.__history[memberID]
+        return self.loadMemberHistory(memberID) or None
     
     #View Royalty Points For A Customer
     def viewRoyaltyPoints(self, memberID: str) -> int | None:
@@ -290,7 +621,7 @@ class MemberDatabase:
         if member:
             return member.getPoints()
         else:
-            print("Member does not exist.")
+            say("Member does not exist.", WARNING)
         return None
     
     #Get The Role of a Customer
@@ -302,12 +633,28 @@ class MemberDatabase:
     
     #Add Cart Purchases To a Member
     def addMemberPurchase(self, memberID: str, cart: dict) -> None:
-        member = self.__members.get(memberID)
-        if member:
-            member.addPurchaseHistory(date=list(cart.keys())[0], history=cart[list(cart.keys())[0]])   
-            print("Purchase added")
-            self.savePurchases(cart)
-        else:
-            print("Member does not exist.")
+        with self.__lock:
+            member = self.__members.get(memberID)
+            if member:
+                member.addPurchaseHistory(date=list(cart.keys())[0], history=cart[list(cart.keys())[0]])   
+                say("Purchase added", DEBUG)
+            else:
+                say("Member does not exist.", WARNING)
+                return
+        #Saved outside the lock, since with group commit this can wait on the history writer
+        self.savePurchases(cart)
         
     #Delete Member
+    def deleteMember(self, memberID: str) -> None:
+        with self.__lock:
+            if memberID in self.__members:
+                self.unindexMember(memberID)
+                del self.__members[memberID]
+                #Stored straight away (even in write-behind mode) so no reload or restart can hand the ID out again
+                initials = memberID[:-5]
+                if initials in self.__idCounters:
+                    self.__storage.writeIDCounters({initials: self.__idCounters[initials]})
+                self.persistChange(memberID)
+                say(f"Member {memberID} deleted.")
+            else:
+                say("Member does not exist.", WARNING)
@@ -0,0 +1,279 @@
+import time
+import threading
+import functools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from Modules import (InventoryManagement, MembershipSystem, StorageUtils, StorageBackends, POS, RoyaltyProgram, Store,
+                     EventLog, ReceiptArchive, SharedStock)
+
+#Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, float("inf")]
+#Methods timed when metrics are on, by class
+INSTRUMENTED_METHODS = {
+    InventoryManagement.Inventory: ["loadItems", "getInventory", "getPrices", "saveItems", "updateStock", "changeStock",
+                                    "takeStock", "reserveStock", "commitReservations", "compactJournal", "saveSnapshot"],
+    MembershipSystem.MemberDatabase: ["loadMembers", "loadHistory", "loadHistoryIndex", "loadMemberHistory", "getAllMembers",
+                                      "saveMembers", "savePurchases", "registerMember", "updateMemberDetails",
+                                      "getPurchasedItems", "saveSnapshot"],
+    POS.POS: ["addToCart", "calculateTotal", "finalizePurchase"],
+    POS.Receipt: ["buildReceipt", "renderReceipt"],
+    RoyaltyProgram.RoyaltyProgram: ["getPoints", "evaluateRewards", "displayAbilities", "useAbilities"],
+    Store.Store: ["checkout"],
+    EventLog.EventLog: ["writeEvents"],
+    ReceiptArchive.ReceiptArchive: ["writeReceipts", "refreshIndex", "findReceipts"],
+    #Stock in the shared table is read and changed through memory, so these show up as time rather than bytes
+    SharedStock.SharedStockTable: ["getRecord", "getAllStock", "changeStock", "addItems"],
+}
+#The checkout phase each operation belongs to. Other operations take the phase of the operation that called them
+PHASES = {
+    "Store.checkout": "checkout",
+    "Inventory.takeStock": "stock", "Inventory.commitReservations": "stock", "Inventory.reserveStock": "stock",
+    "RoyaltyProgram.getPoints": "rewards", "RoyaltyProgram.evaluateRewards": "rewards",
+    "RoyaltyProgram.displayAbilities": "rewards", "RoyaltyProgram.useAbilities": "rewards",
+    "MemberDatabase.updateMemberDetails": "members", "MemberDatabase.getPurchasedItems": "members",
+    "MemberDatabase.savePurchases": "history",
+    "POS.finalizePurchase": "receipt", "Receipt.buildReceipt": "receipt", "Receipt.renderReceipt": "receipt",
+    #Written on background threads after the checkout that queued them has finished
+    "ReceiptArchive.writeReceipts": "receipt", "ReceiptArchive.findReceipts": "receipt", "EventLog.writeEvents": "events",
+}
+#Modules whose file reads and writes are counted, for files they open while metrics are on
+FILE_MODULES = [InventoryManagement, MembershipSystem, StorageUtils, StorageBackends, EventLog, ReceiptArchive, SharedStock]
+
+#Counts bytes going through an open file and charges them to the operation running when they move, or failing that the one
+#that opened it (files kept open, like the event log, are used by many operations)
+class CountedFile:
+    def __init__(self, file, operation: tuple):
+        self.__file = file
+        self.__operation = operation
+
+    #Returns the operation bytes are charged to
+    def getOperation(self) -> tuple:
+        operation = REGISTRY.getCurrentOperation()
+        return operation if operation != ("other", "other") else self.__operation
+
+    #Reads and counts the bytes read
+    def read(self, *args):
+        data = self.__file.read(*args)
+        addBytes(self.getOperation(), "read", len(data))
+        return data
+
+    #Reads a line and counts it
+    def readline(self, *args):
+        data = self.__file.readline(*args)
+        addBytes(self.getOperation(), "read", len(data))
+        return data
+
+    #Reads into a buffer (used by pickle) and counts the bytes read
+    def readinto(self, buffer):
+        count = self.__file.readinto(buffer)
+        addBytes(self.getOperation(), "read", count or 0)
+        return count
+
+    #Writes and counts the bytes written
+    def write(self, data):
+        addBytes(self.getOperation(), "written", len(data))
+        return self.__file.write(data)
+
+    #Writes several lines and counts them
+    def writelines(self, lines):
+        lines = list(lines)
+        addBytes(self.getOperation(), "written", sum(len(line) for line in lines))
+        return self.__file.writelines(lines)
+
+    #Iterates over the lines of the file, counting each
+    def __iter__(self):
+        for line in self.__file:
+            addBytes(self.getOperation(), "read", len(line))
+            yield line
+
+    def __enter__(self):
+        self.__file.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        return self.__file.__exit__(*args)
+
+    #Everything else (seek, tell, flush, fileno...) goes straight to the real file
+    def __getattr__(self, name):
+        return getattr(self.__file, name)
+
+class MetricsRegistry:
+    def __init__(self):
+        self.__lock = threading.Lock()
+        #Everything is kept per (operation, phase)
+        #Call count, latency total and bucket counts
+        self.__calls = {}
+        self.__latencySums = {}
+        self.__latencyBuckets = {}
+        #Bytes read, bytes written and files opened
+        self.__bytes = {}
+        self.__opens = {}
+        #The operations running on each thread, innermost last, so file I/O can be charged to the right one
+        self.__active = threading.local()
+        self.__originals = []
+
+    #Returns the stack of operations running on this thread
+    def getActive(self) -> list:
+        if not hasattr(self.__active, "stack"):
+            self.__active.stack = []
+        return self.__active.stack
+
+    #Returns the (operation, phase) currently running on this thread
+    def getCurrentOperation(self) -> tuple:
+        stack = self.getActive()
+        return stack[-1] if stack else ("other", "other")
+
+    #Records one call of an operation and how long it took
+    def observe(self, operation: tuple, seconds: float) -> None:
+        with self.__lock:
+            self.__calls[operation] = self.__calls.get(operation, 0) + 1
+            self.__latencySums[operation] = self.__latencySums.get(operation, 0.0) + seconds
+            if operation not in self.__latencyBuckets:
+                self.__latencyBuckets[operation] = [0] * len(LATENCY_BUCKETS)
+            buckets = self.__latencyBuckets[operation]
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[position] += 1
+                    break
+
+    #Adds bytes read or written by an operation
+    def addBytes(self, operation: tuple, direction: str, count: int) -> None:
+        with self.__lock:
+            key = (operation, direction)
+            self.__bytes[key] = self.__bytes.get(key, 0) + count
+
+    #Counts a file opened by an operation
+    def addOpen(self, operation: tuple) -> None:
+        with self.__lock:
+            self.__opens[operation] = self.__opens.get(operation, 0) + 1
+
+    #Returns a method wrapped to time every call
+    def wrapMethod(self, operation: str, method):
+        @functools.wraps(method)
+        def timedMethod(*args, **kwargs):
+            stack = self.getActive()
+            key = (operation, PHASES.get(operation, stack[-1][1] if stack else "other"))
+            stack.append(key)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.observe(key, time.perf_counter() - start)
+                stack.pop()
+        return timedMethod
+
+    #Returns an open() that counts the files opened and the bytes moved through them
+    def wrapOpen(self):
+        def countedOpen(*args, **kwargs):
+            operation = self.getCurrentOperation()
+            self.addOpen(operation)
+            return CountedFile(open(*args, **kwargs), operation)
+        return countedOpen
+
+    #Checks if metrics are being recorded
+    def isEnabled(self) -> bool:
+        return bool(self.__originals)
+
+    #Starts recording by wrapping the instrumented methods. Nothing is wrapped while metrics are off, so they cost nothing then
+    def enable(self) -> None:
+        if self.isEnabled():
+            return
+        for cls, methodNames in INSTRUMENTED_METHODS.items():
+            for name in methodNames:
+                method = cls.__dict__[name]
+                self.__originals.append((cls, name, method))
+                setattr(cls, name, self.wrapMethod(f"{cls.__name__}.{name}", method))
+        for module in FILE_MODULES:
+            self.__originals.append((module, "open", None))
+            module.open = self.wrapOpen()
+
+    #Stops recording and puts the original methods back
+    def disable(self) -> None:
+        for owner, name, original in reversed(self.__originals):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self.__originals = []
+
+    #Forgets everything recorded so far
+    def reset(self) -> None:
+        with self.__lock:
+            self.__calls = {}
+            self.__latencySums = {}
+            self.__latencyBuckets = {}
+            self.__bytes = {}
+            self.__opens = {}
+
+    #Returns the labels of an (operation, phase) in Prometheus form
+    def getLabels(self, key: tuple) -> str:
+        return f'operation="{key[0]}",phase="{key[1]}"'
+
+    #Returns everything recorded in the Prometheus text exposition format
+    def render(self) -> str:
+        with self.__lock:
+            lines = ["# HELP youwee_calls_total Calls per operation.", "# TYPE youwee_calls_total counter"]
+            for operation, count in sorted(self.__calls.items()):
+                lines.append(f"youwee_calls_total{{{self.getLabels(operation)}}} {count}")
+
+            lines += ["# HELP youwee_latency_seconds Time spent per call.", "# TYPE youwee_latency_seconds histogram"]
+            for operation, buckets in sorted(self.__latencyBuckets.items()):
+                labels = self.getLabels(operation)
+                total = 0
+                for bound, count in zip(LATENCY_BUCKETS, buckets):
+                    total += count
+                    lines.append(f'youwee_latency_seconds_bucket{{{labels},le="{"+Inf" if bound == float("inf") else bound}"}} {total}')
+                lines.append(f"youwee_latency_seconds_sum{{{labels}}} {self.__latencySums[operation]:.9f}")
+                lines.append(f"youwee_latency_seconds_count{{{labels}}} {self.__calls[operation]}")
+
+            for direction in ["read", "written"]:
+                lines += [f"# HELP youwee_{direction}_bytes_total Bytes {direction} by file operations.",
+                          f"# TYPE youwee_{direction}_bytes_total counter"]
+                for (operation, countedDirection), count in sorted(self.__bytes.items()):
+                    if countedDirection == direction:
+                        lines.append(f"youwee_{direction}_bytes_total{{{self.getLabels(operation)}}} {count}")
+
+            lines += ["# HELP youwee_file_opens_total Files opened.", "# TYPE youwee_file_opens_total counter"]
+            for operation, count in sorted(self.__opens.items()):
+                lines.append(f"youwee_file_opens_total{{{self.getLabels(operation)}}} {count}")
+            return "\n".join(lines) + "\n"
+
+#The one registry the instrumented classes report to
+REGISTRY = MetricsRegistry()
+
+#Adds bytes read or written to the registry (used by CountedFile)
+def addBytes(operation: tuple, direction: str, count: int) -> None:
+    REGISTRY.addBytes(operation, direction, count)
+
+#Turns metrics on
+def enableMetrics() -> None:
+    REGISTRY.enable()
+
+#Turns metrics off
+def disableMetrics() -> None:
+    REGISTRY.disable()
+
+#Writes the metrics to a Prometheus text file (renamed into place so a collector never reads half a file)
+def writeMetrics(filename: str) -> None:
+    StorageUtils.atomicWrite(filename, [REGISTRY.render()])
+
+#Serves the metrics at http://host:port/metrics from a background thread, returning the server so it can be shut down
+def serveMetrics(port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        #Requests aren't logged to the console, which belongs to the cashier
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
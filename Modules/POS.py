@@ -1,4 +1,16 @@
 from datetime import datetime
+from Modules.Console import say, WARNING
+from Modules.EventLog import recordEvent
+from Modules.ReceiptArchive import archiveReceipt
+
+#The receipt layout, put together once: the header, one line per item and the totals
+RECEIPT_HEADER = "\t\t\tYOUWEE\n\t\t\tRECEIPT\nMember ID: {member}\nDate: {time}\n\n\t\t\t\t\tUnit Price\t\tQuantity\t\tTotal".format_map
+RECEIPT_LINE = "\n{1}\t\t\t\t${2:.2f}\t\t\t{3}\t\t\t${4:.2f}".format
+RECEIPT_FOOTER = "\n\nTOTAL: ${total:.2f}\nDiscount: ${discount:.2f}\nGRAND TOTAL: ${grandTotal:.2f}\n\nPOINTS EARNED:{points}".format_map
+
+#Returns the text of a structured receipt (see Receipt.buildReceipt)
+def renderReceipt(receipt: dict) -> str:
+    return RECEIPT_HEADER(receipt) + "".join(RECEIPT_LINE(*line) for line in receipt["lines"]) + RECEIPT_FOOTER(receipt)
 
 class Receipt:
     def __init__ (self, items:dict[dict]):
@@ -18,16 +30,27 @@ class Receipt:
         grandTotal = totalCost - discount
         return itemDetails, totalCost, grandTotal
 
+    #Returns the customer's receipt as a record: who bought what and when, the line items
+    #(itemID, name, unit price, quantity, total), the totals, discount and points earned
+    def buildReceipt(self, memberID: str, discount: float, cart: dict[dict], points: int) -> dict:
+        itemDetails, totalCost, grandTotal = self.calculateItemTotals(memberID, discount, cart)
+        return {
+            "member": memberID,
+            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            "lines": [[itemID, *details] for itemID, details in zip(cart[memberID], itemDetails)],
+            "total": totalCost,
+            "discount": discount,
+            "grandTotal": grandTotal,
+            "points": points
+        }
+
+    #Returns the text of a receipt record
+    def renderReceipt(self, receipt: dict) -> str:
+        return renderReceipt(receipt)
+
     #Returns the customer's receipt
     def generateReceipt(self, memberID: str, discount: float, cart: dict[dict], points: int) -> str:
-        receipt = []
-        receipt.append(f"\t\t\tYOUWEE\n\t\t\tRECEIPT\nMember ID: {memberID}\nDate: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        receipt.append("\t\t\t\t\tUnit Price\t\tQuantity\t\tTotal")
-        itemDetails, totalCost, grandTotal = self.calculateItemTotals(memberID, discount, cart)
-        for itemName, unitprice, quantity, itemTotal in itemDetails:
-            receipt.append(f"{itemName}\t\t\t\t${unitprice:.2f}\t\t\t{quantity}\t\t\t${itemTotal:.2f}")
-        receipt.append(f"\nTOTAL: ${totalCost:.2f}\nDiscount: ${discount:.2f}\nGRAND TOTAL: ${grandTotal:.2f}\n\nPOINTS EARNED:{points}")
-        return "\n".join(receipt)
+        return self.renderReceipt(self.buildReceipt(memberID, discount, cart, points))
     
 class POS:
     def __init__ (self, member: str, items: dict[dict]):
@@ -35,6 +58,8 @@ class POS:
         self.__items = items
         self.__cart = {self.__member:{}}
         self.__receipt = Receipt(items)
+        #Stock holds taken out in the inventory for the items in the cart
+        self.__holds = {}
     
     #Checks if cart is empty
     def isEmpty(self) -> bool:
@@ -50,14 +75,14 @@ class POS:
     #Remove item from cart
     def removeFromCart(self, itemID: str, quantity: int) -> None:
         if quantity < 1:
-            print("Quantity can't be less than 1.")
+            say("Quantity can't be less than 1.", WARNING)
             return
         if quantity < self.__cart[self.__member][itemID]:
             self.__cart[self.__member][itemID] -= quantity
         elif quantity == self.__cart[self.__member][itemID]:
             del self.__cart[self.__member][itemID]
         else:
-            print("Quantity cant be more than what's in the cart.")
+            say("Quantity cant be more than what's in the cart.", WARNING)
             return
 
     #Returns the current customer cart
@@ -86,6 +111,44 @@ class POS:
         else:
             self.__cart[self.__member][itemID] = quantity
     
+    #Remembers a stock hold taken for an item in the cart
+    def addHold(self, itemID: str, holdID: str) -> None:
+        if itemID not in self.__holds:
+            self.__holds[itemID] = []
+        self.__holds[itemID].append(holdID)
+
+    #Returns the IDs of all stock holds for the cart
+    def getHolds(self) -> list:
+        return [holdID for holdIDs in self.__holds.values() for holdID in holdIDs]
+
+    #Forgets and returns the stock holds for an item
+    def takeHolds(self, itemID: str) -> list:
+        return self.__holds.pop(itemID, [])
+
+    #Holds stock in the inventory for an item and adds it to the cart, so no other till can sell it before checkout.
+    #Returns False, leaving the cart as it was, if there isn't enough stock to hold
+    def reserveItem(self, inv, itemID: str, quantity: int) -> bool:
+        holdID = inv.reserveStock(itemID, quantity)
+        if not holdID:
+            return False
+        self.addToCart(itemID, quantity)
+        self.addHold(itemID, holdID)
+        return True
+
+    #Turns the cart's holds into a sale, re-checking any stock that changed since it was held.
+    #If the cart can't be sold every hold is given back and False is returned
+    def commitHolds(self, inv) -> bool:
+        if inv.commitReservations(self.getHolds()):
+            return True
+        self.releaseHolds(inv)
+        return False
+
+    #Gives every stock hold for the cart back to the inventory
+    def releaseHolds(self, inv) -> None:
+        for holdID in self.getHolds():
+            inv.releaseReservation(holdID)
+        self.__holds = {}
+
     #Calculate the total of a customer's cart
     def calculateTotal(self, discount:int = 0) -> float:
         total = 0
@@ -101,14 +164,14 @@ class POS:
 
         for itemID in self.__cart[self.__member]:
             if itemID not in self.__items:
-                print(f"Item {itemID} does not exist.")
+                say(f"Item {itemID} does not exist.", WARNING)
                 continue
             
             quantity = self.__cart[self.__member][itemID]
             currentStock = self.__items[itemID]["stock"]
             
             if quantity > currentStock:
-                print(f"Insufficient stock for {itemID}.")
+                say(f"Insufficient stock for {itemID}.", WARNING)
             
             updatedStock = max(0, currentStock - quantity)
             updatedStockInfo[itemID] = updatedStock
@@ -118,9 +181,14 @@ class POS:
     #Finalize the purchase and generates a receipt
     def finalizePurchase(self, discount:float, points: int) -> str:
         if self.__member not in self.__cart or not self.__cart[self.__member]:
-            print("Cart is empty. Cannot finalize purchase.")
+            say("Cart is empty. Cannot finalize purchase.", WARNING)
             return None
-        #generate receipt
-        receipt = self.__receipt.generateReceipt(self.__member, discount, self.__cart, points)
+        #generate receipt, keeping the record in the receipt archive for reprints, returns and audits
+        record = self.__receipt.buildReceipt(self.__member, discount, self.__cart, points)
+        receipt = self.__receipt.renderReceipt(record)
+        archiveReceipt(record)
+        recordEvent("sale", memberID=self.__member, items=self.__cart[self.__member], total=round(self.calculateTotal(discount), 2),
+                    discount=discount, points=points)
         self.__cart = {}
+        self.__holds = {}
         return receipt 
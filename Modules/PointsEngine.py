@@ -0,0 +1,85 @@
+import os
+import sys
+import datetime
+import numpy as np
+from Modules.InventoryManagement import Inventory
+from Modules.MembershipSystem import MemberDatabase
+from Modules.RoyaltyProgram import MULTIPLIERS
+from Modules.SalesAnalytics import SalesAnalytics, WEEKDAYS
+from Modules.StorageBackends import SQLiteStorage
+
+class PointsEngine:
+    def __init__(self, itemInfo: dict, multipliers: dict = MULTIPLIERS):
+        #Items are referred to by their position (code) in these arrays
+        self.__itemIDs = list(itemInfo)
+        self.__itemCodes = {itemID: code for code, itemID in enumerate(self.__itemIDs)}
+        #Base points per item, worked out the same way as RoyaltyProgram.calculateBasePoints
+        prices = np.array([itemInfo[itemID]["price"] for itemID in self.__itemIDs], dtype=np.float64)
+        self.__basePoints = (prices * 0.2 + 1).astype(np.int64)
+
+        #Weekday x category table of multipliers, so a multiplier is one array lookup
+        self.__categories = sorted({itemID[:3] for itemID in self.__itemIDs} | {category for day in multipliers.values() for category in day})
+        categoryCodes = {category: code for code, category in enumerate(self.__categories)}
+        self.__itemCategory = np.array([categoryCodes[itemID[:3]] for itemID in self.__itemIDs], dtype=np.int64)
+        self.__multiplierTable = np.ones((len(WEEKDAYS), len(self.__categories)), dtype=np.int64)
+        for day, categories in multipliers.items():
+            for category, multiplier in categories.items():
+                self.__multiplierTable[WEEKDAYS.index(day), categoryCodes[category]] = multiplier
+
+    #Returns the multiplier table (rows are weekdays, columns are categories)
+    def getMultiplierTable(self) -> tuple:
+        return list(self.__categories), self.__multiplierTable.copy()
+
+    #Points for each purchased line: base points x weekday/category multiplier x quantity
+    def getLinePoints(self, itemCodes: np.ndarray, weekdays: np.ndarray, quantities: np.ndarray) -> np.ndarray:
+        multipliers = self.__multiplierTable[weekdays, self.__itemCategory[itemCodes]]
+        return self.__basePoints[itemCodes] * multipliers * quantities
+
+    #Points for many carts ({itemID: quantity} each). days gives each cart's weekday name, or one name for all (today if not given)
+    def batchPoints(self, carts: list, days=None) -> list:
+        days = days if days else datetime.datetime.now().strftime("%A")
+        lengths = np.fromiter((len(cart) for cart in carts), dtype=np.int64, count=len(carts))
+        lineCount = int(lengths.sum())
+        #Unknown items raise a KeyError, the same as RoyaltyProgram.getPoints
+        itemCodes = np.fromiter((self.__itemCodes[itemID] for cart in carts for itemID in cart), dtype=np.int64, count=lineCount)
+        quantities = np.fromiter((quantity for cart in carts for quantity in cart.values()), dtype=np.int64, count=lineCount)
+        if isinstance(days, str):
+            weekdays = np.full(lineCount, WEEKDAYS.index(days), dtype=np.int64)
+        else:
+            weekdays = np.repeat(np.array([WEEKDAYS.index(day) for day in days], dtype=np.int64), lengths)
+
+        #Cart totals from a running sum of line points (exact integers, and empty carts come out as 0)
+        runningTotal = np.concatenate(([0], np.cumsum(self.getLinePoints(itemCodes, weekdays, quantities))))
+        ends = np.cumsum(lengths)
+        return (runningTotal[ends] - runningTotal[ends - lengths]).tolist()
+
+    #Points every member earned over the purchase history (optionally between two dates), using the weekday of each purchase
+    #Items no longer in the inventory earn nothing
+    def historyPoints(self, analytics: SalesAnalytics, startDate: str = None, endDate: str = None) -> dict:
+        memberIDs, itemIDs, memberColumn, dateColumn, itemColumn, quantityColumn = analytics.getColumns()
+        mask = analytics.getDateMask(startDate, endDate)
+        #Translate the history's item codes into this engine's codes (-1 for unknown items)
+        codeMap = np.array([self.__itemCodes.get(itemID, -1) for itemID in itemIDs], dtype=np.int64)
+        itemCodes = codeMap[itemColumn[mask]] if len(itemIDs) else np.zeros(0, dtype=np.int64)
+        known = itemCodes >= 0
+
+        #Weekday from the day ordinal (ordinal 1 was a Monday)
+        weekdays = (dateColumn[mask][known] - 1) % 7
+        linePoints = self.getLinePoints(itemCodes[known], weekdays, quantityColumn[mask][known])
+        members = memberColumn[mask][known]
+
+        totals = np.zeros(len(memberIDs), dtype=np.int64)
+        np.add.at(totals, members, linePoints)
+        return {memberIDs[code]: int(totals[code]) for code in np.unique(members)}
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.PointsEngine [start date] [end date]
+    #Reads the SQLite database named by YOUWEE_DATABASE instead of the text files, like Main
+    database = os.environ.get("YOUWEE_DATABASE")
+    storage = SQLiteStorage(database) if database else None
+    engine = PointsEngine(Inventory(storage=storage).getPrices())
+    startDate = sys.argv[1] if len(sys.argv) > 1 else None
+    endDate = sys.argv[2] if len(sys.argv) > 2 else startDate
+    analytics = SalesAnalytics(MemberDatabase(storage=storage))
+    for memberID, points in sorted(engine.historyPoints(analytics, startDate, endDate).items()):
+        print(f"{memberID}: {points} points")
@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import zlib
+import struct
+import functools
+import threading
+from Modules.StorageUtils import BackgroundWriter
+from Modules.StorageBackends import STORAGE_DIRECTORY
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+#Each block in a segment is its compressed length followed by the zlib-compressed JSON lines of one group of receipts
+BLOCK_HEADER = struct.Struct("<I")
+#A new segment is started once the current one grows past this many bytes; segments are never rewritten
+SEGMENT_BYTES = 64 * 1024 * 1024
+#Decompressed blocks kept in memory for reprints, which usually ask for the same recent receipts again
+BLOCK_CACHE_SIZE = 64
+#Writers lock this byte of the index file, far past its end: Windows locks are mandatory, so locking a byte that is
+#read or written would stop other tills reading the index meanwhile
+LOCK_OFFSET = 1 << 40
+
+#Returns the receipts of the block at offset in a segment. Blocks never change once written, so they are safe to cache
+@functools.lru_cache(maxsize=BLOCK_CACHE_SIZE)
+def readBlock(filename: str, offset: int) -> tuple:
+    with open(filename, "rb") as file:
+        file.seek(offset)
+        length, = BLOCK_HEADER.unpack(file.read(BLOCK_HEADER.size))
+        data = zlib.decompress(file.read(length))
+    return tuple(json.loads(line) for line in data.decode().splitlines())
+
+class ReceiptArchive:
+    def __init__(self, directory: str = os.path.join(STORAGE_DIRECTORY, "RECEIPTS"), segmentBytes: int = SEGMENT_BYTES,
+                 maxQueue: int = 10000, groupSize: int = 512):
+        self.__directory = directory
+        self.__segmentBytes = segmentBytes
+        os.makedirs(directory, exist_ok=True)
+        #The index file lists where each receipt is as memberID:date:segment:offset. Writers lock a byte of it (LOCK_OFFSET)
+        #so two tills never append at once
+        self.__indexFile = os.path.join(directory, "RECEIPTS.idx")
+        self.__indexHandle = open(self.__indexFile, "a+b")
+        #memberID -> date -> locations (segment, offset) of the blocks holding that member's receipts for the day
+        self.__index = {}
+        self.__indexedBytes = 0
+        self.__segment = 1
+        self.__lock = threading.RLock()
+        with self.__lock:
+            self.lockIndex()
+            try:
+                self.refreshIndex()
+                self.recoverSegments()
+            finally:
+                self.unlockIndex()
+        #Receipts are queued and written in groups by a background thread, so a checkout never waits on compression or the disk
+        self.__writer = BackgroundWriter(self.writeReceipts, maxQueue, groupSize)
+
+    #Locks the archive against other processes (blocks until it is free)
+    def lockIndex(self) -> None:
+        if fcntl:
+            fcntl.lockf(self.__indexHandle.fileno(), fcntl.LOCK_EX, 1, LOCK_OFFSET, os.SEEK_SET)
+            return
+        #msvcrt's LK_LOCK raises after retrying for about ten seconds, so it is tried again until the lock is free
+        while True:
+            os.lseek(self.__indexHandle.fileno(), LOCK_OFFSET, os.SEEK_SET)
+            try:
+                msvcrt.locking(self.__indexHandle.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    #Releases the lock taken with lockIndex
+    def unlockIndex(self) -> None:
+        if fcntl:
+            fcntl.lockf(self.__indexHandle.fileno(), fcntl.LOCK_UN, 1, LOCK_OFFSET, os.SEEK_SET)
+        else:
+            os.lseek(self.__indexHandle.fileno(), LOCK_OFFSET, os.SEEK_SET)
+            msvcrt.locking(self.__indexHandle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    #Returns the path of a segment file
+    def getSegmentFile(self, segment: int) -> str:
+        return os.path.join(self.__directory, f"RECEIPTS_{segment:06d}.seg")
+
+    #Adds one receipt's location to the in-memory index
+    def addToIndex(self, memberID: str, date: str, segment: int, offset: int) -> None:
+        locations = self.__index.setdefault(memberID, {}).setdefault(date, [])
+        if not locations or locations[-1] != (segment, offset):
+            locations.append((segment, offset))
+        self.__segment = max(self.__segment, segment)
+
+    #Reads the index lines added since the last call, including those of other tills
+    def refreshIndex(self) -> None:
+        with self.__lock:
+            self.__indexHandle.seek(self.__indexedBytes)
+            data = self.__indexHandle.read()
+            #A line without its newline is still being written
+            data = data[:data.rfind(b"\n") + 1]
+            self.__indexedBytes += len(data)
+            for line in data.decode().splitlines():
+                memberID, date, segment, offset = line.rsplit(":", 3)
+                self.addToIndex(memberID, date, int(segment), int(offset))
+
+    #Returns where the last indexed block of the current segment ends (0 if none is indexed yet)
+    def getIndexedEnd(self) -> int:
+        offsets = [offset for dates in self.__index.values() for locations in dates.values()
+                   for segment, offset in locations if segment == self.__segment]
+        if not offsets:
+            return 0
+        offset = max(offsets)
+        with open(self.getSegmentFile(self.__segment), "rb") as file:
+            file.seek(offset)
+            length, = BLOCK_HEADER.unpack(file.read(BLOCK_HEADER.size))
+        return offset + BLOCK_HEADER.size + length
+
+    #Indexes blocks a till wrote but stopped before indexing, from the last indexed block of the current segment through
+    #any newer segments nothing was indexed from yet, and moves on to the newest. Runs under the archive lock
+    def recoverSegments(self) -> None:
+        while True:
+            if os.path.exists(self.getSegmentFile(self.__segment)):
+                self.recoverSegment()
+            if not os.path.exists(self.getSegmentFile(self.__segment + 1)):
+                return
+            self.__segment += 1
+
+    #Indexes the blocks of the current segment past its last indexed one, and cuts off a block that was only partly written
+    def recoverSegment(self) -> None:
+        segmentFile = self.getSegmentFile(self.__segment)
+        offset = self.getIndexedEnd()
+        size = os.path.getsize(segmentFile)
+        entries = []
+        with open(segmentFile, "r+b") as file:
+            while offset < size:
+                file.seek(offset)
+                header = file.read(BLOCK_HEADER.size)
+                length = BLOCK_HEADER.unpack(header)[0] if len(header) == BLOCK_HEADER.size else None
+                if length is None or offset + BLOCK_HEADER.size + length > size:
+                    file.truncate(offset)
+                    break
+                for receipt in readBlock(segmentFile, offset):
+                    entries.append((receipt["member"], receipt["time"][:10], self.__segment, offset))
+                offset += BLOCK_HEADER.size + length
+        self.appendIndex(entries)
+
+    #Appends index lines for receipts just written and adds them to the in-memory index. Runs under the archive lock
+    def appendIndex(self, entries: list) -> None:
+        if not entries:
+            return
+        data = "".join(f"{memberID}:{date}:{segment}:{offset}\n" for memberID, date, segment, offset in entries).encode()
+        self.__indexHandle.seek(0, os.SEEK_END)
+        self.__indexHandle.write(data)
+        self.__indexHandle.flush()
+        self.__indexedBytes += len(data)
+        for entry in entries:
+            self.addToIndex(*entry)
+
+    #Queues a structured receipt to be archived
+    def add(self, receipt: dict) -> None:
+        self.__writer.put(receipt)
+
+    #Compresses a group of receipts into one block and appends it to the current segment (runs on the writer thread)
+    def writeReceipts(self, receipts: list) -> None:
+        data = "".join(json.dumps(receipt, separators=(",", ":")) + "\n" for receipt in receipts).encode()
+        block = zlib.compress(data)
+        with self.__lock:
+            self.lockIndex()
+            try:
+                #Other tills may have written (or started a new segment) since our last look
+                self.refreshIndex()
+                segmentFile = self.getSegmentFile(self.__segment)
+                if os.path.exists(segmentFile) and os.path.getsize(segmentFile) >= self.__segmentBytes:
+                    self.__segment += 1
+                    segmentFile = self.getSegmentFile(self.__segment)
+                with open(segmentFile, "ab") as file:
+                    offset = file.seek(0, os.SEEK_END)
+                    file.write(BLOCK_HEADER.pack(len(block)) + block)
+                    file.flush()
+                self.appendIndex([(receipt["member"], receipt["time"][:10], self.__segment, offset) for receipt in receipts])
+            finally:
+                self.unlockIndex()
+
+    #Waits until every queued receipt is in the archive
+    def flush(self) -> None:
+        self.__writer.flush()
+
+    #Returns a member's archived receipts in the order they were made, for one date (YYYY-MM-DD) or every date
+    def findReceipts(self, memberID: str, date: str = None) -> list:
+        self.flush()
+        with self.__lock:
+            self.refreshIndex()
+            dates = self.__index.get(memberID, {})
+            #A block holding receipts of several dates is listed under each of them, but must only be read once. Blocks are
+            #only ever appended, so in segment and offset order they are in the order they were written
+            locations = dates.get(date, []) if date else sorted({location for day in dates.values() for location in day})
+        receipts = []
+        for segment, offset in locations:
+            for receipt in readBlock(self.getSegmentFile(segment), offset):
+                if receipt["member"] == memberID and (not date or receipt["time"].startswith(date)):
+                    receipts.append(receipt)
+        return receipts
+
+    #Returns the dates a member has archived receipts for
+    def getDates(self, memberID: str) -> list:
+        self.flush()
+        with self.__lock:
+            self.refreshIndex()
+            return sorted(self.__index.get(memberID, {}))
+
+    #Writes what is left and closes the index
+    def close(self) -> None:
+        self.flush()
+        with self.__lock:
+            self.__indexHandle.close()
+
+#The receipt archive finished sales are kept in, if one is open
+receiptArchive = None
+
+#Opens the receipt archive every finished sale is kept in
+def openReceiptArchive(directory: str = os.path.join(STORAGE_DIRECTORY, "RECEIPTS"), **options) -> ReceiptArchive:
+    global receiptArchive
+    closeReceiptArchive()
+    receiptArchive = ReceiptArchive(directory, **options)
+    return receiptArchive
+
+#Closes the receipt archive, writing any receipts still queued
+def closeReceiptArchive() -> None:
+    global receiptArchive
+    if receiptArchive:
+        receiptArchive.close()
+        receiptArchive = None
+
+#Archives a structured receipt if a receipt archive is open
+def archiveReceipt(receipt: dict) -> None:
+    if receiptArchive:
+        receiptArchive.add(receipt)
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.ReceiptArchive <member ID> [date YYYY-MM-DD] [archive directory]
+    #Reprints a member's archived receipts
+    from Modules.POS import renderReceipt
+    if len(sys.argv) < 2:
+        print("Usage: python -m Modules.ReceiptArchive <member ID> [date YYYY-MM-DD] [archive directory]")
+        sys.exit(1)
+    date = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] else None
+    archive = ReceiptArchive(sys.argv[3]) if len(sys.argv) > 3 else ReceiptArchive()
+    receipts = archive.findReceipts(sys.argv[1], date)
+    for receipt in receipts:
+        print(renderReceipt(receipt))
+        print("\n" + "="*80 + "\n")
+    print(f"{len(receipts)} receipts found for {sys.argv[1]}" + (f" on {date}." if date else "."))
+    archive.close()
@@ -0,0 +1,207 @@
+import os
+import sys
+import csv
+import time
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+from Modules.InventoryManagement import Inventory
+from Modules.MembershipSystem import MemberDatabase, getValidRole
+from Modules.RoyaltyProgram import MULTIPLIERS
+from Modules.StorageBackends import STORAGE_DIRECTORY, parseHistoryLine
+
+REPORT_FIELDS = ["memberID", "problem", "recordedPoints", "expectedPoints", "difference", "recordedRole", "expectedRole"]
+#The history file is split into ranges of about this many bytes, each summed by one worker
+CHUNK_BYTES = 16 * 1024 * 1024
+#Storage without a history file is read in chunks of this many purchases, each summed by one worker
+CHUNK_PURCHASES = 100000
+
+#Set once in each worker process so the prices aren't sent with every range
+workerBasePoints = {}
+workerMultipliers = {}
+
+#Gets a worker process ready: base points per item (as RoyaltyProgram.calculateBasePoints works them out) and the multipliers
+def initWorker(prices: dict, multipliers: dict) -> None:
+    global workerBasePoints, workerMultipliers
+    workerBasePoints = {itemID: int(price * 0.2 + 1) for itemID, price in prices.items()}
+    workerMultipliers = multipliers
+
+#Returns byte ranges covering a file, at least one per worker
+def splitFile(filename: str, workers: int, chunkBytes: int = CHUNK_BYTES) -> list:
+    size = os.path.getsize(filename)
+    count = max(workers, -(-size // chunkBytes), 1)
+    step = -(-size // count) if size else 1
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+#Sums the points earned by every history line starting inside [start, end), grouped into shards by the first
+#shardLength characters of the member ID. Runs in a worker process
+def sumRange(filename: str, start: int, end: int, shardLength: int) -> tuple:
+    with open(filename, "rb") as file:
+        #A line belongs to the range its first byte is in, so skip the rest of a line that started before us
+        if start:
+            file.seek(start - 1)
+            file.readline()
+        position = file.tell()
+        if position >= end:
+            return {}, 0
+        data = file.read(end - position)
+        if not data.endswith(b"\n"):
+            data += file.readline()
+
+    text = data.decode()
+    #A line without its newline at the end of the file is still being written
+    text = text[:text.rfind("\n") + 1]
+    return sumPurchases([parseHistoryLine(line) for line in text.split("\n") if line.strip()], shardLength)
+
+#Sums the points earned by purchases of (memberID, date, {itemID: quantity}), grouped into shards. Runs in a worker process
+def sumPurchases(purchases: list, shardLength: int) -> tuple:
+    shards = {}
+    weekdays = {}
+    for memberID, date, items in purchases:
+        if date not in weekdays:
+            weekdays[date] = workerMultipliers.get(datetime.date.fromisoformat(date).strftime("%A"), {})
+        multipliers = weekdays[date]
+
+        points = 0
+        for itemID, quantity in items.items():
+            #Items no longer in the inventory earn nothing, the same as PointsEngine.historyPoints
+            basePoints = workerBasePoints.get(itemID)
+            if basePoints is not None:
+                points += basePoints * multipliers.get(itemID[:3], 1) * quantity
+
+        shard = shards.setdefault(memberID[:shardLength], {})
+        shard[memberID] = shard.get(memberID, 0) + points
+    return shards, len(purchases)
+
+#Yields purchases in lists of up to size
+def chunkPurchases(purchases, size: int):
+    chunk = []
+    for purchase in purchases:
+        chunk.append(purchase)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+#Compares one shard of members with the points their history earned, returning the discrepancies. Runs in a worker process
+def checkShard(members: dict, partials: list) -> list:
+    expected = {}
+    for partial in partials:
+        for memberID, points in partial.items():
+            expected[memberID] = expected.get(memberID, 0) + points
+
+    discrepancies = []
+    for memberID, (points, role) in members.items():
+        expectedPoints = expected.pop(memberID, 0)
+        expectedRole = getValidRole(points)
+        if points != expectedPoints:
+            discrepancies.append({"memberID": memberID, "problem": "points", "recordedPoints": points, "expectedPoints": expectedPoints,
+                                  "difference": points - expectedPoints, "recordedRole": role, "expectedRole": getValidRole(expectedPoints)})
+        if role != expectedRole:
+            discrepancies.append({"memberID": memberID, "problem": "tier", "recordedPoints": points, "expectedPoints": expectedPoints,
+                                  "difference": points - expectedPoints, "recordedRole": role, "expectedRole": expectedRole})
+    #Whoever is left bought something but isn't a member
+    for memberID, expectedPoints in expected.items():
+        discrepancies.append({"memberID": memberID, "problem": "unknown member", "recordedPoints": "", "expectedPoints": expectedPoints,
+                              "difference": "", "recordedRole": "", "expectedRole": getValidRole(expectedPoints)})
+    return discrepancies
+
+class Reconciliation:
+    def __init__(self, inv: Inventory = None, memberDB: MemberDatabase = None, workers: int = None, shardLength: int = 1):
+        self.__inventory = inv if inv else Inventory()
+        #Fixes are batched into one save of the members file
+        self.__memberDB = memberDB if memberDB else MemberDatabase(writeBehind=True)
+        self.__workers = workers if workers else os.cpu_count() or 1
+        #Members are sharded by the first shardLength characters of their ID (1 gives a shard per first initial)
+        self.__shardLength = shardLength
+
+    #Recomputes every member's points from the purchase history in parallel and compares them with the members file.
+    #Purchases rolled up by a history compaction count with the points recorded in their aggregate. Wrong tiers are fixed; points are only set to what the history says if fixPoints is given, since they can
+    #legitimately differ (points brought in by an import, or prices changed since the purchase)
+    def reconcile(self, reportFilename: str = None, fixPoints: bool = False) -> dict:
+        start = time.perf_counter()
+        memberDB = self.__memberDB
+        #Everything batched must be stored before the history is read
+        memberDB.flush()
+        #Picks up a compaction made since the history was loaded, so the aggregates match the history file
+        memberDB.loadHistory()
+        historyFile = memberDB.getHistoryFile()
+
+        members = {}
+        for memberID, member in memberDB.getAllMembers().items():
+            members.setdefault(memberID[:self.__shardLength], {})[memberID] = (member["points"], member["role"])
+
+        #Map: each worker sums a byte range of the history file (or a chunk of purchases read from storage without one).
+        #Reduce: each worker checks one shard of members
+        partials = {}
+        historyLines = 0
+        #Workers get plain prices, since the inventory's view of its items can't be sent to another process
+        prices = {itemID: item["price"] for itemID, item in self.__inventory.getPrices().items()}
+        with ProcessPoolExecutor(self.__workers, initializer=initWorker, initargs=(prices, MULTIPLIERS)) as pool:
+            if historyFile:
+                ranges = splitFile(historyFile, self.__workers) if os.path.exists(historyFile) else []
+                futures = [pool.submit(sumRange, historyFile, rangeStart, rangeEnd, self.__shardLength) for rangeStart, rangeEnd in ranges]
+            else:
+                futures = [pool.submit(sumPurchases, chunk, self.__shardLength)
+                           for chunk in chunkPurchases(memberDB.readAllPurchases(), CHUNK_PURCHASES)]
+            for future in futures:
+                shards, lines = future.result()
+                historyLines += lines
+                for shard, points in shards.items():
+                    partials.setdefault(shard, []).append(points)
+            #Compacted purchases are no longer in the history, only their points
+            aggregated = {}
+            aggregatedPurchases = 0
+            for memberID, aggregate in memberDB.getAggregates().items():
+                aggregated.setdefault(memberID[:self.__shardLength], {})[memberID] = aggregate["points"]
+                aggregatedPurchases += aggregate["purchases"]
+            for shard, points in aggregated.items():
+                partials.setdefault(shard, []).append(points)
+
+            shardNames = sorted(set(members) | set(partials))
+            results = pool.map(checkShard, [members.get(shard, {}) for shard in shardNames],
+                               [partials.get(shard, []) for shard in shardNames])
+            discrepancies = [discrepancy for result in results for discrepancy in result]
+
+        report = {"members": sum(len(shard) for shard in members.values()), "historyLines": historyLines,
+                  "aggregatedPurchases": aggregatedPurchases, "shards": len(shardNames),
+                  "pointDiscrepancies": 0, "tierDiscrepancies": 0, "unknownMembers": 0, "fixed": 0}
+        for discrepancy in discrepancies:
+            report[{"points": "pointDiscrepancies", "tier": "tierDiscrepancies", "unknown member": "unknownMembers"}[discrepancy["problem"]]] += 1
+        report["fixed"] = self.applyFixes(discrepancies, fixPoints)
+
+        if reportFilename:
+            with open(reportFilename, "w", newline="") as file:
+                writer = csv.DictWriter(file, REPORT_FIELDS)
+                writer.writeheader()
+                writer.writerows(discrepancies)
+        report["seconds"] = time.perf_counter() - start
+        return report
+
+    #Fixes tiers (and points, if asked) and saves the fixed members once, returning how many members were changed
+    def applyFixes(self, discrepancies: list, fixPoints: bool) -> int:
+        memberDB = self.__memberDB
+        fixed = set()
+        for discrepancy in discrepancies:
+            memberID = discrepancy["memberID"]
+            if discrepancy["problem"] == "points" and fixPoints:
+                #Points are only ever added to, so the difference is taken off (the tier follows the new points on save)
+                memberDB.updateMemberDetails(memberID, points=-discrepancy["difference"])
+                fixed.add(memberID)
+            elif discrepancy["problem"] == "tier":
+                fixed.add(memberID)
+        if fixed:
+            #Saving sets each member's tier from their points. Only the fixed members are written, so a backend that stores single
+            #rows keeps the points other tills added since the members were loaded
+            memberDB.saveMembers(fixed)
+        return len(fixed)
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.Reconciliation [report file] [--fix-points]
+    arguments = [argument for argument in sys.argv[1:] if argument != "--fix-points"]
+    reportFilename = arguments[0] if arguments else os.path.join(STORAGE_DIRECTORY, "RECONCILIATION.csv")
+    report = Reconciliation().reconcile(reportFilename, "--fix-points" in sys.argv)
+    print(f"Checked {report['members']} members against {report['historyLines']} history lines and {report['aggregatedPurchases']} "
+          f"compacted purchases in {report['shards']} shards "
+          f"({report['seconds']:.2f}s): {report['pointDiscrepancies']} point and {report['tierDiscrepancies']} tier discrepancies, "
+          f"{report['unknownMembers']} unknown members, {report['fixed']} members fixed. Report saved to '{reportFilename}'.")
@@ -0,0 +1,47 @@
+from collections.abc import Mapping
+
+#A read-only view of one record as {field: value}, reading each field straight from the record's getter when asked
+class RecordView(Mapping):
+    __slots__ = ("__record", "__fields")
+
+    def __init__(self, record, fields: dict):
+        self.__record = record
+        #Field name -> getter taking the record, e.g. {"name": Item.getName}
+        self.__fields = fields
+
+    def __getitem__(self, field: str):
+        return self.__fields[field](self.__record)
+
+    def __iter__(self):
+        return iter(self.__fields)
+
+    def __len__(self) -> int:
+        return len(self.__fields)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+#A read-only view of records keyed by ID, showing each one as a RecordView without copying anything.
+#getRecords returns the owner's current dictionary, so the view follows reloads and always shows the live values
+class CollectionView(Mapping):
+    __slots__ = ("__getRecords", "__fields")
+
+    def __init__(self, getRecords, fields: dict):
+        self.__getRecords = getRecords
+        self.__fields = fields
+
+    def __getitem__(self, recordID: str) -> RecordView:
+        return RecordView(self.__getRecords()[recordID], self.__fields)
+
+    def __contains__(self, recordID) -> bool:
+        return recordID in self.__getRecords()
+
+    #Iterates over the IDs held when iteration starts, so records added or removed meanwhile can't break the loop
+    def __iter__(self):
+        return iter(list(self.__getRecords()))
+
+    def __len__(self) -> int:
+        return len(self.__getRecords())
+
+    def __repr__(self) -> str:
+        return repr({recordID: dict(record) for recordID, record in self.items()})
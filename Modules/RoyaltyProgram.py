@@ -1,28 +1,64 @@
 import random
 import datetime
+from Modules.Console import say, WARNING
+
+#Points multipliers per weekday for item categories (the first three letters of the item ID)
+MULTIPLIERS = {
+    "Monday": {"KIT": 2},
+    "Tuesday": {"FRU": 2, "VEG": 2},
+    "Wednesday": {"TEC": 3},
+    "Thursday": {"CLO": 2, "SPT": 2},
+    "Friday": {"BEV": 3, "HOM": 2},
+    "Saturday": {"AUT": 3, "JWL": 2},
+    "Sunday": {"TOY": 3, "ART": 2},
+}
+
+ROLES = ["Apprentice", "Explorer", "Expert", "Master", "Legend"]
+
+#Reward rules, built once: the roles that may use each reward, what the cart needs, and the discount it is expected to give.
+#Both checks work on the cart facts gathered in one pass by RoyaltyProgram.getCartFacts
+REWARD_RULES = {
+    #15% off when spending more than $200, for every role
+    "Apprentice": (frozenset(ROLES), lambda facts: facts["total"] > 200,
+                   lambda facts: facts["total"] * 0.15),
+    #25% off one random item bought before
+    "Explorer": (frozenset(ROLES[1:]), lambda facts: bool(facts["boughtBefore"]),
+                 lambda facts: sum(facts["boughtBefore"].values()) / len(facts["boughtBefore"]) * 0.25),
+    #25-40% off between 0 and (items // 4) random items, one unit each
+    "Expert": (frozenset(ROLES[2:]), lambda facts: facts["itemCount"] >= 4,
+               lambda facts: (facts["itemCount"] // 4) / 2 * 0.325 * facts["unitPrices"] / facts["itemCount"]),
+    #40-80% off between 0 and (items // 3) random items, one unit each
+    "Master": (frozenset(ROLES[3:]), lambda facts: facts["itemCount"] >= 3,
+               lambda facts: (facts["itemCount"] // 3) / 2 * 0.6 * facts["unitPrices"] / facts["itemCount"]),
+    #The highest-costing seasonal item for free
+    "Legend": (frozenset(ROLES[4:]), lambda facts: facts["seasonal"],
+               lambda facts: facts["seasonalCost"]),
+}
 
 class RoyaltyProgram:
-    def __init__(self, memberID: str, cartInfo: dict[dict], itemInfo: dict, purchaseHist: dict[dict]):
+    def __init__(self, memberID: str, cartInfo: dict[dict], itemInfo: dict, purchaseHist: dict[dict] = None, purchasedItems: set = None,
+                 rng: random.Random = None):
         self.__member = memberID
         self.__cart = cartInfo
         self.__items = itemInfo
         self.__currentDay = datetime.datetime.now().strftime("%A")
-        self.__roles = ["Apprentice", "Explorer", "Expert", "Master", "Legend"]
-        self.__multipliers = {
-            "Monday": {"KIT": 2},
-            "Tuesday": {"FRU": 2, "VEG": 2},
-            "Wednesday": {"TEC": 3},
-            "Thursday": {"CLO": 2, "SPT": 2},
-            "Friday": {"BEV": 3, "HOM": 2},
-            "Saturday": {"AUT": 3, "JWL": 2},
-            "Sunday": {"TOY": 3, "ART": 2},
-        }
-
-        if self.__member in purchaseHist:
+        self.__roles = ROLES
+        self.__multipliers = MULTIPLIERS
+        #Reward evaluations per (role, total), so the cart is only walked once for all the checks of a checkout
+        self.__evaluations = {}
+        #Where the perks draw their random items and percentages from; a seeded Random makes them repeatable
+        self.__rng = rng if rng else random
+
+        if purchaseHist and self.__member in purchaseHist:
             self.__history = purchaseHist[self.__member]
         else:
             self.__history = {}
 
+        #Every item the member has bought before, so reward checks only look at the cart
+        if purchasedItems is None:
+            purchasedItems = set(item for purchases in self.__history.values() for item in purchases.keys())
+        self.__purchasedItems = purchasedItems
+
     #Get multiplier for a given category on the current day
     def getMultiplier(self, category: str) -> int:
         return self.__multipliers.get(self.__currentDay, {}).get(category, 1)
@@ -38,7 +74,7 @@ class RoyaltyProgram:
     #Validate the role entered
     def validateRole(self, role: str) -> str:
         while not self.isRole(role):
-            print(f"Invalid role entered. Available roles: {', '.join(self.__roles)}.")
+            say(f"Invalid role entered. Available roles: {', '.join(self.__roles)}.", WARNING)
             role = input("Enter a valid role or '0' to cancel: ").strip()
             
             #Customer opts out of using a reward
@@ -60,31 +96,39 @@ class RoyaltyProgram:
 
         return totalPoints + points
 
+    #Gathers everything the reward rules look at in a single pass over the cart
+    def getCartFacts(self, total: float) -> dict:
+        facts = {"total": total, "itemCount": 0, "unitPrices": 0, "boughtBefore": {}, "seasonal": False,
+                 "seasonalItem": None, "seasonalCost": 0}
+        for itemID, quantity in self.__cart[self.__member].items():
+            item = self.__items[itemID]
+            facts["itemCount"] += 1
+            facts["unitPrices"] += item["price"]
+            if itemID in self.__purchasedItems:
+                facts["boughtBefore"][itemID] = item["price"] * quantity
+            if item["seasonal"]:
+                facts["seasonal"] = True
+            if item["seasonal"] == True and item["price"] * quantity > facts["seasonalCost"]:
+                facts["seasonalItem"] = itemID
+                facts["seasonalCost"] = item["price"] * quantity
+        return facts
+
+    #Evaluates every reward at once, returning whether the role can use it and the discount it is expected to give
+    def evaluateRewards(self, role: str, total: float) -> dict[dict]:
+        if (role, total) not in self.__evaluations:
+            facts = self.getCartFacts(total)
+            evaluation = {}
+            for reward, (roles, isMet, expectedDiscount) in REWARD_RULES.items():
+                eligible = role in roles and isMet(facts)
+                evaluation[reward] = {"eligible": eligible, "discount": expectedDiscount(facts) if eligible else 0.0}
+            self.__evaluations[(role, total)] = evaluation
+        return self.__evaluations[(role, total)]
+
     #Check eligibility for a reward
     def isEligible(self,role:str, total:int, reward:str ="Apprentice") -> bool:
-        if reward == "Apprentice":
-            return total > 200
-
-        if reward == "Explorer":
-            if not self.__history:
-                return False
-            for item_id in self.__cart[self.__member]:
-                for history_date, history_cart in self.__history.items():
-                    if item_id in history_cart:
-                        return role in ["Explorer", "Expert", "Master", "Legend"]
-
-        if reward == "Expert":
-            return len(self.__cart[self.__member]) >= 4 and role in ["Expert", "Master", "Legend"]
-
-        if reward == "Master":
-            return len(self.__cart[self.__member]) >= 3 and role in ["Master", "Legend"]
-
-        if reward == "Legend":
-            for itemID in self.__cart[self.__member]:
-                if self.__items[itemID]["seasonal"]:
-                    return role == "Legend"
-                
-        return False
+        if reward not in REWARD_RULES:
+            return False
+        return self.evaluateRewards(role, total)[reward]["eligible"]
 
     #Checking reward entered is valid before further checks
     def isEligibleForReward(self, role: str, total: float, reward: str) -> bool:
@@ -96,40 +140,32 @@ class RoyaltyProgram:
 
         # Check eligibility
         if not self.isEligible(role, total, reward):
-            print(f"You are not eligible for the '{reward}' reward with your current role '{role}' or purchase total ${total:.2f}.")
+            say(f"You are not eligible for the '{reward}' reward with your current role '{role}' or purchase total ${total:.2f}.", WARNING)
             return False
 
         return True
     
     #Finds the highest-costing seasonal item in the cart and returns its ID and cost
     def getHighestCostSeasonalItem(self) -> tuple:
-        highestCost = 0
-        highestItemID = None
-
-        for itemID, quantity in self.__cart[self.__member].items():
-            if self.__items[itemID]["seasonal"] == True:
-                itemCost = self.__items[itemID]["price"] * quantity
-                if itemCost > highestCost:
-                    highestCost = itemCost
-                    highestItemID = itemID
-
-        return highestItemID, highestCost
+        facts = self.getCartFacts(0)
+        return facts["seasonalItem"], facts["seasonalCost"]
     
     #Display eligible rewards for a role
     def displayAbilities(self, role: str, total: int) -> None:
-        eligibleRewards = [r for r in self.__roles if self.isEligible(role, total, r)]
+        evaluation = self.evaluateRewards(role, total)
+        eligibleRewards = [r for r in self.__roles if evaluation[r]["eligible"]]
         if eligibleRewards:
             for reward in eligibleRewards:
-                print(f"Customer is eligible for {reward} reward")
+                say(f"Customer is eligible for {reward} reward (about ${evaluation[reward]['discount']:.2f} off)")
         else:
-            print("Customer isn't eligible for a reward!")
+            say("Customer isn't eligible for a reward!")
 
     #Use abilities based on the role and reward
     def useAbilities(self, role: str, reward: str, total: float = 0) -> float:
         role = self.validateRole(role)
 
         if not self.isEligible(role, total, reward):
-            print(f"Customer is not eligible for {reward} reward.")
+            say(f"Customer is not eligible for {reward} reward.", WARNING)
             return 0.0
 
         if reward == "Apprentice":
@@ -149,46 +185,44 @@ class RoyaltyProgram:
 
     #Apply a 25% discount on a random item the customer has bought before.
     def explorerPerks(self) -> float:
-        userHistory = self.__history
-        uniqueItems = set(item for purchases in userHistory.values() for item in purchases.keys())
-        boughtBefore = [item for item in self.__cart[self.__member] if item in uniqueItems]
+        boughtBefore = [item for item in self.__cart[self.__member] if item in self.__purchasedItems]
 
         if not boughtBefore:
             return 0
 
-        discountedItem = random.choice(boughtBefore)
+        discountedItem = self.__rng.choice(boughtBefore)
         itemQuantity = self.__cart[self.__member][discountedItem]
         itemPrice = self.__items[discountedItem]['price']
         discountAmt = 0.25 * itemPrice * itemQuantity
 
-        print(f"Discounted Item: {self.__items[discountedItem]['name']} @25%. NetPrice: {(itemPrice - discountAmt):.2f}")
+        say(f"Discounted Item: {self.__items[discountedItem]['name']} @25%. NetPrice: {(itemPrice - discountAmt):.2f}")
         return discountAmt
 
     #Appy a 25-40% discount to at least 0 items. Then for every 4 items they have a chance of another item.
     def expertPerks(self) -> float:
-        perkAmount = random.randint(0, len(self.__cart[self.__member])//4)
-        percentageAmount = random.randint(25, 40)/100
-        discountedItems = random.sample(sorted(self.__cart[self.__member].keys()), perkAmount)
+        perkAmount = self.__rng.randint(0, len(self.__cart[self.__member])//4)
+        percentageAmount = self.__rng.randint(25, 40)/100
+        discountedItems = self.__rng.sample(sorted(self.__cart[self.__member].keys()), perkAmount)
         discountAmt = 0
 
         for x in discountedItems:
             discountVal = self.__items[x]['price'] * percentageAmount
             discountAmt += discountVal
-            print(f"Discounted Item: {x} @{percentageAmount*100:.0f}%. NetPrice: {(self.__items[x]['price'] - discountVal):.2f}")
+            say(f"Discounted Item: {x} @{percentageAmount*100:.0f}%. NetPrice: {(self.__items[x]['price'] - discountVal):.2f}")
 
         return discountAmt
 
     #Apply a 40-80% discount to at least 0 items. Then for every 3 items they have a chance of another item.
     def masterPerks(self) -> float:
-        perkAmount = random.randint(0, len(self.__cart[self.__member])//3)
-        percentageAmount = random.randint(40, 80)/100
-        discountedItems = random.sample(sorted(self.__cart[self.__member]), perkAmount)
+        perkAmount = self.__rng.randint(0, len(self.__cart[self.__member])//3)
+        percentageAmount = self.__rng.randint(40, 80)/100
+        discountedItems = self.__rng.sample(sorted(self.__cart[self.__member]), perkAmount)
         discountAmt = 0
 
         for x in discountedItems:
             discountVal = self.__items[x]['price']*percentageAmount
             discountAmt += discountVal
-            print(f"Discounted Item: {x} @{percentageAmount*100:.0f}%. NetPrice: {(self.__items[x]['price'] - discountVal):.2f}")
+            say(f"Discounted Item: {x} @{percentageAmount*100:.0f}%. NetPrice: {(self.__items[x]['price'] - discountVal):.2f}")
 
         self.getPoints()
         return discountAmt
@@ -197,6 +231,6 @@ class RoyaltyProgram:
     def legendPerks(self) -> float:
         itemID, highestCost = self.getHighestCostSeasonalItem()
         if itemID:
-            print(f"Legend Perk Applied: {self.__items[itemID]['name']} (ID: {itemID}) @ ${highestCost:.2f}")
+            say(f"Legend Perk Applied: {self.__items[itemID]['name']} (ID: {itemID}) @ ${highestCost:.2f}")
             self.getPoints(-1000)
         return highestCost
\ No newline at end of file
@@ -0,0 +1,325 @@
+import os
+import re
+import sys
+import datetime
+import numpy as np
+from Modules.InventoryManagement import Inventory
+from Modules.MembershipSystem import MemberDatabase
+from Modules.StorageBackends import SQLiteStorage
+from Modules.Console import say, WARNING
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+ROLES = ["Apprentice", "Explorer", "Expert", "Master", "Legend"]
+#History lines look like MEMBERID:YYYY-MM-DD:(ITEMID,QUANTITY):(ITEMID,QUANTITY)...
+HEADER_PATTERN = re.compile(rb"^([^:\n]*):([^:\n]*):", re.MULTILINE)
+ITEM_PATTERN = re.compile(rb"\(([^,\n]*),\s*(\d+)\s*\)")
+BLANK_LINES = re.compile(rb"\n\s*\n")
+
+#Cuts the text between each start and end position out of a byte buffer as a fixed-width bytes array
+def getTextColumn(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    width = max(int((ends - starts).max()), 1) if len(starts) else 1
+    positions = starts[:, None] + np.arange(width)
+    characters = np.where(positions < ends[:, None], buffer[np.minimum(positions, len(buffer) - 1)], 0).astype(np.uint8)
+    return characters.view(f"S{width}").ravel()
+
+#Reads the digits between each start and end position as numbers, or returns None if any field isn't a plain number
+def getNumberColumn(buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray | None:
+    lengths = ends - starts
+    if not len(starts):
+        return np.zeros(0, dtype=np.int64)
+    if lengths.min() < 1 or lengths.max() > 18:
+        return None
+    width = int(lengths.max())
+    positions = starts[:, None] + np.arange(width)
+    inField = positions < ends[:, None]
+    digits = buffer[np.minimum(positions, len(buffer) - 1)].astype(np.int64) - ord("0")
+    if np.any(inField & ((digits < 0) | (digits > 9))):
+        return None
+    powers = np.where(inField, 10 ** np.maximum(lengths[:, None] - 1 - np.arange(width), 0), 0)
+    return (digits * powers).sum(axis=1)
+
+#Turns a bytes column into integer codes, giving unseen values the next free code (or the value from makeCode)
+def encodeColumn(values: np.ndarray, codes: dict, makeCode=None) -> np.ndarray:
+    #IDs of up to 8 bytes are sorted as plain integers, which is much faster than sorting strings
+    if values.dtype.itemsize <= 8:
+        uniqueValues, inverse = np.unique(values.astype("S8").view(np.uint64), return_inverse=True)
+        uniqueValues = uniqueValues.view("S8")
+    else:
+        uniqueValues, inverse = np.unique(values, return_inverse=True)
+    mapping = []
+    for value in uniqueValues:
+        key = value.decode()
+        if key not in codes:
+            codes[key] = makeCode(key) if makeCode else len(codes)
+        mapping.append(codes[key])
+    return np.array(mapping, dtype=np.int32)[inverse.ravel()]
+
+#Purchases read from a storage backend without a history file are added to the columns this many at a time
+CHUNK_PURCHASES = 100000
+
+class SalesAnalytics:
+    def __init__(self, memberDB: MemberDatabase = None, chunkBytes: int = 32 * 1024 * 1024):
+        #The history is read from wherever the member database keeps it
+        self.__memberDB = memberDB if memberDB else MemberDatabase()
+        #A history file is parsed in chunks of this many bytes so memory stays bounded while the columns are built
+        self.__chunkBytes = chunkBytes
+        #Member and item IDs are stored once and referred to by their position (code) in the columns
+        self.__memberIDs = []
+        self.__itemIDs = []
+        #One entry per purchased item line: member code, date (day ordinal), item code and quantity
+        self.__memberColumn = np.zeros(0, dtype=np.int32)
+        self.__dateColumn = np.zeros(0, dtype=np.int32)
+        self.__itemColumn = np.zeros(0, dtype=np.int32)
+        self.__quantityColumn = np.zeros(0, dtype=np.int64)
+        #(first date, last date, purchases) of each member's compacted purchases, which are only kept as totals without dates
+        self.__compacted = []
+        self.loadHistory()
+
+    #Streams the purchase history into columnar arrays: a text history file a chunk of bytes at a time, any other storage a chunk
+    #of purchases at a time
+    def loadHistory(self) -> None:
+        memberDB = self.__memberDB
+        #Everything batched must be stored before the history is read, and a compaction since the last load picked up
+        memberDB.flush()
+        memberDB.loadHistory()
+        memberCodes = {}
+        itemCodes = {}
+        dateOrdinals = {}
+        columns = ([], [], [], [])
+
+        historyFile = memberDB.getHistoryFile()
+        if historyFile:
+            try:
+                with open(historyFile, "rb") as file:
+                    leftover = b""
+                    while True:
+                        data = file.read(self.__chunkBytes)
+                        if not data:
+                            break
+                        #Only whole lines are parsed, the partial last line waits for the next chunk
+                        data = leftover + data
+                        cut = data.rfind(b"\n") + 1
+                        leftover = data[cut:]
+                        self.parseChunk(data[:cut], memberCodes, itemCodes, dateOrdinals, columns)
+                    if leftover.strip():
+                        self.parseChunk(leftover + b"\n", memberCodes, itemCodes, dateOrdinals, columns)
+            except FileNotFoundError:
+                say(f"File '{historyFile}' not found. Starting with an empty purchase history.", WARNING)
+        else:
+            chunk = []
+            for purchase in memberDB.readAllPurchases():
+                chunk.append(purchase)
+                if len(chunk) >= CHUNK_PURCHASES:
+                    self.addPurchases(chunk, memberCodes, itemCodes, dateOrdinals, columns)
+                    chunk = []
+            self.addPurchases(chunk, memberCodes, itemCodes, dateOrdinals, columns)
+
+        self.__compacted = [(aggregate["first"], aggregate["last"], aggregate["purchases"]) for aggregate in memberDB.getAggregates().values()]
+        if self.__compacted:
+            say(f"{sum(purchases for _, _, purchases in self.__compacted)} purchases made up to {max(last for _, last, _ in self.__compacted)} "
+                f"were compacted into per-member totals and are left out of these figures.", WARNING)
+
+        self.__memberIDs = list(memberCodes)
+        self.__itemIDs = list(itemCodes)
+        self.__memberColumn = np.concatenate(columns[0]) if columns[0] else np.zeros(0, dtype=np.int32)
+        self.__dateColumn = np.concatenate(columns[1]) if columns[1] else np.zeros(0, dtype=np.int32)
+        self.__itemColumn = np.concatenate(columns[2]) if columns[2] else np.zeros(0, dtype=np.int32)
+        self.__quantityColumn = np.concatenate(columns[3]) if columns[3] else np.zeros(0, dtype=np.int64)
+
+    #Parses a block of whole history lines into arrays and adds them to the columns
+    def parseChunk(self, data: bytes, memberCodes: dict, itemCodes: dict, dateOrdinals: dict, columns: tuple) -> None:
+        #Blank lines and carriage returns would throw off the line numbering below
+        data = BLANK_LINES.sub(b"\n", data.replace(b"\r", b"")).lstrip(b"\n")
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        if not len(buffer):
+            return
+
+        #Every field is located from the positions of its delimiters, so no python code runs per line
+        newlines = np.flatnonzero(buffer == ord("\n"))
+        colons = np.flatnonzero(buffer == ord(":"))
+        opens = np.flatnonzero(buffer == ord("("))
+        commas = np.flatnonzero(buffer == ord(","))
+        closes = np.flatnonzero(buffer == ord(")"))
+        lineStarts = np.concatenate(([0], newlines[:-1] + 1))
+        firstColons = np.searchsorted(colons, lineStarts)
+
+        wellFormed = (len(opens) == len(commas) == len(closes) and len(colons) >= 2 * len(lineStarts)
+                      and np.all(firstColons + 1 < len(colons)))
+        if wellFormed:
+            memberEnds = colons[firstColons]
+            dateEnds = colons[firstColons + 1]
+            wellFormed = np.all(memberEnds < newlines) and np.all(dateEnds < newlines)
+        if wellFormed:
+            quantities = getNumberColumn(buffer, commas + 1, closes)
+            wellFormed = quantities is not None
+        if not wellFormed:
+            self.parseChunkByPattern(data, memberCodes, itemCodes, dateOrdinals, columns)
+            return
+
+        lineMembers = encodeColumn(getTextColumn(buffer, lineStarts, memberEnds), memberCodes)
+        lineDates = self.getDateColumn(buffer, memberEnds + 1, dateEnds, dateOrdinals)
+        lineOfEntry = np.searchsorted(newlines, opens)
+
+        columns[0].append(lineMembers[lineOfEntry])
+        columns[1].append(lineDates[lineOfEntry])
+        columns[2].append(encodeColumn(getTextColumn(buffer, opens + 1, commas), itemCodes))
+        columns[3].append(quantities)
+
+    #Turns the YYYY-MM-DD fields between each start and end position into day ordinals
+    def getDateColumn(self, buffer: np.ndarray, starts: np.ndarray, ends: np.ndarray, dateOrdinals: dict) -> np.ndarray:
+        #Dates are read as YYYYMMDD numbers first so only the distinct days go through datetime
+        if np.all(ends - starts == 10):
+            years = getNumberColumn(buffer, starts, starts + 4)
+            months = getNumberColumn(buffer, starts + 5, starts + 7)
+            days = getNumberColumn(buffer, starts + 8, starts + 10)
+            if years is not None and months is not None and days is not None:
+                uniqueDates, inverse = np.unique(years * 10000 + months * 100 + days, return_inverse=True)
+                mapping = []
+                for number in uniqueDates.tolist():
+                    date = f"{number // 10000:04d}-{number // 100 % 100:02d}-{number % 100:02d}"
+                    if date not in dateOrdinals:
+                        dateOrdinals[date] = datetime.date.fromisoformat(date).toordinal()
+                    mapping.append(dateOrdinals[date])
+                return np.array(mapping, dtype=np.int32)[inverse.ravel()]
+        return encodeColumn(getTextColumn(buffer, starts, ends), dateOrdinals, lambda date: datetime.date.fromisoformat(date).toordinal())
+
+    #Slower regular expression parser for chunks that don't follow the usual layout exactly
+    def parseChunkByPattern(self, data: bytes, memberCodes: dict, itemCodes: dict, dateOrdinals: dict, columns: tuple) -> None:
+        memberColumn, dateColumn, itemColumn, quantityColumn = [], [], [], []
+        for line in data.split(b"\n"):
+            header = HEADER_PATTERN.match(line)
+            if not header:
+                continue
+            memberCode = memberCodes.setdefault(header.group(1).decode(), len(memberCodes))
+            date = header.group(2).decode()
+            if date not in dateOrdinals:
+                dateOrdinals[date] = datetime.date.fromisoformat(date).toordinal()
+            for itemID, quantity in ITEM_PATTERN.findall(line, header.end()):
+                memberColumn.append(memberCode)
+                dateColumn.append(dateOrdinals[date])
+                itemColumn.append(itemCodes.setdefault(itemID.strip().decode(), len(itemCodes)))
+                quantityColumn.append(int(quantity))
+
+        columns[0].append(np.array(memberColumn, dtype=np.int32))
+        columns[1].append(np.array(dateColumn, dtype=np.int32))
+        columns[2].append(np.array(itemColumn, dtype=np.int32))
+        columns[3].append(np.array(quantityColumn, dtype=np.int64))
+
+    #Adds purchases of (memberID, date, {itemID: quantity}) read from storage to the columns
+    def addPurchases(self, purchases: list, memberCodes: dict, itemCodes: dict, dateOrdinals: dict, columns: tuple) -> None:
+        memberColumn, dateColumn, itemColumn, quantityColumn = [], [], [], []
+        for memberID, date, items in purchases:
+            memberCode = memberCodes.setdefault(memberID, len(memberCodes))
+            if date not in dateOrdinals:
+                dateOrdinals[date] = datetime.date.fromisoformat(date).toordinal()
+            for itemID, quantity in items.items():
+                memberColumn.append(memberCode)
+                dateColumn.append(dateOrdinals[date])
+                itemColumn.append(itemCodes.setdefault(itemID, len(itemCodes)))
+                quantityColumn.append(quantity)
+
+        columns[0].append(np.array(memberColumn, dtype=np.int32))
+        columns[1].append(np.array(dateColumn, dtype=np.int32))
+        columns[2].append(np.array(itemColumn, dtype=np.int32))
+        columns[3].append(np.array(quantityColumn, dtype=np.int64))
+
+    #Returns how many compacted purchases may fall between two dates (inclusive, 'YYYY-MM-DD'). Only each member's first and last
+    #compacted dates are kept, so every compacted purchase of a member whose dates overlap the range is counted
+    def getCompactedPurchases(self, startDate: str = None, endDate: str = None) -> int:
+        return sum(purchases for first, last, purchases in self.__compacted
+                   if (not startDate or last >= startDate) and (not endDate or first <= endDate))
+
+    #Returns the number of purchased item lines loaded
+    def getRowCount(self) -> int:
+        return len(self.__quantityColumn)
+
+    #Returns the loaded columns: member IDs, item IDs, then the member, date, item and quantity of every row
+    def getColumns(self) -> tuple:
+        return (self.__memberIDs, self.__itemIDs, self.__memberColumn, self.__dateColumn, self.__itemColumn, self.__quantityColumn)
+
+    #Returns a mask selecting the rows between two dates (inclusive, 'YYYY-MM-DD')
+    def getDateMask(self, startDate: str = None, endDate: str = None) -> np.ndarray:
+        mask = np.ones(len(self.__dateColumn), dtype=bool)
+        if startDate:
+            mask &= self.__dateColumn >= datetime.date.fromisoformat(startDate).toordinal()
+        if endDate:
+            mask &= self.__dateColumn <= datetime.date.fromisoformat(endDate).toordinal()
+        return mask
+
+    #Returns the price of every item code, joined from the inventory (0 for items no longer sold)
+    def getPriceColumn(self, itemInfo: dict) -> np.ndarray:
+        return np.array([itemInfo[itemID]["price"] if itemID in itemInfo else 0.0 for itemID in self.__itemIDs], dtype=np.float64)
+
+    #Sums units and revenue per group, where groupCodes gives each row's group and labels names the groups
+    def groupTotals(self, groupCodes: np.ndarray, labels: list, quantities: np.ndarray, revenue: np.ndarray) -> dict:
+        units = np.bincount(groupCodes, weights=quantities, minlength=len(labels))
+        sales = np.bincount(groupCodes, weights=revenue, minlength=len(labels))
+        return {labels[code]: {"units": int(units[code]), "revenue": round(float(sales[code]), 2)}
+                for code in np.flatnonzero(units)}
+
+    #Units and revenue per item, per category, per member tier and per weekday for a date range
+    def summarize(self, itemInfo: dict, memberInfo: dict = None, startDate: str = None, endDate: str = None) -> dict:
+        mask = self.getDateMask(startDate, endDate)
+        items = self.__itemColumn[mask]
+        quantities = self.__quantityColumn[mask]
+        revenue = quantities * self.getPriceColumn(itemInfo)[items]
+
+        #Category is the three letter prefix of the item ID (see Inventory_IDs.txt)
+        categories = sorted({itemID[:3] for itemID in self.__itemIDs})
+        categoryCodes = {category: code for code, category in enumerate(categories)}
+        itemCategory = np.array([categoryCodes[itemID[:3]] for itemID in self.__itemIDs], dtype=np.int32)
+
+        #Weekday from the day ordinal (ordinal 1 was a Monday)
+        weekdays = (self.__dateColumn[mask] - 1) % 7
+
+        summary = {
+            "rows": int(mask.sum()),
+            "units": int(quantities.sum()),
+            "revenue": round(float(revenue.sum()), 2),
+            "items": self.groupTotals(items, self.__itemIDs, quantities, revenue),
+            "categories": self.groupTotals(itemCategory[items], categories, quantities, revenue),
+            "weekdays": self.groupTotals(weekdays, WEEKDAYS, quantities, revenue),
+            #Compacted purchases have no per-day rows, so they are left out of every figure above
+            "compactedPurchases": self.getCompactedPurchases(startDate, endDate),
+        }
+
+        if memberInfo is not None:
+            #Members no longer in the database are grouped as Unknown
+            tiers = ROLES + ["Unknown"]
+            memberTier = np.array([tiers.index(memberInfo[memberID]["role"]) if memberID in memberInfo else len(ROLES)
+                                   for memberID in self.__memberIDs], dtype=np.int32)
+            summary["tiers"] = self.groupTotals(memberTier[self.__memberColumn[mask]], tiers, quantities, revenue)
+        return summary
+
+    #Figures for a single day (today if no date is given)
+    def endOfDay(self, itemInfo: dict, memberInfo: dict = None, date: str = None) -> dict:
+        date = date if date else datetime.date.today().isoformat()
+        return self.summarize(itemInfo, memberInfo, date, date)
+
+    #Figures for a calendar month given as 'YYYY-MM' (this month if not given)
+    def monthEnd(self, itemInfo: dict, memberInfo: dict = None, month: str = None) -> dict:
+        first = datetime.date.fromisoformat((month if month else datetime.date.today().strftime("%Y-%m")) + "-01")
+        nextMonth = (first + datetime.timedelta(days=32)).replace(day=1)
+        return self.summarize(itemInfo, memberInfo, first.isoformat(), (nextMonth - datetime.timedelta(days=1)).isoformat())
+
+#Prints a summary in a readable layout
+def printSummary(summary: dict) -> None:
+    print(f"Lines: {summary['rows']}  Units: {summary['units']}  Revenue: ${summary['revenue']:.2f}")
+    if summary.get("compactedPurchases"):
+        print(f"Left out: up to {summary['compactedPurchases']} compacted purchases in this range (only their per-member totals are kept)")
+    for section in ["categories", "tiers", "weekdays"]:
+        if section in summary:
+            print(f"\n{section.title()}:")
+            for name, totals in sorted(summary[section].items(), key=lambda entry: -entry[1]["revenue"]):
+                print(f"  {name:<12} {totals['units']:>10} units  ${totals['revenue']:>14.2f}")
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.SalesAnalytics [start date] [end date]
+    #Reads the SQLite database named by YOUWEE_DATABASE instead of the text files, like Main
+    database = os.environ.get("YOUWEE_DATABASE")
+    storage = SQLiteStorage(database) if database else None
+    memberDB = MemberDatabase(storage=storage)
+    analytics = SalesAnalytics(memberDB)
+    startDate = sys.argv[1] if len(sys.argv) > 1 else None
+    endDate = sys.argv[2] if len(sys.argv) > 2 else startDate
+    printSummary(analytics.summarize(Inventory(storage=storage).getPrices(), memberDB.getAllMembers(), startDate, endDate))
@@ -0,0 +1,215 @@
+import os
+import mmap
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+#File layout: an 8 byte magic marker and a record count, followed by fixed-width (itemID, stock, version) records
+MAGIC = b"YWSTOCK1"
+HEADER = struct.Struct("<8sQ")
+RECORD = struct.Struct("<16sqq")
+ID_LENGTH = 16
+#Number of in-process locks the records are spread over (file locks are per-process, so threads need their own)
+LOCK_STRIPES = 64
+
+class SharedStockTable:
+    def __init__(self, filename: str):
+        self.__filename = filename
+        self.__file = os.fdopen(os.open(filename, os.O_RDWR | os.O_CREAT), "r+b")
+        self.__index = {}
+        self.__map = None
+        self.__threadLocks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self.__mapLock = threading.RLock()
+
+        with self.__mapLock:
+            self.lockRange(0, HEADER.size)
+            try:
+                if os.fstat(self.__file.fileno()).st_size < HEADER.size:
+                    self.__file.truncate(0)
+                    self.__file.write(HEADER.pack(MAGIC, 0))
+                    self.__file.flush()
+            finally:
+                self.unlockRange(0, HEADER.size)
+            self.remap()
+
+    #Locks a byte range of the file against other processes (blocks until it is free). A shared lock only keeps writers out
+    def lockRange(self, offset: int, length: int, shared: bool = False) -> None:
+        if fcntl:
+            fcntl.lockf(self.__file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX, length, offset, os.SEEK_SET)
+            return
+        #msvcrt has no shared locks, so readers lock the range like writers there.
+        #Its LK_LOCK raises after retrying for about ten seconds, so it is tried again until the range is free
+        while True:
+            os.lseek(self.__file.fileno(), offset, os.SEEK_SET)
+            try:
+                msvcrt.locking(self.__file.fileno(), msvcrt.LK_LOCK, length)
+                return
+            except OSError:
+                continue
+
+    #Releases a byte range locked with lockRange
+    def unlockRange(self, offset: int, length: int) -> None:
+        if fcntl:
+            fcntl.lockf(self.__file.fileno(), fcntl.LOCK_UN, length, offset, os.SEEK_SET)
+        else:
+            os.lseek(self.__file.fileno(), offset, os.SEEK_SET)
+            msvcrt.locking(self.__file.fileno(), msvcrt.LK_UNLCK, length)
+
+    #Maps the file again and indexes any records other processes have appended since the last map
+    def remap(self) -> None:
+        with self.__mapLock:
+            #The old map is left for the garbage collector, so readers still using it are never cut off
+            newMap = mmap.mmap(self.__file.fileno(), 0)
+            magic, count = HEADER.unpack_from(newMap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"File '{self.__filename}' is not a shared stock table.")
+
+            count = min(count, (len(newMap) - HEADER.size) // RECORD.size)
+            for position in range(len(self.__index), count):
+                itemID = RECORD.unpack_from(newMap, self.getOffset(position))[0]
+                self.__index[itemID.rstrip(b"\0").decode()] = position
+            self.__map = newMap
+
+    #Remaps if other processes have added records since the last map
+    def refreshIndex(self) -> None:
+        if HEADER.unpack_from(self.__map, 0)[1] > len(self.__index):
+            self.remap()
+
+    #Returns the byte offset of a record
+    def getOffset(self, position: int) -> int:
+        return HEADER.size + position * RECORD.size
+
+    #Returns the record position of an item, picking up records added by other processes if needed
+    def getPosition(self, itemID: str) -> int | None:
+        position = self.__index.get(itemID)
+        if position is None:
+            self.refreshIndex()
+            position = self.__index.get(itemID)
+        return position
+
+    #Checks if an item has a record in the table
+    def isItem(self, itemID: str) -> bool:
+        return self.getPosition(itemID) is not None
+
+    #Adds records for items that aren't in the table yet, leaving existing stock levels alone
+    def addItems(self, stockLevels: dict) -> None:
+        with self.__mapLock:
+            self.lockRange(0, HEADER.size)
+            try:
+                self.refreshIndex()
+                newItems = [(itemID, stock) for itemID, stock in stockLevels.items() if itemID not in self.__index]
+                if not newItems:
+                    return
+                for itemID, stock in newItems:
+                    if len(itemID.encode()) > ID_LENGTH:
+                        raise ValueError(f"Item ID {itemID} is longer than {ID_LENGTH} bytes.")
+
+                count = len(self.__index)
+                self.__file.seek(self.getOffset(count))
+                self.__file.write(b"".join(RECORD.pack(itemID.encode(), stock, 0) for itemID, stock in newItems))
+                self.__file.seek(0)
+                self.__file.write(HEADER.pack(MAGIC, count + len(newItems)))
+                self.__file.flush()
+                self.remap()
+            finally:
+                self.unlockRange(0, HEADER.size)
+
+    #Returns the stock level and version of an item, or None if it isn't in the table. The record is read under its locks,
+    #so the stock and version always come from the same write
+    def getRecord(self, itemID: str) -> tuple | None:
+        position = self.getPosition(itemID)
+        if position is None:
+            return None
+        offset = self.getOffset(position)
+        #The thread lock also stops this thread's shared lock from replacing another thread's write lock, since file locks are per-process
+        with self.__threadLocks[position % LOCK_STRIPES]:
+            self.lockRange(offset, RECORD.size, shared=True)
+            try:
+                _, stock, version = RECORD.unpack_from(self.__map, offset)
+            finally:
+                self.unlockRange(offset, RECORD.size)
+        return stock, version
+
+    #Returns the stock level of every item in the table, read under the locks of every record like getRecord
+    def getAllStock(self) -> dict:
+        self.refreshIndex()
+        data = {}
+        #Records other threads add meanwhile are left for the next call
+        with self.__mapLock:
+            records = list(self.__index.items())
+        count = len(records)
+        if not count:
+            return data
+        #Every thread lock is taken, in the same order changeStock takes them
+        for threadLock in self.__threadLocks:
+            threadLock.acquire()
+        try:
+            self.lockRange(HEADER.size, count * RECORD.size, shared=True)
+            try:
+                for itemID, position in records:
+                    data[itemID] = RECORD.unpack_from(self.__map, self.getOffset(position))[1]
+            finally:
+                self.unlockRange(HEADER.size, count * RECORD.size)
+        finally:
+            for threadLock in self.__threadLocks:
+                threadLock.release()
+        return data
+
+    #Applies changes to several records in place while holding their locks. Returns False (changing nothing) if any would fail
+    def changeStock(self, itemIDs: list, changeFunction) -> bool:
+        positions = {}
+        for itemID in itemIDs:
+            position = self.getPosition(itemID)
+            if position is None:
+                return False
+            positions[itemID] = position
+
+        ordered = sorted(set(positions.values()))
+        stripes = sorted({position % LOCK_STRIPES for position in ordered})
+        for stripe in stripes:
+            self.__threadLocks[stripe].acquire()
+        try:
+            for position in ordered:
+                self.lockRange(self.getOffset(position), RECORD.size)
+            try:
+                updated = {}
+                for itemID, position in positions.items():
+                    _, stock, version = RECORD.unpack_from(self.__map, self.getOffset(position))
+                    newStock = changeFunction(itemID, stock)
+                    if newStock is None or newStock < 0:
+                        return False
+                    updated[itemID] = (newStock, version + 1)
+
+                for itemID, (stock, version) in updated.items():
+                    RECORD.pack_into(self.__map, self.getOffset(positions[itemID]), itemID.encode(), stock, version)
+                return True
+            finally:
+                for position in ordered:
+                    self.unlockRange(self.getOffset(position), RECORD.size)
+        finally:
+            for stripe in stripes:
+                self.__threadLocks[stripe].release()
+
+    #Sets stock levels directly
+    def setStock(self, stockLevels: dict) -> bool:
+        return self.changeStock(list(stockLevels), lambda itemID, stock: stockLevels[itemID])
+
+    #Adds (or with negative amounts removes) stock in place. Fails without changing anything if any item would go below zero
+    def adjustStock(self, changes: dict) -> bool:
+        return self.changeStock(list(changes), lambda itemID, stock: stock + changes[itemID])
+
+    #Writes the mapped pages back to disk
+    def flush(self) -> None:
+        self.__map.flush()
+
+    #Closes the table
+    def close(self) -> None:
+        with self.__mapLock:
+            self.__map.flush()
+            self.__map.close()
+            self.__file.close()
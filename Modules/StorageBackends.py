@@ -0,0 +1,1015 @@
+import os
+import sys
+import hashlib
+import sqlite3
+import itertools
+import threading
+import contextlib
+from Modules.StorageUtils import getFileSignature, atomicWrite
+from Modules.Console import say, WARNING
+
+#Where the store's data lives unless told otherwise
+STORAGE_DIRECTORY = "Storage"
+
+#Returns the line an item is stored as in the inventory file
+def formatItemLine(item) -> str:
+    seasonalStatus = "SEASONAL" if item.isSeasonal() else "NOTSEASONAL"
+    return f"{item.getItemId()}:{item.getName()}:{item.getPrice():.2f}:{item.getStock()}:{seasonalStatus}\n"
+
+#Returns the line a member is stored as in the members file
+def formatMemberLine(member) -> str:
+    return f"{member.getId()}:{member.getName()}:{member.getEmail()}:{member.getPoints()}:{member.getRole()}\n"
+
+#Returns the items of a purchase the way the history stores them: (itemID,quantity) pairs joined by colons
+def formatPurchaseItems(items: dict) -> str:
+    return ":".join([f'({itemID},{quantity})' for itemID, quantity in items.items()])
+
+#Parses (itemID,quantity) pairs into a dictionary of item ID and quantity
+def parsePurchaseItems(items: list) -> dict:
+    history = {}
+    for item in items:
+        item = item.strip("()")
+        itemID, amount = item.split(",")
+        history[itemID.strip()] = int(amount.strip())
+    return history
+
+#Parses a line of the history file into (memberID, date, {itemID: quantity})
+def parseHistoryLine(line: str) -> tuple[str, str, dict]:
+    historyData = line.strip().split(":")
+    return historyData[0], historyData[1], parsePurchaseItems(historyData[2:])
+
+#How much of what comes just before the history read position is kept to check the file hasn't changed underneath it
+TAIL_BYTES = 4096
+
+#Purchases are rolled up this many at a time, so a compaction never holds the whole old history in memory
+COMPACTION_CHUNK = 100000
+
+#Returns the line a member's aggregate is stored as: memberID:first date:last date:purchases:points:(itemID,quantity)...
+def formatAggregateLine(memberID: str, aggregate: dict) -> str:
+    return (f"{memberID}:{aggregate['first']}:{aggregate['last']}:{aggregate['purchases']}:{aggregate['points']}:"
+            f"{formatPurchaseItems(aggregate['items'])}\n")
+
+#Parses a line of the aggregate file into (memberID, {"first", "last", "purchases", "points", "items"})
+def parseAggregateLine(line: str) -> tuple[str, dict]:
+    memberID, first, last, purchases, points, *items = line.strip().split(":")
+    return memberID, {"first": first, "last": last, "purchases": int(purchases), "points": int(points),
+                      "items": parsePurchaseItems([item for item in items if item])}
+
+#Adds purchases to per-member aggregates of item totals, first and last dates, purchase count and points.
+#getPoints, if given, returns the points a list of purchases earned as {memberID: points}
+def addToAggregates(aggregates: dict, purchases: list, getPoints=None) -> None:
+    for memberID, date, items in purchases:
+        aggregate = aggregates.get(memberID)
+        if aggregate is None:
+            aggregate = aggregates[memberID] = {"first": date, "last": date, "purchases": 0, "points": 0, "items": {}}
+        aggregate["first"] = min(aggregate["first"], date)
+        aggregate["last"] = max(aggregate["last"], date)
+        aggregate["purchases"] += 1
+        totals = aggregate["items"]
+        for itemID, quantity in items.items():
+            totals[itemID] = totals.get(itemID, 0) + quantity
+    if getPoints and purchases:
+        for memberID, points in getPoints(purchases).items():
+            aggregates[memberID]["points"] += points
+
+#Appends lines to a file, making sure the first one doesn't run on from an unterminated last line
+def appendLines(filename: str, lines: list) -> None:
+    with open(filename, "a+b") as file:
+        file.seek(0, os.SEEK_END)
+        if file.tell():
+            file.seek(file.tell() - 1)
+            if file.read(1) != b"\n":
+                file.write(b"\n")
+        file.write("".join(lines).encode())
+
+#The interface Inventory and MemberDatabase store their data through.
+#Items and members are handed over as Item and Member objects and come back as plain tuples:
+#items as (itemID, name, price, stock, seasonal) and members as (memberID, name, email, points, role).
+#Purchases are (memberID, date, {itemID: quantity})
+class StorageBackend:
+    #Returns something that changes whenever the stored items change (None if nothing is stored)
+    def getItemsSignature(self):
+        raise NotImplementedError
+
+    #Returns every stored item
+    def readItems(self) -> list:
+        raise NotImplementedError
+
+    #Stores the items in a dictionary of item ID and Item. changedIDs, if given, are the only ones that changed
+    #(IDs no longer in the dictionary were removed), so a backend that can update single rows only writes those
+    def writeItems(self, items: dict, changedIDs: set = None) -> None:
+        raise NotImplementedError
+
+    #Adds new items
+    def addItems(self, items: list) -> None:
+        raise NotImplementedError
+
+    #Stores new stock levels for some items
+    def writeStock(self, stock: dict) -> None:
+        raise NotImplementedError
+
+    #Checks if the backend adds stock and point changes to what is stored (adjustStock, and the pointChanges of writeMembers)
+    #rather than storing the levels and totals held in memory, so tills in other processes can't overwrite each other's updates
+    def appliesChanges(self) -> bool:
+        return False
+
+    #Adds stock changes ({itemID: change}) to the stored levels in one step, all or none: nothing changes if any item would go
+    #below zero or is no longer stored. Returns whether they were applied and the stored levels of the items afterwards
+    def adjustStock(self, changes: dict) -> tuple[bool, dict]:
+        raise NotImplementedError
+
+    #Checks if stock changes have piled up and should be folded in with a full writeItems
+    def needsCompaction(self) -> bool:
+        return False
+
+    #Checks if there are stock changes not yet folded into the items
+    def hasPendingStock(self) -> bool:
+        return False
+
+    #Returns where a snapshot of parsed data ('items', 'members' or 'history') can be kept, or None if the backend doesn't need one
+    def getSnapshotFile(self, kind: str) -> str | None:
+        return None
+
+    #Returns something that changes whenever the stored members change (None if nothing is stored)
+    def getMembersSignature(self):
+        raise NotImplementedError
+
+    #Returns every stored member
+    def readMembers(self) -> list:
+        raise NotImplementedError
+
+    #Stores the members in a dictionary of member ID and Member, like writeItems. pointChanges are the points each changed member
+    #gained (or lost) since they were last stored: a backend that applies changes adds them to the stored points of members
+    #already stored, and returns the stored points of the changed members ({memberID: points}), otherwise None is returned
+    def writeMembers(self, members: dict, changedIDs: set = None, pointChanges: dict = None) -> dict | None:
+        raise NotImplementedError
+
+    #Adds new members
+    def addMembers(self, members: list) -> None:
+        raise NotImplementedError
+
+    #Returns the highest member ID number ever handed out per initials, as stored by writeIDCounters
+    def readIDCounters(self) -> dict:
+        raise NotImplementedError
+
+    #Raises the stored highest ID numbers per initials to at least the given ones (they never go down)
+    def writeIDCounters(self, counters: dict) -> None:
+        raise NotImplementedError
+
+    #Returns the purchases added since the last call, and whether the history was replaced (everything read before is void)
+    def readPurchases(self) -> tuple[bool, list]:
+        raise NotImplementedError
+
+    #Gets the per-member lookup of the history ready, returning any purchases it found that readPurchases hasn't given yet
+    def loadHistoryIndex(self) -> list:
+        return self.indexPurchases()
+
+    #Returns (memberID, items) for purchases other writers added since the last call
+    def indexPurchases(self) -> list:
+        raise NotImplementedError
+
+    #Returns one member's purchases as a dictionary of date and items
+    def readMemberPurchases(self, memberID: str) -> dict:
+        return dict(self.readMemberPurchaseList(memberID))
+
+    #Returns every one of a member's purchases as (date, items), in the order they were added
+    def readMemberPurchaseList(self, memberID: str) -> list:
+        raise NotImplementedError
+
+    #Adds purchases, returning (memberID, items) for purchases other writers added before them. Purchases the caller keeps in
+    #memory are counted as read; with read False the read position is left before them, so readPurchases returns them later
+    def appendPurchases(self, purchases: list, read: bool = True) -> list:
+        raise NotImplementedError
+
+    #Yields every purchase in the order they were added
+    def readAllPurchases(self):
+        raise NotImplementedError
+
+    #Returns the per-member aggregates of compacted purchases as {memberID: {"first", "last", "purchases", "points", "items"}}
+    def readAggregates(self) -> dict:
+        return {}
+
+    #Rolls every purchase dated before cutoff (YYYY-MM-DD) into the per-member aggregates and removes it from the history,
+    #returning how many purchases and members were rolled up. getPoints works out the points they earned, as for addToAggregates
+    def compactHistory(self, cutoff: str, getPoints=None) -> dict:
+        raise NotImplementedError
+
+    #Returns the history's read position and index, with a signature to check them against later (None if nothing was read)
+    def getHistoryState(self) -> tuple:
+        return None, None
+
+    #Checks a signature from getHistoryState against what is stored now
+    def isHistoryStateValid(self, signature) -> bool:
+        return False
+
+    #Picks up from a state returned by getHistoryState
+    def setHistoryState(self, state) -> None:
+        pass
+
+    #Returns the path of the purchase history file, for tools that read it directly (None if there isn't one)
+    def getHistoryFile(self) -> str | None:
+        return None
+
+#The original colon-separated text files: INVENTORY.txt (with a stock journal), MEMBERS.txt and PURCHASE_HISTORY.txt (with a byte offset
+#index and, once compacted, the per-member aggregates of older purchases)
+class TextStorage(StorageBackend):
+    def __init__(self, inventoryFile: str = None, membersFile: str = None, historyFile: str = None, journalFile: str = None,
+                 journalLimit: int = 65536, historyIndexFile: str = None, inventorySnapshotFile: str = None, aggregateFile: str = None,
+                 membersSnapshotFile: str = None, historySnapshotFile: str = None):
+        self.__inventoryFile = inventoryFile if inventoryFile else os.path.join(STORAGE_DIRECTORY, "INVENTORY.txt")
+        self.__membersFile = membersFile if membersFile else os.path.join(STORAGE_DIRECTORY, "MEMBERS.txt")
+        #Highest member ID number handed out per initials, so IDs of deleted members are never reused
+        self.__idCountersFile = os.path.splitext(self.__membersFile)[0] + "_IDS.txt"
+        self.__historyFile = historyFile if historyFile else os.path.join(STORAGE_DIRECTORY, "PURCHASE_HISTORY.txt")
+        #Stock changes are appended here and folded back into the inventory file once it grows past journalLimit bytes
+        self.__journalFile = journalFile if journalFile else os.path.splitext(self.__inventoryFile)[0] + "_JOURNAL.txt"
+        self.__journalLimit = journalLimit
+        #Parsed data is saved next to each file so the next start can skip parsing
+        self.__snapshotFiles = {
+            "items": inventorySnapshotFile if inventorySnapshotFile else os.path.splitext(self.__inventoryFile)[0] + "_SNAPSHOT.bin",
+            "members": membersSnapshotFile if membersSnapshotFile else os.path.splitext(self.__membersFile)[0] + "_SNAPSHOT.bin",
+            "history": historySnapshotFile if historySnapshotFile else os.path.splitext(self.__historyFile)[0] + "_SNAPSHOT.bin",
+        }
+        #Sidecar index of the byte offsets of every member's lines in the history file
+        self.__historyIndexFile = historyIndexFile if historyIndexFile else os.path.splitext(self.__historyFile)[0] + "_INDEX.txt"
+        self.__historyIndex = {}
+        self.__indexedBytes = 0
+        #Signature of the index file when the index was restored from a snapshot (None if it was read from the file)
+        self.__indexSignature = None
+        #How far into the history file has been read, and the last line read there
+        self.__historyOffset = 0
+        self.__historyTail = b""
+        #Purchases older than the compaction horizon, rolled up per member. The first line is a header recording the last compaction
+        self.__aggregateFile = aggregateFile if aggregateFile else os.path.splitext(self.__historyFile)[0] + "_AGGREGATE.txt"
+        #Set when this process replaced the history file, so the next read starts over
+        self.__historyReplaced = False
+        self.__lock = threading.RLock()
+
+    #Returns the signatures of the inventory file and its stock journal
+    def getItemsSignature(self) -> tuple:
+        return (getFileSignature(self.__inventoryFile), getFileSignature(self.__journalFile))
+
+    #Parses the inventory file and applies the stock changes recorded in the journal on top
+    def readItems(self) -> list:
+        items = {}
+        try:
+            with open(self.__inventoryFile, 'r') as file:
+                for line in file:
+                    line = line.strip()
+                    if line:
+                        itemID, name, price, quantity, seasonal = line.split(':')
+                        items[itemID] = [itemID, name, float(price), int(quantity), seasonal == "SEASONAL"]
+        except FileNotFoundError:
+            say(f"File '{self.__inventoryFile}' not found. Starting with an empty inventory.", WARNING)
+
+        try:
+            with open(self.__journalFile, 'r') as file:
+                for line in file:
+                    line = line.strip()
+                    if line:
+                        itemID, stock = line.split(':')
+                        if itemID in items and int(stock) >= 0:
+                            items[itemID][3] = int(stock)
+        except FileNotFoundError:
+            pass
+        return [tuple(item) for item in items.values()]
+
+    #Rewrites the whole inventory file, which then holds every journalled change
+    def writeItems(self, items: dict, changedIDs: set = None) -> None:
+        atomicWrite(self.__inventoryFile, [formatItemLine(item) for item in items.values()])
+        if os.path.exists(self.__journalFile):
+            os.remove(self.__journalFile)
+
+    #Appends new items to the inventory file
+    def addItems(self, items: list) -> None:
+        appendLines(self.__inventoryFile, [formatItemLine(item) for item in items])
+
+    #Appends the new stock levels to the stock journal
+    def writeStock(self, stock: dict) -> None:
+        with open(self.__journalFile, 'a') as file:
+            file.write("".join(f"{itemID}:{level}\n" for itemID, level in stock.items()))
+
+    #Checks if the stock journal has grown past its limit
+    def needsCompaction(self) -> bool:
+        signature = getFileSignature(self.__journalFile)
+        return signature is not None and signature[1] > self.__journalLimit
+
+    #Checks if there is a stock journal to fold into the inventory file
+    def hasPendingStock(self) -> bool:
+        return os.path.exists(self.__journalFile)
+
+    def getSnapshotFile(self, kind: str) -> str | None:
+        return self.__snapshotFiles[kind]
+
+    def getMembersSignature(self) -> tuple | None:
+        return getFileSignature(self.__membersFile)
+
+    #Parses the members file
+    def readMembers(self) -> list:
+        members = []
+        try:
+            with open(self.__membersFile, "r") as file:
+                for line in file:
+                    memberData = line.strip().split(":")
+                    members.append((memberData[0], memberData[1], memberData[2], int(memberData[3]), memberData[4]))
+        except FileNotFoundError:
+            say(f"File '{self.__membersFile}' not found. Starting with an empty member list.", WARNING)
+        return members
+
+    #Rewrites the whole members file
+    def writeMembers(self, members: dict, changedIDs: set = None, pointChanges: dict = None) -> None:
+        atomicWrite(self.__membersFile, [formatMemberLine(member) for _, member in sorted(members.items())])
+
+    #Appends new members to the members file
+    def addMembers(self, members: list) -> None:
+        appendLines(self.__membersFile, [formatMemberLine(member) for member in members])
+
+    #Parses the ID counters file (initials:number lines)
+    def readIDCounters(self) -> dict:
+        counters = {}
+        try:
+            with open(self.__idCountersFile, "r") as file:
+                for line in file:
+                    if line.strip():
+                        initials, number = line.strip().split(":")
+                        counters[initials] = max(counters.get(initials, 0), int(number))
+        except FileNotFoundError:
+            pass
+        return counters
+
+    #Rewrites the ID counters file with the higher of the stored and given numbers
+    def writeIDCounters(self, counters: dict) -> None:
+        with self.__lock:
+            stored = self.readIDCounters()
+            for initials, number in counters.items():
+                stored[initials] = max(stored.get(initials, 0), number)
+            atomicWrite(self.__idCountersFile, [f"{initials}:{number}\n" for initials, number in sorted(stored.items())])
+
+    #Reads the history lines appended since the last call, unless the file shrank or was replaced
+    def readPurchases(self) -> tuple[bool, list]:
+        with self.__lock:
+            purchases = []
+            #Reading from the start is when a compaction another process didn't finish gets finished
+            if not self.__historyOffset:
+                self.finishCompaction()
+            reset = self.__historyReplaced
+            self.__historyReplaced = False
+            try:
+                with open(self.__historyFile, "rb") as file:
+                    if not self.isHistoryTailValid(file, self.__historyOffset, self.__historyTail):
+                        reset = True
+                        self.__historyOffset = 0
+                        self.__historyTail = b""
+
+                    initial = not self.__historyOffset
+                    file.seek(self.__historyOffset)
+                    for line in file:
+                        #A line without its newline may still be being written, so the read position stays before it.
+                        #A first load still takes it (a hand-edited file often ends that way) and reads it again once it is ended
+                        if not line.endswith(b"\n"):
+                            if initial and line.strip():
+                                try:
+                                    purchases.append(parseHistoryLine(line.decode()))
+                                except (ValueError, IndexError):
+                                    pass
+                            break
+                        self.__historyOffset += len(line)
+                        #The tail is exactly the bytes before the read position, blank lines included
+                        self.__historyTail = (self.__historyTail + line)[-TAIL_BYTES:] if not line.strip() else line
+                        if line.strip():
+                            purchases.append(parseHistoryLine(line.decode()))
+            except FileNotFoundError:
+                self.__historyOffset = 0
+                self.__historyTail = b""
+                say(f"File '{self.__historyFile}' not found. Starting with an empty purchase history.", WARNING)
+                return True, []
+            return reset, purchases
+
+    #Checks that the history file still starts with what was already read (it hasn't shrunk or been replaced)
+    def isHistoryTailValid(self, file, offset: int, tail: bytes) -> bool:
+        file.seek(0, os.SEEK_END)
+        if file.tell() < offset:
+            return False
+        file.seek(offset - len(tail))
+        return file.read(len(tail)) == tail
+
+    #The read position, the last line read and the index, signed with the index file they match.
+    #Everything is indexed first so the index file doesn't change after its signature is taken
+    def getHistoryState(self) -> tuple:
+        with self.__lock:
+            self.indexPurchases()
+            if not self.__historyOffset:
+                return None, None
+            signature = (self.__historyOffset, self.__historyTail, getFileSignature(self.__historyFile),
+                         getFileSignature(self.__historyIndexFile), getFileSignature(self.__aggregateFile))
+            return signature, (self.__historyOffset, self.__historyTail, self.__historyIndex, self.__indexedBytes)
+
+    #Checks a history state's signature (offset, last line, history, index and aggregate file signatures) against the files on disk.
+    #The history file's own signature catches edits to earlier lines that leave the size and the last line as they were
+    def isHistoryStateValid(self, signature: tuple) -> bool:
+        offset, tail, historySignature, indexSignature, aggregateSignature = signature
+        if (historySignature != getFileSignature(self.__historyFile) or indexSignature != getFileSignature(self.__historyIndexFile)
+                or aggregateSignature != getFileSignature(self.__aggregateFile)):
+            return False
+        try:
+            with open(self.__historyFile, "rb") as file:
+                return self.isHistoryTailValid(file, offset, tail)
+        except FileNotFoundError:
+            return False
+
+    def setHistoryState(self, state: tuple) -> None:
+        with self.__lock:
+            self.__historyOffset, self.__historyTail, self.__historyIndex, self.__indexedBytes = state
+            self.__indexSignature = getFileSignature(self.__historyIndexFile)
+
+    #Load the history index, indexing any lines appended since it was written (or rebuilding it if the history file was replaced)
+    def loadHistoryIndex(self) -> list:
+        with self.__lock:
+            #An index restored from a snapshot of this exact index file only needs the newer lines added
+            if self.__indexSignature is not None and self.__indexSignature == getFileSignature(self.__historyIndexFile):
+                return self.indexPurchases()
+
+            self.__indexSignature = None
+            self.__historyIndex = {}
+            self.__indexedBytes = 0
+            lastMember = None
+            try:
+                with open(self.__historyIndexFile, "r") as file:
+                    for line in file:
+                        line = line.strip()
+                        if line:
+                            memberID, offset = line.split(":")
+                            self.__historyIndex.setdefault(memberID, []).append(int(offset))
+                            if int(offset) >= self.__indexedBytes:
+                                self.__indexedBytes = int(offset)
+                                lastMember = memberID
+            except FileNotFoundError:
+                pass
+
+            try:
+                historySize = os.path.getsize(self.__historyFile)
+                #The index covers everything up to the end of the last line it points at
+                if self.__historyIndex:
+                    with open(self.__historyFile, "rb") as file:
+                        file.seek(self.__indexedBytes)
+                        line = file.readline()
+                        #If the last indexed line isn't where the index says, the file was replaced
+                        if line.endswith(b"\n") and line.startswith(f"{lastMember}:".encode()):
+                            self.__indexedBytes = file.tell()
+                        else:
+                            self.__indexedBytes = historySize + 1
+            except FileNotFoundError:
+                historySize = 0
+
+            if self.__indexedBytes > historySize:
+                say("History index is out of date. Rebuilding it.")
+                self.__historyIndex = {}
+                self.__indexedBytes = 0
+                atomicWrite(self.__historyIndexFile, [])
+            return self.indexPurchases()
+
+    #Adds index entries for history lines written after the indexed part of the file
+    def indexPurchases(self) -> list:
+        with self.__lock:
+            entries = []
+            purchases = []
+            try:
+                with open(self.__historyFile, "rb") as file:
+                    file.seek(self.__indexedBytes)
+                    offset = self.__indexedBytes
+                    for line in file:
+                        #A line without its newline is still being written
+                        if not line.endswith(b"\n"):
+                            break
+                        if line.strip():
+                            memberID, _, items = parseHistoryLine(line.decode())
+                            self.__historyIndex.setdefault(memberID, []).append(offset)
+                            purchases.append((memberID, items))
+                            entries.append(f"{memberID}:{offset}\n")
+                        offset += len(line)
+                    self.__indexedBytes = offset
+            except FileNotFoundError:
+                return []
+
+            if entries:
+                with open(self.__historyIndexFile, "a") as file:
+                    file.write("".join(entries))
+            return purchases
+
+    #Reads only the member's lines of the history file, found through the index
+    def readMemberPurchaseList(self, memberID: str) -> list:
+        with self.__lock:
+            self.indexPurchases()
+            purchases = []
+            offsets = self.__historyIndex.get(memberID, [])
+            if offsets:
+                with open(self.__historyFile, "rb") as file:
+                    for offset in offsets:
+                        file.seek(offset)
+                        _, date, items = parseHistoryLine(file.readline().decode())
+                        purchases.append((date, items))
+            return purchases
+
+    #Appends purchases to the history file and its index in one go
+    def appendPurchases(self, purchases: list, read: bool = True) -> list:
+        with self.__lock:
+            entries = []
+            with open(self.__historyFile, "a+b") as file:
+                #A last line left without its newline (e.g. by a hand edit) is ended first, or ours would run on from it
+                if file.seek(0, os.SEEK_END):
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b"\n":
+                        file.write(b"\n")
+                        file.flush()
+                #Index anything other writers appended first so our offsets line up
+                others = self.indexPurchases()
+                offset = file.seek(0, os.SEEK_END)
+                #The lines go out in one write, so their offsets are counted rather than asked of the file
+                lines = []
+                for memberID, date, items in purchases:
+                    line = f"{memberID}:{date}:{formatPurchaseItems(items)}\n".encode()
+                    lines.append(line)
+                    self.__historyIndex.setdefault(memberID, []).append(offset)
+                    entries.append(f"{memberID}:{offset}\n")
+                    #If everything before was read it still is, so the next read can skip this line
+                    if read and self.__historyOffset == offset:
+                        self.__historyOffset += len(line)
+                        self.__historyTail = line
+                    offset += len(line)
+                file.write(b"".join(lines))
+                self.__indexedBytes = offset
+            with open(self.__historyIndexFile, "a") as file:
+                file.write("".join(entries))
+            return others
+
+    #Reads the history file a line at a time
+    def readAllPurchases(self):
+        with open(self.__historyFile, "r") as file:
+            for line in file:
+                if line.strip():
+                    yield parseHistoryLine(line)
+
+    def getHistoryFile(self) -> str:
+        return self.__historyFile
+
+    #Reads the aggregate file into its header (state, cutoff, bytes of history read, digest of them) and {memberID: aggregate}
+    def readAggregateFile(self) -> tuple[tuple | None, dict]:
+        header = None
+        aggregates = {}
+        try:
+            with open(self.__aggregateFile, "r") as file:
+                for line in file:
+                    if line.startswith("#"):
+                        _, state, cutoff, size, digest = line.strip().split(":")
+                        header = (state, cutoff, int(size), digest)
+                    elif line.strip():
+                        memberID, aggregate = parseAggregateLine(line)
+                        aggregates[memberID] = aggregate
+        except FileNotFoundError:
+            pass
+        return header, aggregates
+
+    #Rewrites the aggregate file with a header recording the compaction it came from
+    def writeAggregateFile(self, state: str, cutoff: str, size: int, digest: str, aggregates: dict) -> None:
+        header = f"#COMPACTION:{state}:{cutoff}:{size}:{digest}\n"
+        atomicWrite(self.__aggregateFile, itertools.chain([header], (formatAggregateLine(memberID, aggregate)
+                                                                     for memberID, aggregate in sorted(aggregates.items()))))
+
+    def readAggregates(self) -> dict:
+        with self.__lock:
+            self.finishCompaction()
+            return self.readAggregateFile()[1]
+
+    #Returns the SHA-256 digest of the first size bytes of the history file (None if it is shorter or missing)
+    def getHistoryDigest(self, size: int) -> str | None:
+        digest = hashlib.sha256()
+        try:
+            with open(self.__historyFile, "rb") as file:
+                while size > 0:
+                    data = file.read(min(size, 1024 * 1024))
+                    if not data:
+                        return None
+                    digest.update(data)
+                    size -= len(data)
+        except FileNotFoundError:
+            return None
+        return digest.hexdigest()
+
+    #Copies the history file to a temporary file without the lines dated before cutoff, handing each of those to rolled.
+    #Only the first size bytes are filtered (every complete line if size is None) and anything after is copied as it is.
+    #Returns the temporary file, how many bytes were filtered and their SHA-256 digest
+    def filterHistory(self, cutoff: str, rolled=None, size: int = None) -> tuple[str, int, str]:
+        tempFile = self.__historyFile + ".tmp"
+        digest = hashlib.sha256()
+        filtered = 0
+        cutoffBytes = cutoff.encode()
+        with open(self.__historyFile, "rb") as source, open(tempFile, "wb") as target:
+            for line in source:
+                #A line without its newline is still being written, so it and whatever follows are kept
+                if (size is not None and filtered >= size) or not line.endswith(b"\n"):
+                    target.write(line)
+                    target.write(source.read())
+                    break
+                filtered += len(line)
+                digest.update(line)
+                if not line.strip():
+                    continue
+                #Only the date is needed to decide, so only the lines rolled up are parsed in full
+                if line.split(b":", 2)[1] < cutoffBytes:
+                    if rolled:
+                        rolled(parseHistoryLine(line.decode()))
+                    continue
+                target.write(line)
+            target.flush()
+            os.fsync(target.fileno())
+        return tempFile, filtered, digest.hexdigest()
+
+    #Forgets the history index and read position after the history file was replaced, so both start over
+    def resetHistoryIndex(self) -> None:
+        self.__historyIndex = {}
+        self.__indexedBytes = 0
+        self.__indexSignature = None
+        atomicWrite(self.__historyIndexFile, [])
+        self.__historyOffset = 0
+        self.__historyTail = b""
+        self.__historyReplaced = True
+
+    #Finishes a compaction that stopped after writing the aggregates: if the history file still starts with the lines that were
+    #read (same digest), they are filtered out again, then the aggregates are marked done. Only the header is read otherwise
+    def finishCompaction(self) -> None:
+        with self.__lock:
+            try:
+                with open(self.__aggregateFile, "r") as file:
+                    header = file.readline()
+            except FileNotFoundError:
+                return
+            if not header.startswith("#COMPACTION:PENDING:"):
+                return
+            header, aggregates = self.readAggregateFile()
+            _, cutoff, size, digest = header
+            if self.getHistoryDigest(size) == digest:
+                say("Finishing an interrupted history compaction.", WARNING)
+                tempFile, _, _ = self.filterHistory(cutoff, size=size)
+                os.replace(tempFile, self.__historyFile)
+            self.writeAggregateFile("DONE", cutoff, size, digest, aggregates)
+            self.resetHistoryIndex()
+
+    #Streams the history file once, rolling old lines into the aggregates and copying recent ones to a new history file.
+    #The aggregates are written first, marked pending with a digest of the history they were taken from, then the new history
+    #replaces the old and the aggregates are marked done, so a crash at any point is finished by finishCompaction without
+    #counting a purchase twice. Other tills must not append meanwhile (run it while the store is closed, like Store.close)
+    def compactHistory(self, cutoff: str, getPoints=None) -> dict:
+        with self.__lock:
+            self.finishCompaction()
+            _, aggregates = self.readAggregateFile()
+            before = sum(aggregate["purchases"] for aggregate in aggregates.values())
+            chunk = []
+
+            def roll(purchase: tuple) -> None:
+                chunk.append(purchase)
+                if len(chunk) >= COMPACTION_CHUNK:
+                    addToAggregates(aggregates, chunk, getPoints)
+                    chunk.clear()
+
+            try:
+                tempFile, size, digest = self.filterHistory(cutoff, roll)
+            except FileNotFoundError:
+                return {"purchases": 0, "members": len(aggregates), "cutoff": cutoff}
+            addToAggregates(aggregates, chunk, getPoints)
+            purchases = sum(aggregate["purchases"] for aggregate in aggregates.values()) - before
+            if not purchases:
+                os.remove(tempFile)
+                return {"purchases": 0, "members": len(aggregates), "cutoff": cutoff}
+
+            self.writeAggregateFile("PENDING", cutoff, size, digest, aggregates)
+            os.replace(tempFile, self.__historyFile)
+            self.writeAggregateFile("DONE", cutoff, size, digest, aggregates)
+            self.resetHistoryIndex()
+            return {"purchases": purchases, "members": len(aggregates), "cutoff": cutoff}
+
+#Tables and indexes of the SQLite backend. Purchases keep their items in the history file's (itemID,quantity) form
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (itemID TEXT PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL,
+                                  stock INTEGER NOT NULL, seasonal INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS members (memberID TEXT PRIMARY KEY, name TEXT NOT NULL, email TEXT NOT NULL,
+                                    points INTEGER NOT NULL, role TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS membersByEmail ON members (email);
+CREATE TABLE IF NOT EXISTS purchases (purchaseID INTEGER PRIMARY KEY, memberID TEXT NOT NULL, date TEXT NOT NULL, items TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS purchasesByMemberDate ON purchases (memberID, date);
+CREATE TABLE IF NOT EXISTS idCounters (initials TEXT PRIMARY KEY, number INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS aggregates (memberID TEXT PRIMARY KEY, first TEXT NOT NULL, last TEXT NOT NULL,
+                                       purchases INTEGER NOT NULL, points INTEGER NOT NULL, items TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL);
+INSERT OR IGNORE INTO versions VALUES ('items', 0), ('members', 0), ('history', 0), ('compactions', 0);
+"""
+#Statements are kept as constants so the connection's statement cache prepares each one only once
+SELECT_VERSION = "SELECT version FROM versions WHERE name = ?"
+BUMP_VERSION = "UPDATE versions SET version = version + 1 WHERE name = ?"
+SELECT_ITEMS = "SELECT itemID, name, price, stock, seasonal FROM items"
+UPSERT_ITEM = "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?)"
+INSERT_ITEM = "INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, ?)"
+DELETE_ITEM = "DELETE FROM items WHERE itemID = ?"
+UPDATE_STOCK = "UPDATE items SET stock = ? WHERE itemID = ?"
+#Rows written for edits leave the stock of items already stored alone; stock only changes through ADJUST_STOCK
+UPSERT_ITEM_DETAILS = ("INSERT INTO items VALUES (?, ?, ?, ?, ?) ON CONFLICT (itemID) DO UPDATE SET "
+                       "name = excluded.name, price = excluded.price, seasonal = excluded.seasonal")
+ADJUST_STOCK = "UPDATE items SET stock = stock + ? WHERE itemID = ? AND stock + ? >= 0"
+SELECT_STOCK = "SELECT stock FROM items WHERE itemID = ?"
+SELECT_MEMBERS = "SELECT memberID, name, email, points, role FROM members"
+UPSERT_MEMBER = "INSERT OR REPLACE INTO members VALUES (?, ?, ?, ?, ?)"
+#Members already stored get the points they gained added (the last parameter) rather than the total held in memory
+UPSERT_MEMBER_CHANGES = ("INSERT INTO members VALUES (?, ?, ?, ?, ?) ON CONFLICT (memberID) DO UPDATE SET "
+                         "name = excluded.name, email = excluded.email, points = points + ?, role = excluded.role")
+SELECT_MEMBER_POINTS = "SELECT points FROM members WHERE memberID = ?"
+INSERT_MEMBER = "INSERT OR IGNORE INTO members VALUES (?, ?, ?, ?, ?)"
+DELETE_MEMBER = "DELETE FROM members WHERE memberID = ?"
+SELECT_PURCHASES_AFTER = "SELECT purchaseID, memberID, date, items FROM purchases WHERE purchaseID > ? ORDER BY purchaseID"
+SELECT_LAST_PURCHASE = "SELECT COALESCE(MAX(purchaseID), 0) FROM purchases"
+SELECT_MEMBER_PURCHASES = "SELECT date, items FROM purchases WHERE memberID = ? ORDER BY purchaseID"
+INSERT_PURCHASE = "INSERT INTO purchases (memberID, date, items) VALUES (?, ?, ?)"
+SELECT_OLD_PURCHASES = "SELECT memberID, date, items FROM purchases WHERE date < ? ORDER BY purchaseID"
+DELETE_OLD_PURCHASES = "DELETE FROM purchases WHERE date < ?"
+SELECT_ID_COUNTERS = "SELECT initials, number FROM idCounters"
+RAISE_ID_COUNTER = "INSERT INTO idCounters VALUES (?, ?) ON CONFLICT (initials) DO UPDATE SET number = MAX(number, excluded.number)"
+SELECT_AGGREGATES = "SELECT memberID, first, last, purchases, points, items FROM aggregates"
+UPSERT_AGGREGATE = "INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?, ?)"
+
+#Everything in one SQLite database in WAL mode, so several till processes can share it: readers never wait on the writer,
+#and single-row reads and updates go through the indexes instead of whole files
+class SQLiteStorage(StorageBackend):
+    def __init__(self, databaseFile: str = None, timeout: float = 30):
+        self.__databaseFile = databaseFile if databaseFile else os.path.join(STORAGE_DIRECTORY, "YOUWEE.db")
+        #Transactions are managed here (isolation_level None), and the lock lets checkout lanes share the connection
+        self.__connection = sqlite3.connect(self.__databaseFile, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.__lock = threading.RLock()
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        #In WAL mode a commit is safe from corruption without waiting on every fsync
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.executescript(SQLITE_SCHEMA)
+        #The last purchase read by readPurchases and by indexPurchases
+        self.__readPurchase = 0
+        self.__indexedPurchase = 0
+        #Compactions seen by readPurchases, since one removes purchases that were already read
+        self.__compactions = None
+
+    #Runs a write transaction, taking the write lock up front so two processes can't both read then write
+    @contextlib.contextmanager
+    def transaction(self, *changed: str):
+        with self.__lock:
+            self.__connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.__connection
+                for name in changed:
+                    self.__connection.execute(BUMP_VERSION, (name,))
+                self.__connection.execute("COMMIT")
+            except BaseException:
+                self.__connection.execute("ROLLBACK")
+                raise
+
+    #Returns the version of a table, which every committed change to it bumps
+    def getVersion(self, name: str) -> int:
+        with self.__lock:
+            return self.__connection.execute(SELECT_VERSION, (name,)).fetchone()[0]
+
+    #Closes the connection
+    def close(self) -> None:
+        with self.__lock:
+            self.__connection.close()
+
+    def getItemsSignature(self) -> tuple:
+        return ("items", self.getVersion("items"))
+
+    def readItems(self) -> list:
+        with self.__lock:
+            return [(itemID, name, price, stock, bool(seasonal)) for itemID, name, price, stock, seasonal in
+                    self.__connection.execute(SELECT_ITEMS)]
+
+    #Writes only the changed rows when told which they are, keeping the stored stock of items already stored (other tills
+    #may have sold some since these were loaded). Without changedIDs the items replace everything stored, stock included
+    def writeItems(self, items: dict, changedIDs: set = None) -> None:
+        with self.transaction("items") as connection:
+            if changedIDs is None:
+                connection.execute("DELETE FROM items")
+                connection.executemany(UPSERT_ITEM, [self.getItemRow(item) for item in items.values()])
+                return
+            connection.executemany(UPSERT_ITEM_DETAILS, [self.getItemRow(items[itemID]) for itemID in changedIDs if itemID in items])
+            connection.executemany(DELETE_ITEM, [(itemID,) for itemID in changedIDs if itemID not in items])
+
+    def addItems(self, items: list) -> None:
+        with self.transaction("items") as connection:
+            connection.executemany(INSERT_ITEM, [self.getItemRow(item) for item in items])
+
+    def writeStock(self, stock: dict) -> None:
+        with self.transaction("items") as connection:
+            connection.executemany(UPDATE_STOCK, [(level, itemID) for itemID, level in stock.items()])
+
+    def appliesChanges(self) -> bool:
+        return True
+
+    #Each change is checked against the stored level inside the write transaction, so it holds whatever other tills did
+    def adjustStock(self, changes: dict) -> tuple[bool, dict]:
+        with self.__lock:
+            try:
+                with self.transaction("items") as connection:
+                    for itemID, change in changes.items():
+                        if connection.execute(ADJUST_STOCK, (change, itemID, change)).rowcount != 1:
+                            raise ValueError(itemID)
+            except ValueError:
+                applied = False
+            else:
+                applied = True
+            return applied, self.readStock(changes)
+
+    #Returns the stored stock levels of some items (those no longer stored are left out)
+    def readStock(self, itemIDs) -> dict:
+        with self.__lock:
+            levels = {}
+            for itemID in itemIDs:
+                row = self.__connection.execute(SELECT_STOCK, (itemID,)).fetchone()
+                if row:
+                    levels[itemID] = row[0]
+            return levels
+
+    #Returns the row an item is stored as
+    def getItemRow(self, item) -> tuple:
+        return (item.getItemId(), item.getName(), round(item.getPrice(), 2), item.getStock(), int(item.isSeasonal()))
+
+    def getMembersSignature(self) -> tuple:
+        return ("members", self.getVersion("members"))
+
+    def readMembers(self) -> list:
+        with self.__lock:
+            return self.__connection.execute(SELECT_MEMBERS).fetchall()
+
+    #Like writeItems: without changedIDs the members replace everything stored, points included
+    def writeMembers(self, members: dict, changedIDs: set = None, pointChanges: dict = None) -> dict | None:
+        with self.transaction("members") as connection:
+            if changedIDs is None:
+                connection.execute("DELETE FROM members")
+                connection.executemany(UPSERT_MEMBER, [self.getMemberRow(member) for member in members.values()])
+                return None
+            pointChanges = pointChanges if pointChanges else {}
+            storedIDs = [memberID for memberID in changedIDs if memberID in members]
+            connection.executemany(UPSERT_MEMBER_CHANGES, [self.getMemberRow(members[memberID]) + (pointChanges.get(memberID, 0),)
+                                                           for memberID in storedIDs])
+            connection.executemany(DELETE_MEMBER, [(memberID,) for memberID in changedIDs if memberID not in members])
+            #Read in the same transaction, so these are exactly the points the changes were added to
+            return {memberID: connection.execute(SELECT_MEMBER_POINTS, (memberID,)).fetchone()[0] for memberID in storedIDs}
+
+    def addMembers(self, members: list) -> None:
+        with self.transaction("members") as connection:
+            connection.executemany(INSERT_MEMBER, [self.getMemberRow(member) for member in members])
+
+    def readIDCounters(self) -> dict:
+        with self.__lock:
+            return dict(self.__connection.execute(SELECT_ID_COUNTERS).fetchall())
+
+    def writeIDCounters(self, counters: dict) -> None:
+        with self.transaction() as connection:
+            connection.executemany(RAISE_ID_COUNTER, list(counters.items()))
+
+    #Returns the row a member is stored as
+    def getMemberRow(self, member) -> tuple:
+        return (member.getId(), member.getName(), member.getEmail(), member.getPoints(), member.getRole())
+
+    #Reads the purchases added since the last call; the table only shrinks if the database was replaced or compacted
+    def readPurchases(self) -> tuple[bool, list]:
+        with self.__lock:
+            compactions = self.getVersion("compactions")
+            reset = self.__connection.execute(SELECT_LAST_PURCHASE).fetchone()[0] < self.__readPurchase or compactions != self.__compactions
+            self.__compactions = compactions
+            if reset:
+                self.__readPurchase = 0
+                self.__indexedPurchase = 0
+            purchases = []
+            for purchaseID, memberID, date, items in self.__connection.execute(SELECT_PURCHASES_AFTER, (self.__readPurchase,)):
+                purchases.append((memberID, date, parsePurchaseItems(items.split(":"))))
+                self.__readPurchase = purchaseID
+            return reset, purchases
+
+    #The member and date index lives in the database, so there is nothing to load, only purchases not yet seen
+    def loadHistoryIndex(self) -> list:
+        with self.__lock:
+            self.__indexedPurchase = max(self.__indexedPurchase, self.__readPurchase)
+            return self.indexPurchases()
+
+    def indexPurchases(self) -> list:
+        with self.__lock:
+            purchases = []
+            for purchaseID, memberID, _, items in self.__connection.execute(SELECT_PURCHASES_AFTER, (self.__indexedPurchase,)):
+                purchases.append((memberID, parsePurchaseItems(items.split(":"))))
+                self.__indexedPurchase = purchaseID
+            return purchases
+
+    #Looks the member's purchases up through the (member, date) index
+    def readMemberPurchaseList(self, memberID: str) -> list:
+        with self.__lock:
+            return [(date, parsePurchaseItems(items.split(":"))) for date, items in
+                    self.__connection.execute(SELECT_MEMBER_PURCHASES, (memberID,))]
+
+    def appendPurchases(self, purchases: list, read: bool = True) -> list:
+        with self.transaction("history") as connection:
+            others = self.indexPurchases()
+            lastPurchase = connection.execute(SELECT_LAST_PURCHASE).fetchone()[0]
+            connection.executemany(INSERT_PURCHASE, [(memberID, date, formatPurchaseItems(items)) for memberID, date, items in purchases])
+            newLast = connection.execute(SELECT_LAST_PURCHASE).fetchone()[0]
+            self.__indexedPurchase = newLast
+            #If everything before was read it still is, so the next read can skip these
+            if read and self.__readPurchase == lastPurchase:
+                self.__readPurchase = newLast
+        return others
+
+    def readAggregates(self) -> dict:
+        with self.__lock:
+            return {memberID: {"first": first, "last": last, "purchases": purchases, "points": points,
+                               "items": parsePurchaseItems([item for item in items.split(":") if item])}
+                    for memberID, first, last, purchases, points, items in self.__connection.execute(SELECT_AGGREGATES)}
+
+    #Rolls the old purchases up and deletes them in one transaction, so other tills see either all of it or none
+    def compactHistory(self, cutoff: str, getPoints=None) -> dict:
+        with self.__lock:
+            if not self.__connection.execute("SELECT EXISTS (SELECT 1 FROM purchases WHERE date < ?)", (cutoff,)).fetchone()[0]:
+                return {"purchases": 0, "members": len(self.readAggregates()), "cutoff": cutoff}
+            with self.transaction("history", "compactions") as connection:
+                aggregates = self.readAggregates()
+                changed = set()
+                purchases = 0
+                cursor = connection.execute(SELECT_OLD_PURCHASES, (cutoff,))
+                while True:
+                    rows = cursor.fetchmany(COMPACTION_CHUNK)
+                    if not rows:
+                        break
+                    chunk = [(memberID, date, parsePurchaseItems(items.split(":"))) for memberID, date, items in rows]
+                    addToAggregates(aggregates, chunk, getPoints)
+                    changed.update(memberID for memberID, _, _ in chunk)
+                    purchases += len(chunk)
+                connection.executemany(UPSERT_AGGREGATE, [self.getAggregateRow(memberID, aggregates[memberID]) for memberID in changed])
+                connection.execute(DELETE_OLD_PURCHASES, (cutoff,))
+            return {"purchases": purchases, "members": len(aggregates), "cutoff": cutoff}
+
+    #Replaces the stored aggregates with the given ones (used when copying a compacted history in)
+    def writeAggregates(self, aggregates: dict) -> None:
+        with self.transaction("history", "compactions") as connection:
+            connection.execute("DELETE FROM aggregates")
+            connection.executemany(UPSERT_AGGREGATE, [self.getAggregateRow(memberID, aggregate) for memberID, aggregate in aggregates.items()])
+
+    #Returns the row a member's aggregate is stored as
+    def getAggregateRow(self, memberID: str, aggregate: dict) -> tuple:
+        return (memberID, aggregate["first"], aggregate["last"], aggregate["purchases"], aggregate["points"],
+                formatPurchaseItems(aggregate["items"]))
+
+    #Removes every purchase (used before copying a whole history in)
+    def clearPurchases(self) -> None:
+        with self.transaction("history") as connection:
+            connection.execute("DELETE FROM purchases")
+        self.__readPurchase = 0
+        self.__indexedPurchase = 0
+
+    def readAllPurchases(self):
+        #A separate cursor on a snapshot of the table, so other work on the connection can carry on while it is read
+        connection = sqlite3.connect(self.__databaseFile, timeout=30)
+        try:
+            for memberID, date, items in connection.execute("SELECT memberID, date, items FROM purchases ORDER BY purchaseID"):
+                yield memberID, date, parsePurchaseItems(items.split(":"))
+        finally:
+            connection.close()
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.StorageBackends <database file> [storage directory]
+    #Copies the text files of a storage directory into a SQLite database, replacing what the database held
+    from Modules.InventoryManagement import Item
+    from Modules.MembershipSystem import Member
+    if len(sys.argv) < 2:
+        print("Usage: python -m Modules.StorageBackends <database file> [storage directory]")
+        sys.exit(1)
+    directory = sys.argv[2] if len(sys.argv) > 2 else STORAGE_DIRECTORY
+    source = TextStorage(os.path.join(directory, "INVENTORY.txt"), os.path.join(directory, "MEMBERS.txt"),
+                         os.path.join(directory, "PURCHASE_HISTORY.txt"))
+    target = SQLiteStorage(sys.argv[1])
+    items = {itemID: Item(itemID, name, price, stock, seasonal) for itemID, name, price, stock, seasonal in source.readItems()}
+    target.writeItems(items)
+    members = {memberID: Member(memberID, name, email, role, points) for memberID, name, email, points, role in source.readMembers()}
+    target.writeMembers(members)
+    target.writeIDCounters(source.readIDCounters())
+    target.clearPurchases()
+    purchases = 0
+    chunk = []
+    for purchase in source.readAllPurchases():
+        chunk.append(purchase)
+        if len(chunk) >= 10000:
+            target.appendPurchases(chunk)
+            purchases += len(chunk)
+            chunk = []
+    target.appendPurchases(chunk)
+    purchases += len(chunk)
+    #Purchases rolled up by a compaction are only in the aggregates, so they are copied too and checked against the source
+    aggregates = source.readAggregates()
+    target.writeAggregates(aggregates)
+    copied = target.readAggregates()
+    target.close()
+    if copied != aggregates:
+        print(f"The aggregates copied into '{sys.argv[1]}' don't match those of '{directory}'.")
+        sys.exit(1)
+    rolledUp = sum(aggregate["purchases"] for aggregate in aggregates.values())
+    print(f"Copied {len(items)} items, {len(members)} members, {purchases} purchases and the aggregates of {len(aggregates)} members "
+          f"({rolledUp} purchases rolled up) into '{sys.argv[1]}'.")
@@ -0,0 +1,196 @@
+import os
+import time
+import queue
+import atexit
+import pickle
+import weakref
+import threading
+from Modules.Console import say, ERROR
+
+#Returns a signature (mtime, size, inode) identifying the current version of a file, or None if it doesn't exist
+def getFileSignature(filename: str) -> tuple | None:
+    try:
+        stats = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (stats.st_mtime_ns, stats.st_size, stats.st_ino)
+
+#Writes all lines to a temporary file and renames it over the target so readers never see a half-written file
+def atomicWrite(filename: str, lines) -> None:
+    tempFile = filename + ".tmp"
+    with open(tempFile, "w") as file:
+        file.writelines(lines)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tempFile, filename)
+
+#Write-behind batches still open, flushed once at exit. Held weakly so a discarded owner isn't kept alive
+openWriteBehinds = weakref.WeakSet()
+
+#Flushes every open write-behind batch (registered with atexit once for all of them)
+def flushWriteBehinds() -> None:
+    for writeBehind in list(openWriteBehinds):
+        writeBehind.flush()
+
+atexit.register(flushWriteBehinds)
+
+class WriteBehind:
+    def __init__(self, flushFunction, flushInterval: int = None, flushEvery: int = None, lock: threading.RLock = None):
+        self.__flushFunction = flushFunction
+        #Flush once this many milliseconds have passed since the first pending change, even if nothing else happens meanwhile
+        self.__flushInterval = flushInterval
+        #Flush once this many changes are pending
+        self.__flushEvery = flushEvery
+        self.__dirty = set()
+        self.__operations = 0
+        self.__firstChange = None
+        #The owner's lock, so a flush from the timer thread never runs in the middle of the owner's changes
+        self.__lock = lock if lock else threading.RLock()
+        self.__timer = None
+        openWriteBehinds.add(self)
+
+    #Checks if there are changes that haven't been written yet
+    def isDirty(self) -> bool:
+        return bool(self.__dirty)
+
+    #Returns the IDs of the records changed since the last flush
+    def getDirty(self) -> set:
+        return set(self.__dirty)
+
+    #Records a changed record and flushes if a limit has been reached
+    def markDirty(self, recordID: str) -> None:
+        with self.__lock:
+            if not self.__dirty:
+                self.__firstChange = time.monotonic()
+                self.startTimer()
+            self.__dirty.add(recordID)
+            self.__operations += 1
+
+            if self.__flushEvery and self.__operations >= self.__flushEvery:
+                self.flush()
+            else:
+                self.checkInterval()
+
+    #Starts a timer that flushes the batch once the flush interval is up, so an idle till doesn't sit on changes
+    def startTimer(self) -> None:
+        if self.__flushInterval is not None and self.__timer is None:
+            self.__timer = threading.Timer(self.__flushInterval / 1000, self.flushOnTimer)
+            self.__timer.daemon = True
+            self.__timer.start()
+
+    #Stops the flush timer
+    def stopTimer(self) -> None:
+        if self.__timer is not None:
+            #The timer thread itself may be the one flushing, so it is only cancelled, never joined
+            self.__timer.cancel()
+            self.__timer = None
+
+    #Flushes the batch the timer was started for (runs on the timer thread)
+    def flushOnTimer(self) -> None:
+        with self.__lock:
+            self.__timer = None
+            self.flush()
+
+    #Flushes if the pending changes are older than the flush interval
+    def checkInterval(self) -> None:
+        with self.__lock:
+            if self.__dirty and self.__flushInterval is not None:
+                if (time.monotonic() - self.__firstChange) * 1000 >= self.__flushInterval:
+                    self.flush()
+
+    #Forgets the pending changes once they have been written by a full save
+    def markClean(self) -> None:
+        with self.__lock:
+            self.__dirty = set()
+            self.__operations = 0
+            self.__firstChange = None
+            self.stopTimer()
+
+    #Writes all pending changes in one go
+    def flush(self) -> None:
+        with self.__lock:
+            if self.__dirty:
+                self.__flushFunction()
+                self.markClean()
+
+    #Writes what is pending and stops flushing at exit
+    def close(self) -> None:
+        with self.__lock:
+            self.flush()
+            self.stopTimer()
+        openWriteBehinds.discard(self)
+
+class BackgroundWriter:
+    def __init__(self, writeFunction, maxQueue: int = 10000, groupSize: int = 512):
+        #writeFunction is called on the writer thread with a list of queued records
+        self.__writeFunction = writeFunction
+        #Records are written in groups of up to this many, so one write and flush covers everything queued meanwhile
+        self.__groupSize = groupSize
+        #Once this many records are waiting, put() blocks until the writer catches up
+        self.__queue = queue.Queue(maxQueue)
+        #Records a write failed on, written ahead of the next group so nothing is lost or reordered
+        self.__failed = []
+        self.__writeLock = threading.Lock()
+        threading.Thread(target=self.run, daemon=True).start()
+        atexit.register(self.flush)
+
+    #Queues a record to be written
+    def put(self, record) -> None:
+        self.__queue.put(record)
+
+    #Writes queued records in groups for as long as the program runs
+    def run(self) -> None:
+        while True:
+            group = [self.__queue.get()]
+            while len(group) < self.__groupSize:
+                try:
+                    group.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write(group)
+            except Exception as error:
+                say(f"Error writing {len(group)} queued records, keeping them to try again: {error}", ERROR)
+            finally:
+                for _ in group:
+                    self.__queue.task_done()
+
+    #Writes a group after any records an earlier write failed on, keeping all of them for the next try if this one fails too
+    def write(self, group: list) -> None:
+        with self.__writeLock:
+            records = self.__failed + group
+            self.__failed = []
+            try:
+                if records:
+                    self.__writeFunction(records)
+            except Exception:
+                self.__failed = records
+                raise
+
+    #Waits until every queued record has been written. Records a write failed on are tried again here, and the error
+    #is raised if they still can't be written, so the caller knows they aren't stored
+    def flush(self) -> None:
+        self.__queue.join()
+        self.write([])
+
+#Snapshots hold already-parsed data so startup can skip parsing the text files
+SNAPSHOT_VERSION = 6
+
+#Writes a snapshot: a small header with the signature of the sources it was made from, then the parsed data
+def writeSnapshot(filename: str, signature, data) -> None:
+    tempFile = filename + ".tmp"
+    with open(tempFile, "wb") as file:
+        pickle.dump((SNAPSHOT_VERSION, signature), file, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(data, file, pickle.HIGHEST_PROTOCOL)
+    os.replace(tempFile, filename)
+
+#Reads a snapshot if isValid accepts its signature. The data is only unpickled after the header checks out
+def readSnapshot(filename: str, isValid) -> object | None:
+    try:
+        with open(filename, "rb") as file:
+            version, signature = pickle.load(file)
+            if version != SNAPSHOT_VERSION or not isValid(signature):
+                return None
+            return pickle.load(file)
+    except (OSError, EOFError, ValueError, AttributeError, pickle.UnpicklingError):
+        return None
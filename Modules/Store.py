@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from Modules.InventoryManagement import Inventory
+from Modules.MembershipSystem import MemberDatabase
+from Modules.POS import POS
+from Modules.RoyaltyProgram import RoyaltyProgram
+from Modules.Console import say, setConsoleLevel, getConsoleLevel, WARNING, OFF
+
+class Store:
+    def __init__(self, inv: Inventory = None, memberDB: MemberDatabase = None, lanes: int = 4, headless: bool = False):
+        #A headless store has no one at the console, so nothing is printed until it is closed. The console level is
+        #shared by the whole process, so the one it replaced is put back then
+        self.__consoleLevel = getConsoleLevel() if headless else None
+        if headless:
+            setConsoleLevel(OFF)
+        #Every lane shares the same inventory and member database
+        self.__inventory = inv if inv else Inventory()
+        self.__memberDB = memberDB if memberDB else MemberDatabase()
+        self.__lanes = lanes
+
+    #Returns the shared inventory
+    def getInventory(self) -> Inventory:
+        return self.__inventory
+
+    #Returns the shared member database
+    def getMemberDatabase(self) -> MemberDatabase:
+        return self.__memberDB
+
+    #Opens a new POS session (lane) for a customer
+    def openLane(self, memberID: str) -> POS:
+        return POS(memberID, self.__inventory.getInventory())
+
+    #Runs a full checkout for one customer without prompting, returning the receipt (None if it couldn't go through).
+    #Raises ValueError, without taking or holding any stock, if the transaction is invalid: no items, an unknown item, a quantity
+    #below 1, or a reward the customer can't use. Perks draw from rng if one is given, so a replayed checkout gets the same discount
+    def checkout(self, memberID: str, items: dict, ability: str = "0", rng: random.Random = None) -> str | None:
+        inv = self.__inventory
+        memberDB = self.__memberDB
+        role = memberDB.getRole(memberID)
+        if role is None:
+            say(f"Member {memberID} does not exist.", WARNING)
+            return None
+
+        if not items:
+            raise ValueError("no items")
+        for itemID, quantity in items.items():
+            if not inv.isItem(itemID):
+                raise ValueError(f"unknown item '{itemID}'")
+            if quantity < 1:
+                raise ValueError(f"invalid quantity {quantity} of {itemID}")
+
+        #Stock is held as the cart is filled and the holds committed at checkout, the same as at the interactive till (Main),
+        #so both see the same availability while holds are outstanding
+        cashier = self.openLane(memberID)
+        for itemID, quantity in items.items():
+            if not cashier.reserveItem(inv, itemID, quantity):
+                cashier.releaseHolds(inv)
+                say(f"Insufficient stock to complete checkout for {memberID}.", WARNING)
+                return None
+
+        cart = cashier.getCart()
+        total = cashier.calculateTotal()
+        royaltySys = RoyaltyProgram(memberID, cart, inv.getInventory(), purchasedItems=memberDB.getPurchasedItems(memberID),
+                                   rng=rng)
+        if ability != "0" and not royaltySys.isEligible(role, total, ability):
+            cashier.releaseHolds(inv)
+            raise ValueError(f"{memberID} can't use the '{ability}' reward on this purchase")
+
+        if not cashier.commitHolds(inv):
+            say(f"Insufficient stock to complete checkout for {memberID}.", WARNING)
+            return None
+
+        discount = royaltySys.useAbilities(role, ability, total) if ability != "0" else 0
+
+        pointsEarned = royaltySys.getPoints()
+        memberDB.updateMemberDetails(memberID, points=pointsEarned)
+        memberDB.savePurchases({memberID: cart[memberID]})
+        return cashier.finalizePurchase(discount, pointsEarned)
+
+    #Runs many checkouts at once, one per lane, and returns the receipts in the same order. If a transaction is invalid
+    #its ValueError is raised once every checkout has finished.
+    #Lanes are threads, so they overlap file writes but not Python work (measureThroughput shows how far that goes)
+    def runCheckouts(self, transactions: list, lanes: int = None) -> list:
+        with ThreadPoolExecutor(max_workers=lanes if lanes else self.__lanes) as pool:
+            futures = [pool.submit(self.checkout, memberID, items, ability) for memberID, items, ability in transactions]
+            return [future.result() for future in futures]
+
+    #Writes any changes still batched by write-behind or group commit
+    def flush(self) -> None:
+        self.__inventory.flush()
+        self.__memberDB.flush()
+
+    #Writes any batched changes, folds the stock journal and saves snapshots for a fast start next time
+    def close(self) -> None:
+        try:
+            self.__inventory.compactJournal()
+            self.__inventory.saveSnapshot()
+            self.__memberDB.saveSnapshot()
+            self.__inventory.close()
+            self.__memberDB.close()
+        finally:
+            if self.__consoleLevel is not None:
+                setConsoleLevel(self.__consoleLevel)
+                self.__consoleLevel = None
+
+#Builds random transactions from the members and items of a store
+def randomTransactions(store: Store, count: int, itemsPerCart: int = 5, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    memberIDs = sorted(store.getMemberDatabase().getAllMembers())
+    itemIDs = sorted(store.getInventory().getInventory())
+    transactions = []
+    for _ in range(count):
+        cart = {itemID: rng.randint(1, 2) for itemID in rng.sample(itemIDs, min(itemsPerCart, len(itemIDs)))}
+        transactions.append((rng.choice(memberIDs), cart, "0"))
+    return transactions
+
+#Measures how many checkouts per second one store process sustains for each number of lanes
+#The time covers the checkouts and writing them out, but not the snapshots close saves, which cost the same however many ran
+def measureThroughput(storageDir: str, laneCounts: list, checkouts: int = 1000) -> dict:
+    results = {}
+    for lanes in laneCounts:
+        #Work on a copy so the real storage is never touched
+        with tempfile.TemporaryDirectory() as workDir:
+            shutil.copytree(storageDir, workDir, dirs_exist_ok=True)
+            store = Store(Inventory(os.path.join(workDir, "INVENTORY.txt")),
+                          MemberDatabase(os.path.join(workDir, "MEMBERS.txt"), os.path.join(workDir, "PURCHASE_HISTORY.txt"),
+                                         writeBehind=True, flushInterval=1000, groupCommit=True),
+                          lanes, headless=True)
+            transactions = randomTransactions(store, checkouts)
+            start = time.perf_counter()
+            receipts = store.runCheckouts(transactions)
+            store.flush()
+            elapsed = time.perf_counter() - start
+            store.close()
+
+        completed = sum(1 for receipt in receipts if receipt)
+        results[lanes] = {"completed": completed, "seconds": elapsed, "checkoutsPerSecond": completed / elapsed if elapsed else 0}
+        print(f"{lanes} lane(s): {completed} checkouts in {elapsed:.3f}s ({results[lanes]['checkoutsPerSecond']:.1f}/s)")
+    return results
+
+if __name__ == "__main__":
+    #Usage: python -m Modules.Store <storage directory> [lane counts...]
+    storageDir = sys.argv[1] if len(sys.argv) > 1 else "Storage"
+    laneCounts = [int(lanes) for lanes in sys.argv[2:]] or [1, 2, 4, 8]
+    measureThroughput(storageDir, laneCounts)
@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+
+#The modules are imported as Modules.<name>, the way Main.py imports them, so the tests run from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+#A small store in the original text format: three items, two members and a few dated purchases
+INVENTORY = ["FRU001:Apple:1.50:100:SEASONAL\n", "FRU002:Banana:0.75:50:NOTSEASONAL\n", "TEC001:Headphones:40.00:5:NOTSEASONAL\n"]
+MEMBERS = ["AF00001:Ajante Fraser:ajante@test.com:300:Apprentice\n", "AB00001:Alice Brown:alice@test.com:0:Apprentice\n"]
+HISTORY = ["AF00001:2024-01-05:(FRU001,2):(FRU002,1)\n", "AB00001:2024-02-10:(TEC001,1)\n",
+           "AF00001:2024-03-15:(FRU001,1)\n", "AF00001:2025-01-20:(FRU002,4)\n", "AB00001:2025-02-01:(FRU001,3)\n"]
+
+@pytest.fixture
+def storeDirectory(tmp_path):
+    for filename, lines in (("INVENTORY.txt", INVENTORY), ("MEMBERS.txt", MEMBERS), ("PURCHASE_HISTORY.txt", HISTORY)):
+        (tmp_path / filename).write_text("".join(lines))
+    return tmp_path
+
+#Returns a TextStorage over the files of a store directory
+def openTextStorage(directory):
+    from Modules.StorageBackends import TextStorage
+    return TextStorage(str(directory / "INVENTORY.txt"), str(directory / "MEMBERS.txt"), str(directory / "PURCHASE_HISTORY.txt"))
@@ -0,0 +1,47 @@
+import pytest
+from Modules.InventoryManagement import Inventory, Item
+
+@pytest.fixture
+def inventory(storeDirectory):
+    return Inventory(str(storeDirectory / "INVENTORY.txt"))
+
+def test_reserve_holds_stock_from_other_carts(inventory):
+    holdID = inventory.reserveStock("TEC001", 3)
+    assert holdID
+    assert inventory.getAvailableStock("TEC001") == 2
+    assert inventory.reserveStock("TEC001", 3) is None
+    assert inventory.getStockLevel("TEC001") == 5
+
+def test_commit_takes_the_held_stock(inventory, storeDirectory):
+    holdIDs = [inventory.reserveStock("FRU001", 10), inventory.reserveStock("TEC001", 5)]
+    assert inventory.commitReservations(holdIDs)
+    assert inventory.getStockLevel("FRU001") == 90
+    assert inventory.getStockLevel("TEC001") == 0
+    #The holds are used up, so they can't be committed twice
+    assert not inventory.commitReservations(holdIDs)
+    assert Inventory(str(storeDirectory / "INVENTORY.txt")).getStockLevel("FRU001") == 90
+
+def test_commit_rechecks_stock_changed_since_the_hold(inventory):
+    holdID = inventory.reserveStock("TEC001", 4)
+    #Stock changed underneath the hold (e.g. a recount), leaving too little for it
+    inventory.updateStock({"TEC001": 2})
+    assert not inventory.commitReservations([holdID])
+    assert inventory.getStockLevel("TEC001") == 2
+
+def test_release_gives_the_stock_back(inventory):
+    holdID = inventory.reserveStock("TEC001", 5)
+    assert inventory.getAvailableStock("TEC001") == 0
+    inventory.releaseReservation(holdID)
+    assert inventory.getAvailableStock("TEC001") == 5
+    assert not inventory.commitReservations([holdID])
+
+def test_expired_holds_stop_counting(inventory):
+    inventory.reserveStock("TEC001", 5, holdSeconds=-1)
+    assert inventory.getAvailableStock("TEC001") == 5
+
+def test_removing_an_item_releases_its_holds(inventory):
+    holdID = inventory.reserveStock("TEC001", 2)
+    inventory.removeItem("TEC001")
+    assert not inventory.commitReservations([holdID])
+    inventory.addItem(Item("TEC001", "Headphones", 40.0, 5, False))
+    assert inventory.getAvailableStock("TEC001") == 5
@@ -0,0 +1,61 @@
+import json
+import zlib
+from Modules.ReceiptArchive import ReceiptArchive, BLOCK_HEADER
+
+#Returns a structured receipt, with only the fields the archive indexes on
+def makeReceipt(memberID, time, total):
+    return {"member": memberID, "time": time, "total": total}
+
+#Returns a block of receipts the way a till writes it to a segment
+def makeBlock(receipts):
+    block = zlib.compress("".join(json.dumps(receipt) + "\n" for receipt in receipts).encode())
+    return BLOCK_HEADER.pack(len(block)) + block
+
+#Writes receipts to a new archive and closes it, returning the path of its first segment
+def writeArchive(directory, receipts):
+    archive = ReceiptArchive(str(directory))
+    for receipt in receipts:
+        archive.add(receipt)
+    archive.close()
+    return directory / "RECEIPTS_000001.seg"
+
+def test_partly_written_block_is_cut_off(tmp_path):
+    first = makeReceipt("AF00001", "2025-01-20 10:00:00", 6.00)
+    segment = writeArchive(tmp_path, [first])
+    size = segment.stat().st_size
+    #A till stopped partway through writing its next block
+    with open(segment, "ab") as file:
+        file.write(makeBlock([makeReceipt("AF00001", "2025-01-21 10:00:00", 9.00)])[:BLOCK_HEADER.size + 5])
+
+    archive = ReceiptArchive(str(tmp_path))
+    try:
+        assert segment.stat().st_size == size
+        assert archive.findReceipts("AF00001") == [first]
+        #The next block goes where the partial one was
+        second = makeReceipt("AF00001", "2025-01-22 10:00:00", 3.00)
+        archive.add(second)
+        assert archive.findReceipts("AF00001") == [first, second]
+    finally:
+        archive.close()
+
+def test_unindexed_blocks_are_indexed(tmp_path):
+    first = makeReceipt("AF00001", "2025-01-20 10:00:00", 6.00)
+    segment = writeArchive(tmp_path, [first])
+    #A till wrote whole blocks, the last in a segment it had just started, but stopped before indexing them
+    second = makeReceipt("AF00001", "2025-01-21 10:00:00", 9.00)
+    third = makeReceipt("AB00001", "2025-01-21 11:00:00", 40.00)
+    with open(segment, "ab") as file:
+        file.write(makeBlock([second]))
+    (tmp_path / "RECEIPTS_000002.seg").write_bytes(makeBlock([third]))
+
+    archive = ReceiptArchive(str(tmp_path))
+    try:
+        assert archive.findReceipts("AF00001") == [first, second]
+        assert archive.findReceipts("AB00001", "2025-01-21") == [third]
+        #New receipts go to the newest segment
+        fourth = makeReceipt("AB00001", "2025-01-22 09:00:00", 1.50)
+        archive.add(fourth)
+        assert archive.findReceipts("AB00001") == [third, fourth]
+        assert (tmp_path / "RECEIPTS_000002.seg").stat().st_size > len(makeBlock([third]))
+    finally:
+        archive.close()
@@ -0,0 +1,61 @@
+import multiprocessing
+from Modules.InventoryManagement import Inventory
+from Modules.SharedStock import SharedStockTable
+
+#Each till is a separate process: file locks only keep processes apart, not two tables opened in the same one
+CONTEXT = multiprocessing.get_context("spawn")
+
+#Opens a till's inventory over the store's files and the shared stock table
+def openInventory(directory: str) -> Inventory:
+    return Inventory(f"{directory}/INVENTORY.txt", sharedStockFile=f"{directory}/STOCK.bin")
+
+#Sells one unit at a time until the item runs out or attempts are used up, returning how many were sold
+def sellUnits(directory: str, itemID: str, attempts: int, sold) -> None:
+    inventory = openInventory(directory)
+    count = 0
+    for _ in range(attempts):
+        if inventory.takeStock({itemID: 1}):
+            count += 1
+    inventory.close()
+    sold.put(count)
+
+#Adds a unit at a time, so every write moves the stock and the version together
+def addUnits(filename: str, itemID: str, count: int) -> None:
+    table = SharedStockTable(filename)
+    for _ in range(count):
+        table.adjustStock({itemID: 1})
+    table.close()
+
+def test_two_tills_never_sell_the_same_unit(storeDirectory):
+    directory = str(storeDirectory)
+    inventory = openInventory(directory)
+    sold = CONTEXT.Queue()
+    #Banana has 50 units and the two tills try to sell 40 each
+    tills = [CONTEXT.Process(target=sellUnits, args=(directory, "FRU002", 40, sold)) for _ in range(2)]
+    for till in tills:
+        till.start()
+    for till in tills:
+        till.join(60)
+        assert till.exitcode == 0
+    assert sold.get() + sold.get() == 50
+    assert inventory.getStockLevel("FRU002") == 0
+    assert inventory.getAvailableStock("FRU002") == 0
+    #A third till opening the table now sees the same stock
+    assert openInventory(directory).getStockLevel("FRU002") == 0
+    inventory.close()
+
+def test_records_are_read_whole(storeDirectory):
+    filename = str(storeDirectory / "STOCK.bin")
+    table = SharedStockTable(filename)
+    table.addItems({"FRU001": 100})
+    stock, version = table.getRecord("FRU001")
+    writer = CONTEXT.Process(target=addUnits, args=(filename, "FRU001", 5000))
+    writer.start()
+    #Stock and version only ever go up together, so a record read half before and half after a write would show
+    while writer.is_alive():
+        newStock, newVersion = table.getRecord("FRU001")
+        assert newStock - newVersion == stock - version
+    writer.join()
+    assert writer.exitcode == 0
+    assert table.getRecord("FRU001") == (stock + 5000, version + 5000)
+    table.close()
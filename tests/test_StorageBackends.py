@@ -0,0 +1,92 @@
+import os
+import sys
+import subprocess
+import pytest
+from conftest import openTextStorage
+from Modules.StorageBackends import SQLiteStorage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Runs the text-to-SQLite migration on a store directory
+def migrate(directory, databaseFile):
+    return subprocess.run([sys.executable, "-m", "Modules.StorageBackends", str(databaseFile), str(directory)],
+                          cwd=ROOT, capture_output=True, text=True)
+
+def test_migration_round_trip(storeDirectory):
+    source = openTextStorage(storeDirectory)
+    result = migrate(storeDirectory, storeDirectory / "YOUWEE.db")
+    assert result.returncode == 0, result.stdout + result.stderr
+    target = SQLiteStorage(str(storeDirectory / "YOUWEE.db"))
+    try:
+        assert sorted(target.readItems()) == sorted(source.readItems())
+        assert sorted(target.readMembers()) == sorted(source.readMembers())
+        assert list(target.readAllPurchases()) == list(source.readAllPurchases())
+        assert target.readAggregates() == {}
+    finally:
+        target.close()
+
+def test_migration_keeps_compacted_aggregates(storeDirectory):
+    source = openTextStorage(storeDirectory)
+    report = source.compactHistory("2025-01-01", lambda purchases: {memberID: 10 for memberID, _, _ in purchases})
+    assert report["purchases"] == 3
+    aggregates = source.readAggregates()
+    result = migrate(storeDirectory, storeDirectory / "YOUWEE.db")
+    assert result.returncode == 0, result.stdout + result.stderr
+    target = SQLiteStorage(str(storeDirectory / "YOUWEE.db"))
+    try:
+        assert target.readAggregates() == aggregates
+        assert sum(aggregate["purchases"] for aggregate in target.readAggregates().values()) == 3
+        assert list(target.readAllPurchases()) == list(source.readAllPurchases())
+    finally:
+        target.close()
+
+#Stops a compaction right after it writes the aggregates in the given state, the way a crash there would
+def crashCompaction(monkeypatch, storage, crashState):
+    from Modules.StorageBackends import TextStorage
+    writeAggregateFile = TextStorage.writeAggregateFile
+
+    def crashingWrite(self, state, *args):
+        writeAggregateFile(self, state, *args)
+        if state == crashState:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(TextStorage, "writeAggregateFile", crashingWrite)
+    with pytest.raises(KeyboardInterrupt):
+        storage.compactHistory("2025-01-01")
+    monkeypatch.setattr(TextStorage, "writeAggregateFile", writeAggregateFile)
+
+@pytest.mark.parametrize("crashState", ["PENDING", "DONE"])
+def test_interrupted_compaction_is_finished_once(storeDirectory, monkeypatch, crashState):
+    crashCompaction(monkeypatch, openTextStorage(storeDirectory), crashState)
+    if crashState == "PENDING":
+        #The old history is still in place beside the pending aggregates
+        assert (storeDirectory / "PURCHASE_HISTORY.txt").read_text().count("2024-") == 3
+    storage = openTextStorage(storeDirectory)
+    aggregates = storage.readAggregates()
+    assert sum(aggregate["purchases"] for aggregate in aggregates.values()) == 3
+    assert [date for _, date, _ in storage.readAllPurchases()] == ["2025-01-20", "2025-02-01"]
+    assert (storeDirectory / "PURCHASE_HISTORY_AGGREGATE.txt").read_text().startswith("#COMPACTION:DONE:2025-01-01:")
+    #Compacting again rolls nothing up twice
+    assert storage.compactHistory("2025-01-01")["purchases"] == 0
+    assert storage.readAggregates() == aggregates
+
+def test_points_from_two_tills_add_up(storeDirectory):
+    result = migrate(storeDirectory, storeDirectory / "YOUWEE.db")
+    assert result.returncode == 0, result.stdout + result.stderr
+    from Modules.MembershipSystem import MemberDatabase
+    storages = [SQLiteStorage(str(storeDirectory / "YOUWEE.db")) for _ in range(2)]
+    try:
+        #Both tills loaded AF00001 with 300 points before either stored a sale
+        tills = [MemberDatabase(storage=storage) for storage in storages]
+        tills[0].updateMemberDetails("AF00001", points=25)
+        tills[1].updateMemberDetails("AF00001", points=40)
+        tills[0].saveMembers({"AF00001"})
+        tills[1].saveMembers({"AF00001"})
+        stored = {row[0]: row[3] for row in storages[0].readMembers()}
+        assert stored["AF00001"] == 365
+        assert stored["AB00001"] == 0
+        #The till that stored last caught up with the other till's points
+        assert tills[1].getAllMembers()["AF00001"]["points"] == 365
+    finally:
+        for storage in storages:
+            storage.close()